@@ -0,0 +1,64 @@
+import json
+import sys
+
+# =========================
+# CONFIG
+# =========================
+
+# Metrics shown per (size, stage): (key in the results file, column title, higher is better).
+COMPARED_METRICS = [
+    ("rows_per_s", "rows/s", True),
+    ("wall_s", "wall s", False),
+    ("shuffle_write_bytes", "shuffle write B", False),
+    ("shuffle_read_bytes", "shuffle read B", False),
+    ("peak_jvm_heap_bytes", "peak JVM heap B", False),
+    ("peak_driver_rss_bytes", "peak driver RSS B", False),
+]
+
+
+# =========================
+# COMPARE
+# =========================
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return report, {(r["size"], r["stage"]): r for r in report["results"]}
+
+
+def change(old, new, higher_is_better):
+    """
+    Relative change in percent, signed so that a positive value is always an improvement.
+    """
+    if not old or new is None:
+        return None
+    pct = (new - old) / old * 100
+    return pct if higher_is_better else -pct
+
+
+def compare(old_path, new_path):
+    old_report, old = load_results(old_path)
+    new_report, new = load_results(new_path)
+    print(f"old: {old_report['commit'][:10]} ({old_report['timestamp']}, Spark {old_report['spark_version']})")
+    print(f"new: {new_report['commit'][:10]} ({new_report['timestamp']}, Spark {new_report['spark_version']})")
+    if old_report["config"] != new_report["config"]:
+        print("[!] Runs used different configs - numbers may not be comparable")
+
+    for key in sorted(set(old) & set(new)):
+        size, stage = key
+        print(f"\n{size:>9} | {stage}")
+        for metric, title, higher_is_better in COMPARED_METRICS:
+            a, b = old[key].get(metric), new[key].get(metric)
+            pct = change(a, b, higher_is_better)
+            pct_text = f"{pct:+7.1f}%" if pct is not None else "      -"
+            print(f"    {title:<18} {a or 0:>16.2f} -> {b or 0:>16.2f}  {pct_text}")
+
+    only = set(old) ^ set(new)
+    if only:
+        print(f"\n[i] Not in both runs: {sorted(only)}")
+
+
+if __name__ == "__main__":
+    # Run from the repo root: python -m benchmarks.compare_results benchmarks/results/<old>.json benchmarks/results/<new>.json
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m benchmarks.compare_results OLD.json NEW.json")
+    compare(sys.argv[1], sys.argv[2])
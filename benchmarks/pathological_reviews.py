@@ -0,0 +1,112 @@
+import random
+import sys
+import time
+
+from pipeline.text_rules import _SPLIT_RE, contrast_words, kws_words, split_segments
+
+# =========================
+# CONFIG
+# =========================
+
+# Equivalence: random reviews built from keywords, contrast words, commas, "and", punctuation and
+# whitespace must split exactly like split_regex.
+NUM_RANDOM_REVIEWS = 50_000
+SEED = 7
+
+# Pathological reviews (lowercased, like the trim step sees them), in characters.
+# Each one must be segmented within TIME_BUDGET_S, and the largest size may take at most MAX_GROWTH times
+# as long as the smallest (4x the text: ~4x when linear, ~16x when quadratic).
+PATHOLOGICAL_CHARS = [50_000, 200_000]
+TIME_BUDGET_S = 1.0
+MAX_GROWTH = 8.0
+
+# split_regex itself is only timed on this size (it is quadratic on the whitespace case).
+REGEX_PREVIEW_CHARS = 5_000
+
+FILLER_WORDS = ["the", "room", "was", "a", "nice", "hand", "band", "sand", "stay", "good", "butter", "_a"]
+SEPARATORS = [" ", "  ", "\n", "\t", " \n ", ", ", ",", " , ", ". ", "... ", "!", "? ", " and ", "and",
+              " and\n", ".  and ", "-", "(", ")"]
+
+
+# =========================
+# CORPUS
+# =========================
+def random_review(rng):
+    parts = []
+    for _ in range(rng.randint(0, 40)):
+        r = rng.random()
+        if r < 0.3:
+            # Multi-word keywords with any whitespace between the words (they match "\s+").
+            parts.append(rng.choice(kws_words).replace(" ", rng.choice([" ", "  ", "\n", " \t"])))
+        elif r < 0.45:
+            parts.append(rng.choice(contrast_words))
+        else:
+            parts.append(rng.choice(FILLER_WORDS))
+        parts.append(rng.choice(SEPARATORS))
+    return "".join(parts)
+
+
+def repeat_to(unit, num_chars):
+    return (unit * (num_chars // len(unit) + 1))[:num_chars]
+
+
+PATHOLOGICAL_REVIEWS = {
+    # A long essay with a comma every few words and no keyword in most phrases.
+    "comma_essay": lambda n: repeat_to("we arrived late, the host waited, the view was lovely, ", n),
+    # "and" chains: the keyword lookahead runs at every " and ".
+    "and_chain": lambda n: repeat_to("the view and the food and the people and ", n),
+    # Scraped blank padding: the \s+ alternatives backtrack over the whole run at every position.
+    "whitespace_run": lambda n: "nice" + " " * (n - 9) + "clean",
+    "newline_padding": lambda n: repeat_to("great stay,\n\n\n\n\n\n\n\n \n \n", n),
+    # Every phrase mentions keywords, so almost every comma / "and" is a split.
+    "keyword_dense": lambda n: repeat_to("clean room, comfy bed and quiet area but slow wifi. ", n),
+    # No separator at all.
+    "one_phrase": lambda n: repeat_to("lovely view ", n),
+}
+
+
+# =========================
+# CHECKS
+# =========================
+def check_equivalence():
+    rng = random.Random(SEED)
+    mismatches = 0
+    for _ in range(NUM_RANDOM_REVIEWS):
+        text = random_review(rng)
+        if split_segments(text) != _SPLIT_RE.split(text):
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"[!] Different split for {text!r}")
+    print(f"[i] Equivalence: {NUM_RANDOM_REVIEWS - mismatches}/{NUM_RANDOM_REVIEWS} random reviews identical")
+    return mismatches == 0
+
+
+def timed(fn, text):
+    start = time.perf_counter()
+    fn(text)
+    return time.perf_counter() - start
+
+
+def check_pathological():
+    ok = True
+    for name, build in PATHOLOGICAL_REVIEWS.items():
+        times = [timed(split_segments, build(n)) for n in PATHOLOGICAL_CHARS]
+        growth = times[-1] / max(times[0], 1e-6)
+        regex_s = timed(_SPLIT_RE.split, build(REGEX_PREVIEW_CHARS))
+        passed = max(times) <= TIME_BUDGET_S and growth <= MAX_GROWTH
+        ok &= passed
+        print(
+            f"[{'i' if passed else '!'}] {name:<16} "
+            + "  ".join(f"{n // 1000}k chars: {t:.3f}s" for n, t in zip(PATHOLOGICAL_CHARS, times))
+            + f"  (x{growth:.1f})  split_regex on {REGEX_PREVIEW_CHARS // 1000}k chars: {regex_s:.3f}s"
+        )
+    return ok
+
+
+if __name__ == "__main__":
+    # Run from the repo root (no Spark needed): python -m benchmarks.pathological_reviews
+    equivalent = check_equivalence()
+    bounded = check_pathological()
+    if not (equivalent and bounded):
+        sys.exit("[!] Segmenter check failed")
+    print("[i] Segmenter check passed")
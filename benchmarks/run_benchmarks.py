@@ -0,0 +1,234 @@
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+
+from pyspark.sql import SparkSession, functions as F
+
+from benchmarks.synthetic_reviews import ensure_dataset, ZIPF_EXPONENT, KEYWORD_DENSITY, REVIEWS_PER_HOTEL, SEED
+from pipeline.cache_manager import cache_manager
+from pipeline.spark_metrics import measure, METRICS_CONF
+from pipeline.stages import (
+    create_categories_column,
+    trim_review_to_category_relevant_text,
+    trim_long_to_category_relevant_text,
+    adjust_review_score,
+    train_regression_linear_model,
+    train_category_model_cached,
+    estimate_noise_sigma,
+    score_hotel_categories,
+    TOO_SMALL_REVIEWS_NUM,
+    K,
+)
+
+# =========================
+# CONFIG
+# =========================
+
+# Number of synthetic reviews per run (each size runs every stage).
+SIZES = [10_000, 100_000, 1_000_000]
+
+# Stages to run, in pipeline order (later stages use the outputs of earlier ones).
+STAGES = ["categorize", "trim", "adjust_score", "train", "train_warm_cache", "predict_aggregate"]
+
+# Local Spark session.
+SPARK_MASTER = "local[*]"
+DRIVER_MEMORY = "8g"
+SHUFFLE_PARTITIONS = 16
+
+# One JSON file per commit (a "-dirty" suffix when the tree has uncommitted changes).
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+
+# =========================
+# HELPERS
+# =========================
+def build_spark():
+    builder = (
+        SparkSession.builder
+        .master(SPARK_MASTER)
+        .appName("review-metric-benchmarks")
+        .config("spark.driver.memory", DRIVER_MEMORY)
+        .config("spark.sql.shuffle.partitions", SHUFFLE_PARTITIONS)
+    )
+    for key, value in METRICS_CONF.items():
+        builder = builder.config(key, value)
+    return builder.getOrCreate()
+
+
+def materialize(df):
+    # Runs the full plan without collecting or writing anything.
+    df.write.format("noop").mode("overwrite").save()
+
+
+def cached(df, name):
+    # Stage inputs are cached (same storage level as the notebook) and materialized before measuring,
+    # so each stage is timed on its own.
+    return cache_manager(df.sparkSession).persist(name, df)
+
+
+def synthetic_sentiment(label_col="label"):
+    """
+    Stand-in for the BERT sentiment column (not benchmarked: it needs the pretrained Spark NLP model).
+    Mostly agrees with the label, with some disagreement so every adjust_review_score rule fires.
+    """
+    draw = F.pmod(F.xxhash64(F.col("text_review")), F.lit(10))
+    return (
+        F.when(draw == 9, F.lit("neutral"))
+         .when(draw < F.col(label_col) - 1, F.lit("positive"))
+         .otherwise(F.lit("negative"))
+    )
+
+
+def git_info():
+    def git(*args):
+        return subprocess.run(["git", *args], capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain"))}
+
+
+# =========================
+# STAGES
+# =========================
+def run_size(spark, num_reviews):
+    """
+    Runs every stage in STAGES on num_reviews synthetic reviews.
+    Returns one metrics dict per stage.
+    """
+    path = ensure_dataset(num_reviews)
+    base = cached(spark.read.parquet(path), "base")
+    results = []
+
+    def record(metrics, rows):
+        metrics.update(size=num_reviews, stage=metrics.pop("name"), rows=rows,
+                       rows_per_s=rows / metrics["wall_s"] if metrics["wall_s"] else None)
+        results.append(metrics)
+        print(f"[i] {num_reviews:>9} | {metrics['stage']:<18} | {rows:>9} rows | {metrics['wall_s']:8.2f}s | "
+              f"{metrics['rows_per_s'] or 0:12.0f} rows/s | shuffle w {metrics['shuffle_write_bytes']:>12} B")
+
+    # Inputs shared by the later stages (built once, outside the measured blocks).
+    long_df = None
+    trimmed = None
+    train_dfs = None
+    models = None
+
+    if "categorize" in STAGES:
+        with measure(spark, "categorize") as m:
+            materialize(create_categories_column(base, "text_review"))
+        record(m, num_reviews)
+
+    if "trim" in STAGES:
+        long_df = cached(create_categories_column(base, "text_review").select(
+            "hotel_id", "text_review", "label", F.explode("categories").alias("category")
+        ), "long")
+        rows = cache_manager(spark).rows("long")
+        with measure(spark, "trim") as m:
+            for df in trim_review_to_category_relevant_text(long_df).values():
+                materialize(df)
+        record(m, rows)
+
+    if "adjust_score" in STAGES or "train" in STAGES or "train_warm_cache" in STAGES or "predict_aggregate" in STAGES:
+        # Same shape as the notebook: one trimmed DataFrame per category.
+        if long_df is None:
+            long_df = cached(create_categories_column(base, "text_review").select(
+                "hotel_id", "text_review", "label", F.explode("categories").alias("category")
+            ), "long")
+        trimmed = {
+            ctg: cached(df.withColumn("sentiment", synthetic_sentiment()), f"trimmed/{ctg}")
+            for ctg, df in trim_review_to_category_relevant_text(long_df).items()
+        }
+
+    if "adjust_score" in STAGES:
+        rows = sum(df.count() for df in trimmed.values())
+        with measure(spark, "adjust_score") as m:
+            for df in trimmed.values():
+                materialize(adjust_review_score(df))
+        record(m, rows)
+
+    if "train" in STAGES or "train_warm_cache" in STAGES or "predict_aggregate" in STAGES:
+        train_dfs = {ctg: cached(adjust_review_score(df), f"train/{ctg}") for ctg, df in trimmed.items()}
+        # predict_aggregate needs models, so training also runs (unmeasured) when only that stage is selected.
+        rows = sum(df.count() for df in train_dfs.values())
+        with measure(spark, "train") as m:
+            models = {}
+            for ctg, train_df in train_dfs.items():
+                model = train_regression_linear_model(train_df)
+                models[ctg] = (model, estimate_noise_sigma(model, train_df))
+        if "train" in STAGES:
+            record(m, rows)
+
+    if "train_warm_cache" in STAGES:
+        # Rerun cost with the feature cache filled by a first (unmeasured) run: only the regression is fitted.
+        cache_dir = tempfile.mkdtemp(prefix="feature_cache_")
+        for ctg, train_df in train_dfs.items():
+            train_category_model_cached(spark, ctg, train_df, cache_dir=cache_dir)
+        with measure(spark, "train_warm_cache") as m:
+            for ctg, train_df in train_dfs.items():
+                train_category_model_cached(spark, ctg, train_df, cache_dir=cache_dir)
+        record(m, rows)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    if "predict_aggregate" in STAGES:
+        # Prediction input is the long (hotel_id, category, text_review) table, like the notebook.
+        test_long = cached(trim_long_to_category_relevant_text(long_df.drop("label")), "test_long")
+        rows = cache_manager(spark).rows("test_long")
+        with measure(spark, "predict_aggregate") as m:
+            scores = score_hotel_categories(test_long, models, TOO_SMALL_REVIEWS_NUM, K)
+            materialize(scores)
+        cache_manager(spark).consumed(scores)
+        record(m, rows)
+
+    # Cached bytes per stage input, then free everything before the next size.
+    cache_manager(spark).report()
+    cache_manager(spark).unpersist_all()
+    spark.catalog.clearCache()
+    return results
+
+
+# =========================
+# DRIVER
+# =========================
+def run_benchmarks(sizes=SIZES, results_dir=RESULTS_DIR):
+    """
+    Runs all sizes and writes benchmarks/results/<commit>.json.
+    Compare two runs with: python -m benchmarks.compare_results old.json new.json
+    """
+    spark = build_spark()
+    spark.sparkContext.setLogLevel("WARN")
+
+    results = []
+    for n in sizes:
+        results.extend(run_size(spark, n))
+
+    info = git_info()
+    report = {
+        **info,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "spark_version": spark.version,
+        "python_version": platform.python_version(),
+        "config": {
+            "spark_master": SPARK_MASTER,
+            "driver_memory": DRIVER_MEMORY,
+            "shuffle_partitions": SHUFFLE_PARTITIONS,
+            "reviews_per_hotel": REVIEWS_PER_HOTEL,
+            "zipf_exponent": ZIPF_EXPONENT,
+            "keyword_density": KEYWORD_DENSITY,
+            "seed": SEED,
+        },
+        "results": results,
+    }
+    spark.stop()
+
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f"{info['commit'][:10]}{'-dirty' if info['dirty'] else ''}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ DONE – wrote {len(results)} stage results to {path}")
+    return path
+
+
+if __name__ == "__main__":
+    # Run from the repo root: python -m benchmarks.run_benchmarks
+    run_benchmarks()
@@ -0,0 +1,143 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline.text_rules import categories_kw, contrast_words
+
+# =========================
+# CONFIG
+# =========================
+
+# Generated datasets are cached here (one Parquet file per parameter set).
+# DATA_VERSION is part of the file name; bump it when the generated columns change.
+DATA_DIR = os.path.join("benchmarks", "_data")
+DATA_VERSION = 2
+
+# Average reviews per hotel; the number of hotels is num_reviews // REVIEWS_PER_HOTEL unless given.
+REVIEWS_PER_HOTEL = 200
+
+# Reviews per hotel follow a Zipf-like law: hotel i gets weight 1 / i^ZIPF_EXPONENT.
+# 0 = uniform, ~1 = a few very large hotels (like the real booking data).
+ZIPF_EXPONENT = 1.1
+
+# Probability that a sentence mentions a category keyword (the rest are filler sentences).
+KEYWORD_DENSITY = 0.6
+
+# Sentences per review (inclusive range).
+MIN_SENTENCES = 1
+MAX_SENTENCES = 6
+
+SEED = 42
+
+# Vocabulary for the generated sentences. Hard words match hard_neg_re / hard_pos_re,
+# so adjust_review_score exercises all of its branches.
+POSITIVE_WORDS = ["good", "nice", "great", "lovely", "pleasant", "amazing", "excellent", "perfect", "wonderful"]
+NEGATIVE_WORDS = ["bad", "poor", "disappointing", "annoying", "terrible", "awful", "horrible", "broken", "worst"]
+FILLER_SENTENCES = [
+    "we arrived late in the evening",
+    "we stayed for three nights with our kids",
+    "it was our second visit to the city",
+    "the booking process was simple",
+    "we would probably come back next year",
+    "check out was at eleven",
+    "we travelled for a conference",
+]
+CONNECTORS = [". ", "! ", ", ", " and ", ". "]
+
+
+# =========================
+# GENERATOR
+# =========================
+def hotel_weights(num_hotels, zipf_exponent=ZIPF_EXPONENT):
+    weights = 1.0 / np.arange(1, num_hotels + 1) ** zipf_exponent
+    return weights / weights.sum()
+
+
+def generate_reviews(
+        num_reviews,
+        num_hotels=None,
+        zipf_exponent=ZIPF_EXPONENT,
+        keyword_density=KEYWORD_DENSITY,
+        seed=SEED
+):
+    """
+    Synthetic reviews with the columns the pipeline stages expect:
+        hotel_id    : long    (int hotel key, like after the hotel dictionary; skewed over num_hotels hotels)
+        hotel_name  : string
+        text_review : string  (sentences built from categories_kw keywords and filler)
+        label       : double  (1..10)
+    Same parameters -> same data.
+    """
+    rng = np.random.default_rng(seed)
+    num_hotels = num_hotels or max(1, num_reviews // REVIEWS_PER_HOTEL)
+
+    hotels = rng.choice(num_hotels, size=num_reviews, p=hotel_weights(num_hotels, zipf_exponent))
+    labels = rng.integers(1, 11, size=num_reviews).astype(float)
+    # Higher labels -> more positive wording.
+    positive_prob = (labels - 1) / 9
+
+    keywords = [kw for kws in categories_kw.values() for kw in kws]
+    sentence_counts = rng.integers(MIN_SENTENCES, MAX_SENTENCES + 1, size=num_reviews)
+    total = int(sentence_counts.sum())
+
+    # Draw every random choice for all sentences at once; the Python loop only joins strings.
+    is_keyword = rng.random(total) < keyword_density
+    keyword_pick = rng.integers(0, len(keywords), size=total)
+    filler_pick = rng.integers(0, len(FILLER_SENTENCES), size=total)
+    positive_word = rng.random(total) < np.repeat(positive_prob, sentence_counts)
+    word_pick = rng.integers(0, len(POSITIVE_WORDS), size=total)
+    connector_pick = rng.integers(0, len(CONNECTORS) + len(contrast_words), size=total)
+    connectors = CONNECTORS + [f" {w} " for w in contrast_words]
+
+    texts = []
+    pos = 0
+    for count in sentence_counts:
+        parts = []
+        for j in range(pos, pos + count):
+            if is_keyword[j]:
+                word = POSITIVE_WORDS[word_pick[j]] if positive_word[j] else NEGATIVE_WORDS[word_pick[j]]
+                parts.append(f"the {keywords[keyword_pick[j]]} was {word}")
+            else:
+                parts.append(FILLER_SENTENCES[filler_pick[j]])
+            if j < pos + count - 1:
+                parts.append(connectors[connector_pick[j]])
+        pos += count
+        texts.append("".join(parts).capitalize() + ".")
+
+    return pd.DataFrame({
+        "hotel_id": hotels.astype("int64"),
+        "hotel_name": [f"hotel {h:06d}, city {h % 97}, synthland" for h in hotels],
+        "text_review": texts,
+        "label": labels,
+    })
+
+
+def dataset_path(num_reviews, num_hotels=None, zipf_exponent=ZIPF_EXPONENT,
+                 keyword_density=KEYWORD_DENSITY, seed=SEED, data_dir=DATA_DIR):
+    num_hotels = num_hotels or max(1, num_reviews // REVIEWS_PER_HOTEL)
+    name = f"reviews_v{DATA_VERSION}_n{num_reviews}_h{num_hotels}_z{zipf_exponent}_d{keyword_density}_s{seed}.parquet"
+    return os.path.join(data_dir, name)
+
+
+def ensure_dataset(num_reviews, num_hotels=None, zipf_exponent=ZIPF_EXPONENT,
+                   keyword_density=KEYWORD_DENSITY, seed=SEED, data_dir=DATA_DIR):
+    """
+    Returns the path of the cached Parquet dataset, generating it on first use.
+    """
+    path = dataset_path(num_reviews, num_hotels, zipf_exponent, keyword_density, seed, data_dir)
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"[i] Generating {num_reviews} synthetic reviews -> {path}")
+        df = generate_reviews(num_reviews, num_hotels, zipf_exponent, keyword_density, seed)
+        # Write then rename, so an interrupted run never leaves a half-written cache file.
+        df.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+if __name__ == "__main__":
+    # Run from the repo root: python -m benchmarks.synthetic_reviews
+    sample = generate_reviews(10)
+    for row in sample.itertuples():
+        print(f"{row.hotel_id} {row.hotel_name} | {row.label:>4} | {row.text_review}")
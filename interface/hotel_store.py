@@ -0,0 +1,166 @@
+import os
+import sqlite3
+import sys
+from functools import lru_cache
+
+import pandas as pd
+
+# Make the repo root importable when run as a script (python hotel_store.py), like main.py does.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline.hotel_keys import HOTEL_DICTIONARY_FILE, HotelDictionary, hotel_names
+
+# =========================
+# CONFIG
+# =========================
+
+# Inputs (same files the interface reads directly) and the SQLite store built from them.
+# hotel_dictionary.csv is the pipeline's hotel_id <-> hotel_name mapping, used to give the real scores
+# the same int ids as tool_input.csv.
+TOOL_INPUT_FILE = "tool_input.csv"
+REAL_SCORES_FILE = "scraped_booking_real_scores.csv"
+DICTIONARY_FILE = HOTEL_DICTIONARY_FILE
+STORE_FILE = "tool_input.sqlite"
+
+# Rows per pandas chunk while building, so tool_input.csv never has to fit in memory at once.
+CHUNK_SIZE = 5000
+
+# How many hotel rows to keep in the in-process LRU cache.
+HOTEL_CACHE_SIZE = 256
+
+# Real category score columns, as written by real_categories_scores_scraper.py.
+REAL_SCORE_COLUMNS = ["Staff", "Facilities", "Cleanliness", "Comfort", "Location", "Free_Wifi"]
+
+
+def load_real_scores(real_scores_file=REAL_SCORES_FILE, dictionary_file=DICTIONARY_FILE):
+    """
+    Real category scores with the pipeline's int hotel_id (looked up in the hotel dictionary by
+    lower("name, city, country"), like the notebook). Hotels the pipeline never saw are dropped;
+    Staff > 0 and the first row per hotel wins. Missing category scores are 0.0, like missing columns
+    (the interface multiplies them for the progress bars).
+    """
+    real_df = pd.read_csv(real_scores_file)
+    if 'Staff' in real_df.columns:
+        real_df = real_df[real_df['Staff'] > 0]
+    names = hotel_names(real_df, ['HotelName', 'City', 'Country'])
+    real_df = real_df.assign(hotel_id=HotelDictionary(dictionary_file).lookup(names))
+    real_df = real_df.dropna(subset=['hotel_id']).astype({'hotel_id': 'int64'})
+    score_cols = [c for c in REAL_SCORE_COLUMNS if c in real_df.columns]
+    real_df[score_cols] = real_df[score_cols].fillna(0.0)
+    return real_df.drop_duplicates(subset=['hotel_id'], keep='first')
+
+
+# =========================
+# BUILD
+# =========================
+def build_store(tool_input_file=TOOL_INPUT_FILE, real_scores_file=REAL_SCORES_FILE,
+                dictionary_file=DICTIONARY_FILE, store_file=STORE_FILE):
+    """
+    Converts tool_input.csv + scraped_booking_real_scores.csv into a SQLite store keyed by the int hotel_id:
+        hotel_index  (hotel_id, hotel_name)             - tiny, loaded eagerly for search
+        hotel_scores (hotel_id, hotel_categories_score) - fetched on demand per hotel
+        real_scores  (hotel_id, Staff, ..., Free_Wifi)  - fetched on demand per hotel
+    """
+    if os.path.exists(store_file):
+        os.remove(store_file)
+
+    con = sqlite3.connect(store_file)
+    try:
+        score_cols = ", ".join(f'"{c}" REAL' for c in REAL_SCORE_COLUMNS)
+        con.execute("CREATE TABLE hotel_index (hotel_id INTEGER PRIMARY KEY, hotel_name TEXT)")
+        con.execute("CREATE TABLE hotel_scores (hotel_id INTEGER PRIMARY KEY, hotel_categories_score TEXT)")
+        con.execute(f"CREATE TABLE real_scores (hotel_id INTEGER PRIMARY KEY, {score_cols})")
+
+        # Real scores: same rules as load_and_merge_data (see load_real_scores).
+        real_df = load_real_scores(real_scores_file, dictionary_file)
+        for c in REAL_SCORE_COLUMNS:
+            if c not in real_df.columns:
+                real_df[c] = 0.0
+        con.executemany(
+            f"INSERT INTO real_scores VALUES ({', '.join('?' * (len(REAL_SCORE_COLUMNS) + 1))})",
+            real_df[['hotel_id'] + REAL_SCORE_COLUMNS].astype(object).itertuples(index=False, name=None)
+        )
+
+        # Predictions: streamed in chunks (each row carries the per-category JSON + examples).
+        for chunk in pd.read_csv(tool_input_file, chunksize=CHUNK_SIZE):
+            chunk = chunk.astype({'hotel_id': 'int64', 'hotel_name': str}).astype(object)
+            con.executemany(
+                "INSERT OR IGNORE INTO hotel_index VALUES (?, ?)",
+                chunk[['hotel_id', 'hotel_name']].itertuples(index=False, name=None)
+            )
+            con.executemany(
+                "INSERT OR IGNORE INTO hotel_scores VALUES (?, ?)",
+                chunk[['hotel_id', 'hotel_categories_score']].itertuples(index=False, name=None)
+            )
+
+        con.commit()
+    finally:
+        con.close()
+
+    # Rows cached from the previous file must not be served by this process.
+    _fetch_hotel.cache_clear()
+    print(f"[i] Built {store_file}")
+
+
+# =========================
+# READ
+# =========================
+class HotelStore:
+    """
+    Read side of the store: the search index is a small DataFrame held in memory,
+    everything else is looked up per selected hotel (behind an LRU cache).
+    """
+
+    def __init__(self, store_file=STORE_FILE):
+        self.store_file = store_file
+        # Part of the row cache key: rows of an older build of the file are never returned.
+        self.version = os.path.getmtime(store_file)
+        con = _connect(store_file)
+        try:
+            # Only hotels that also have real scores are shown (inner join, like the CSV path).
+            self.index = pd.read_sql_query(
+                "SELECT i.hotel_id, i.hotel_name FROM hotel_index i "
+                "JOIN real_scores r ON r.hotel_id = i.hotel_id "
+                "ORDER BY i.rowid",
+                con
+            )
+        finally:
+            con.close()
+
+    def get_hotel(self, hotel_id):
+        """
+        Returns the merged row for one hotel as a dict (same keys as the CSV path), or None.
+        """
+        return _fetch_hotel(self.store_file, self.version, int(hotel_id))
+
+
+def _connect(store_file):
+    # Read-only, short-lived connections: Streamlit reruns scripts on worker threads.
+    return sqlite3.connect(f"file:{store_file}?mode=ro", uri=True, check_same_thread=False)
+
+
+@lru_cache(maxsize=HOTEL_CACHE_SIZE)
+def _fetch_hotel(store_file, version, hotel_id):
+    # version (the file's mtime when the store was opened) is only there to key the LRU cache.
+    # NULL scores (stores built before load_real_scores filled them) come back as 0.0.
+    cols = ", ".join(f'COALESCE(r."{c}", 0.0)' for c in REAL_SCORE_COLUMNS)
+    con = _connect(store_file)
+    try:
+        res = con.execute(
+            f"SELECT i.hotel_id, i.hotel_name, s.hotel_categories_score, {cols} "
+            "FROM hotel_index i "
+            "JOIN hotel_scores s ON s.hotel_id = i.hotel_id "
+            "JOIN real_scores r ON r.hotel_id = i.hotel_id "
+            "WHERE i.hotel_id = ?",
+            (hotel_id,)
+        ).fetchone()
+    finally:
+        con.close()
+
+    if res is None:
+        return None
+    return dict(zip(["hotel_id", "hotel_name", "hotel_categories_score"] + REAL_SCORE_COLUMNS, res))
+
+
+if __name__ == "__main__":
+    # Run from the interface directory (next to the CSVs): python hotel_store.py
+    build_store()
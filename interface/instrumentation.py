@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# =========================
+# CONFIG
+# =========================
+
+# How many recent samples to keep per span (rolling window for the percentiles).
+HISTORY_SIZE = 500
+
+# Set INTERFACE_TIMING_LOG=1 to print one JSON line with all span timings per rerun.
+LOG_ENV_VAR = "INTERFACE_TIMING_LOG"
+
+
+def percentile(values, q):
+    # Nearest-rank percentile; good enough for a debug panel and needs no numpy.
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+class Timings:
+    """
+    Process-wide rolling histogram of span durations (in ms).
+    One instance is shared by all sessions, so access is guarded by a lock.
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=history_size))
+        self._local = threading.local()
+
+    # ---- per-rerun bookkeeping (each Streamlit rerun runs on its own thread) ----
+    def start_rerun(self):
+        self._local.spans = {}
+        self._local.start = time.perf_counter()
+
+    def finish_rerun(self):
+        start = getattr(self._local, "start", None)
+        if start is None:
+            return
+        spans = dict(self._local.spans)
+        spans["rerun"] = (time.perf_counter() - start) * 1000
+        self.record("rerun", spans["rerun"])
+        self._local.start = None
+
+        if os.environ.get(LOG_ENV_VAR) == "1":
+            print(json.dumps({"event": "rerun_timings", "ts": time.time(),
+                              "spans_ms": {k: round(v, 3) for k, v in spans.items()}}), flush=True)
+
+    # ---- spans ----
+    @contextmanager
+    def span(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - t0) * 1000
+            self.record(name, elapsed)
+            spans = getattr(self._local, "spans", None)
+            if spans is not None:
+                spans[name] = spans.get(name, 0.0) + elapsed
+
+    def record(self, name, elapsed_ms):
+        with self._lock:
+            self._samples[name].append(elapsed_ms)
+
+    def summary(self):
+        """
+        One row per span: count, p50, p95 and last value (all ms), "rerun" first.
+        """
+        with self._lock:
+            snapshot = {name: list(values) for name, values in self._samples.items()}
+        rows = []
+        for name in sorted(snapshot, key=lambda n: (n != "rerun", n)):
+            values = snapshot[name]
+            rows.append({
+                "span": name,
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "last_ms": round(values[-1], 2),
+            })
+        return rows
+
+
+def render_debug_sidebar(st, timings):
+    """
+    Hidden timing dashboard: only shown when the app is opened with ?debug=1.
+    """
+    if st.query_params.get("debug") != "1":
+        return
+    with st.sidebar:
+        st.write("### Rerun timings")
+        st.dataframe(timings.summary(), hide_index=True, use_container_width=True)
+        st.caption(f"Rolling window of the last {HISTORY_SIZE} samples per span.")
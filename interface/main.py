@@ -1,6 +1,15 @@
 import streamlit as st
 import pandas as pd
 import json
+import html
+import os
+import sys
+
+# Make the repo root importable so the interface shares the pipeline's text rules / models.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline.category_scorer import CategoryScorer, MODELS_FILE
+from hotel_store import HotelStore, STORE_FILE, load_real_scores
+from instrumentation import Timings, render_debug_sidebar
 
 # -----------------------------------------------------------------------------
 # 1. PAGE CONFIGURATION
@@ -11,6 +20,16 @@ st.set_page_config(
     layout="wide"
 )
 
+
+@st.cache_resource
+def get_timings():
+    # One rolling histogram per server process, shared by all sessions.
+    return Timings()
+
+
+timings = get_timings()
+timings.start_rerun()
+
 # -----------------------------------------------------------------------------
 # 2. CSS STYLING
 # -----------------------------------------------------------------------------
@@ -124,104 +143,168 @@ st.markdown("""
 @st.cache_data
 def load_and_merge_data():
     try:
-        real_df = pd.read_csv("scraped_booking_real_scores.csv")
-        pred_df = pd.read_csv("tool_input.csv")
-        if 'Staff' in real_df.columns:
-            real_df = real_df[real_df['Staff'] > 0]
-        real_df['clean_key'] = real_df['HotelName'].astype(str).str.lower().str.strip()
-        real_df = real_df.drop_duplicates(subset=['clean_key'], keep='first')
-        pred_df['clean_key'] = pred_df['hotel_id'].astype(str).apply(lambda x: x.split(',')[0].lower().strip())
-        return pd.merge(pred_df, real_df, on='clean_key', how='inner')
+        # Both sides carry the pipeline's int hotel_id (real scores via hotel_dictionary.csv).
+        real_df = load_real_scores()
+        pred_df = pd.read_csv("tool_input.csv", dtype={'hotel_id': 'int64'})
+        return pd.merge(pred_df, real_df, on='hotel_id', how='inner')
     except Exception:
         return None
 
 
-df = load_and_merge_data()
-
-# -----------------------------------------------------------------------------
-# 4. UI LOGIC
-# -----------------------------------------------------------------------------
-st.write("## Guest reviews")
-
-if df is None:
-    st.error("⚠️ Data Error.")
-    st.stop()
-
-search_query = st.text_input("Search for a hotel...", placeholder="Type name...").strip()
-matches = df[df['hotel_id'].str.contains(search_query, case=False, na=False)] if search_query else df
+@st.cache_resource
+def load_hotel_store(mtime):
+    # Preferred when tool_input.sqlite exists (built by hotel_store.py): only the search
+    # index is held in memory, hotel rows are fetched on demand.
+    # Keyed by the file's mtime, so a rebuilt store is reopened (index and rows) without a restart.
+    if mtime is None:
+        return None
+    try:
+        return HotelStore(STORE_FILE)
+    except Exception:
+        return None
 
-if not matches.empty:
-    hotel_list = matches['hotel_id'].tolist()
-    selected_hotel_id = st.selectbox("Select Hotel:", hotel_list, label_visibility="collapsed")
-    row = matches[matches['hotel_id'] == selected_hotel_id].iloc[0]
 
+@st.cache_resource
+def load_category_scorer():
+    # Loaded once per server process; the .npz is exported by the notebook after training.
     try:
-        pred_categories = json.loads(row['hotel_categories_score'])
-    except:
-        pred_categories = {}
-
-    avg_real = sum([row[c] for c in ['Staff', 'Facilities', 'Cleanliness', 'Comfort', 'Location'] if c in row]) / 5
+        return CategoryScorer.load(MODELS_FILE)
+    except Exception:
+        return None
 
-    # Header
-    c1, c2 = st.columns([1, 12])
-    with c1:
-        st.markdown(f'<div class="booking-badge">{avg_real:.1f}</div>', unsafe_allow_html=True)
-    with c2:
-        st.markdown("<div style='font-size: 16px; margin-top: 5px;'><b>Exceptional</b> · 2,086 reviews</div>",
-                    unsafe_allow_html=True)
 
-    st.write("---")
-    st.write("### Categories")
-
-    target_cats = ['staff', 'facilities', 'cleanliness', 'comfort', 'location', 'free_wifi']
-
-    for i in range(0, len(target_cats), 3):
-        cols = st.columns(3, gap="large")
-        for j in range(3):
-            if i + j < len(target_cats):
-                cat_key = target_cats[i + j]
-                real_score = row.get(cat_key.title(), 0.0)
-                label = "Free WiFi" if cat_key == 'free_wifi' else cat_key.title()
-
-                has_pred = cat_key in pred_categories
-
-                with cols[j]:
-                    # --- THE 5-COLUMN SPLIT ---
-                    # 1: Label, 2: Pred Score, 3: Icon, 4: Review Count, 5: Real Score
-                    c_label, c_pred_score, c_icon, c_text, c_real = st.columns([1.3, 0.7, 0.4, 3.0, 1.0])
-
-                    with c_label:
-                        st.markdown(f'<span class="cat-name">{label}</span>', unsafe_allow_html=True)
-
-                    if has_pred:
-                        pred_data = pred_categories[cat_key]
-                        pred_val_str = "{:.2f}".format(float(pred_data.get('score', 0)))
-                        count = pred_data.get('number_reviews', 0)
-                        pred_examples = pred_data.get('examples', [])
-
-                        reviews_html = "".join(
-                            [f'<span class="tooltip-review">“{r.replace("\"", "&quot;")}”</span>' for r in
-                             pred_examples[:3]])
-                        tooltip_html = f'<div class="tooltip">ⓘ<span class="tooltiptext"><span class="tooltip-header">Predicted Reviews:</span>{reviews_html}</span></div>'
-
-                        with c_pred_score:
-                            st.markdown(f'<span class="cat-pred-score">{pred_val_str}</span>', unsafe_allow_html=True)
-                        with c_icon:
-                            st.markdown(tooltip_html, unsafe_allow_html=True)
-                        with c_text:
-                            st.markdown(f'<span class="rev-count">(based on {count} reviews)</span>',
-                                        unsafe_allow_html=True)
-
-                    with c_real:
-                        st.markdown(f'<div class="booking-official-score">{real_score}</div>', unsafe_allow_html=True)
-
-                    # Progress Bar
-                    bar_class = "bar-green" if cat_key in ['cleanliness', 'comfort'] else "bar-blue"
-                    st.markdown(
-                        f'<div class="progress-bg"><div class="{bar_class}" style="width: {real_score * 10}%;"></div></div>',
+# The whole page runs inside try / finally: reruns that end early (st.stop() on the data error,
+# an exception) are still recorded by finish_rerun().
+try:
+    with timings.span("load"):
+        store = load_hotel_store(os.path.getmtime(STORE_FILE) if os.path.exists(STORE_FILE) else None)
+        df = store.index if store is not None else load_and_merge_data()
+
+    # -----------------------------------------------------------------------------
+    # 4. UI LOGIC
+    # -----------------------------------------------------------------------------
+    st.write("## Guest reviews")
+
+    if df is None:
+        st.error("⚠️ Data Error.")
+        st.stop()
+
+    search_query = st.text_input("Search for a hotel...", placeholder="Type name...").strip()
+    with timings.span("search_filter"):
+        matches = df[df['hotel_name'].str.contains(search_query, case=False, na=False)] if search_query else df
+
+    if not matches.empty:
+        hotel_names = dict(zip(matches['hotel_id'], matches['hotel_name']))
+        selected_hotel_id = st.selectbox("Select Hotel:", list(hotel_names), format_func=hotel_names.get,
+                                         label_visibility="collapsed")
+        with timings.span("row_lookup"):
+            if store is not None:
+                row = store.get_hotel(selected_hotel_id)
+            else:
+                row = matches[matches['hotel_id'] == selected_hotel_id].iloc[0]
+
+        with timings.span("json_parse"):
+            try:
+                pred_categories = json.loads(row['hotel_categories_score'])
+            except:
+                pred_categories = {}
+
+        avg_real = sum([row[c] for c in ['Staff', 'Facilities', 'Cleanliness', 'Comfort', 'Location'] if c in row]) / 5
+
+        # Header
+        c1, c2 = st.columns([1, 12])
+        with c1:
+            st.markdown(f'<div class="booking-badge">{avg_real:.1f}</div>', unsafe_allow_html=True)
+        with c2:
+            st.markdown("<div style='font-size: 16px; margin-top: 5px;'><b>Exceptional</b> · 2,086 reviews</div>",
                         unsafe_allow_html=True)
 
-        st.markdown('<div class="row-spacer"></div>', unsafe_allow_html=True)
-
-elif search_query:
-    st.warning("No hotels found.")
\ No newline at end of file
+        st.write("---")
+        st.write("### Categories")
+
+        target_cats = ['staff', 'facilities', 'cleanliness', 'comfort', 'location', 'free_wifi']
+
+        with timings.span("render_categories"):
+            for i in range(0, len(target_cats), 3):
+                cols = st.columns(3, gap="large")
+                for j in range(3):
+                    if i + j < len(target_cats):
+                        cat_key = target_cats[i + j]
+                        real_score = row.get(cat_key.title(), 0.0)
+                        label = "Free WiFi" if cat_key == 'free_wifi' else cat_key.title()
+
+                        has_pred = cat_key in pred_categories
+
+                        with cols[j]:
+                            # --- THE 5-COLUMN SPLIT ---
+                            # 1: Label, 2: Pred Score, 3: Icon, 4: Review Count, 5: Real Score
+                            c_label, c_pred_score, c_icon, c_text, c_real = st.columns([1.3, 0.7, 0.4, 3.0, 1.0])
+
+                            with c_label:
+                                st.markdown(f'<span class="cat-name">{label}</span>', unsafe_allow_html=True)
+
+                            if has_pred:
+                                pred_data = pred_categories[cat_key]
+                                pred_val_str = "{:.2f}".format(float(pred_data.get('score', 0)))
+                                count = pred_data.get('number_reviews', 0)
+                                pred_examples = pred_data.get('examples', [])
+
+                                reviews_html = "".join(
+                                    [f'<span class="tooltip-review">“{r.replace("\"", "&quot;")}”</span>' for r in
+                                     pred_examples[:3]])
+                                tooltip_html = f'<div class="tooltip">ⓘ<span class="tooltiptext"><span class="tooltip-header">Predicted Reviews:</span>{reviews_html}</span></div>'
+
+                                with c_pred_score:
+                                    st.markdown(f'<span class="cat-pred-score">{pred_val_str}</span>', unsafe_allow_html=True)
+                                with c_icon:
+                                    st.markdown(tooltip_html, unsafe_allow_html=True)
+                                with c_text:
+                                    st.markdown(f'<span class="rev-count">(based on {count} reviews)</span>',
+                                                unsafe_allow_html=True)
+
+                            with c_real:
+                                st.markdown(f'<div class="booking-official-score">{real_score}</div>', unsafe_allow_html=True)
+
+                            # Progress Bar
+                            bar_class = "bar-green" if cat_key in ['cleanliness', 'comfort'] else "bar-blue"
+                            st.markdown(
+                                f'<div class="progress-bg"><div class="{bar_class}" style="width: {real_score * 10}%;"></div></div>',
+                                unsafe_allow_html=True)
+
+                st.markdown('<div class="row-spacer"></div>', unsafe_allow_html=True)
+
+    elif search_query:
+        st.warning("No hotels found.")
+
+    # -----------------------------------------------------------------------------
+    # 5. LIVE REVIEW SCORING
+    # -----------------------------------------------------------------------------
+    st.write("---")
+    st.write("### Score a review")
+
+    scorer = load_category_scorer()
+
+    if scorer is None:
+        st.info(f"Add `{MODELS_FILE}` (exported by the notebook) to enable live scoring.")
+    else:
+        review_text = st.text_area("Paste a review:", placeholder="The room was spotless but the wifi kept dropping...")
+
+        if review_text.strip():
+            with timings.span("live_score"):
+                scored = scorer.score_review(review_text)
+
+            if not scored:
+                st.warning("This review does not mention any category.")
+
+            for item in scored:
+                label = "Free WiFi" if item['category'] == 'free_wifi' else item['category'].title()
+                c_label, c_score, c_segment = st.columns([1.3, 0.7, 7.0])
+                with c_label:
+                    st.markdown(f'<span class="cat-name">{label}</span>', unsafe_allow_html=True)
+                with c_score:
+                    st.markdown(f'<span class="cat-pred-score">{item["score"]:.2f}</span>', unsafe_allow_html=True)
+                with c_segment:
+                    st.markdown(f'<span class="tooltip-review">“{html.escape(item["segment"])}”</span>', unsafe_allow_html=True)
+finally:
+    timings.finish_rerun()
+    render_debug_sidebar(st, timings)
\ No newline at end of file
@@ -0,0 +1,126 @@
+from pyspark.sql import functions as F, Window
+
+from pipeline.cache_manager import cache_manager
+
+# =========================
+# CONFIG
+# =========================
+
+# A hotel is "heavy" when it has more than max(SKEW_MIN_ROWS, SKEW_FACTOR * average) reviews.
+SKEW_FACTOR = 10
+SKEW_MIN_ROWS = 5000
+
+# Heavy hotels are split into ceil(count / threshold) salts, at most MAX_SALTS.
+MAX_SALTS = 64
+
+
+# =========================
+# PRE-COUNT AND SKEW DETECTION
+# =========================
+def review_counts(df, key_cols):
+    # groupBy().count() is partially aggregated per task, so even giant hotels don't create stragglers.
+    return df.groupBy(*key_cols).agg(F.count("*").alias("number_reviews"))
+
+
+def detect_heavy_keys(counts, key_cols):
+    """
+    Returns a (small) DataFrame of heavy keys with their number of salts `_salts`.
+    Uses one cheap aggregate over the counts to find the threshold.
+    """
+    avg_count = counts.agg(F.avg("number_reviews")).first()[0] or 0
+    threshold = max(SKEW_MIN_ROWS, int(SKEW_FACTOR * avg_count))
+    return (
+        counts.filter(F.col("number_reviews") > threshold)
+              .select(*key_cols,
+                      F.least(F.lit(MAX_SALTS), F.ceil(F.col("number_reviews") / F.lit(threshold)))
+                       .cast("int").alias("_salts"))
+    )
+
+
+def add_salt(df, key_cols, heavy, text_col="text_review"):
+    """
+    Adds `_salt` to row-level data: a hash of the review text for heavy keys, 0 for the rest.
+    `heavy` only holds the heavy keys, so broadcasting it is always safe.
+    """
+    return (
+        df.join(F.broadcast(heavy), on=key_cols, how="left")
+          .withColumn("_salt", F.when(F.col("_salts").isNull(), F.lit(0))
+                                .otherwise(F.pmod(F.xxhash64(F.col(text_col)), F.col("_salts"))))
+          .drop("_salts")
+    )
+
+
+def spread_over_salts(per_key_df, key_cols, heavy):
+    """
+    Replicates a one-row-per-key table once per salt of its key,
+    so joining it with salted row-level data is balanced too.
+    """
+    return (
+        per_key_df.join(F.broadcast(heavy), on=key_cols, how="left")
+                  .withColumn("_salt", F.explode(F.sequence(F.lit(0), F.coalesce(F.col("_salts"), F.lit(1)) - 1)))
+                  .drop("_salts")
+    )
+
+
+# =========================
+# SKEW-AWARE STAGES
+# =========================
+def filter_by_review_count(df, key_cols, min_reviews, text_col="text_review"):
+    """
+    Keeps only keys with at least min_reviews rows (replaces count-over-window + filter).
+
+    Returns (salted_df, counts, heavy):
+        salted_df - matching rows, with a `_salt` column for the later aggregation
+        counts    - key_cols + number_reviews of the kept keys
+        heavy     - heavy keys and their number of salts (cached until the caller's result is consumed,
+                    see CacheManager.attach)
+    """
+    counts = review_counts(df, key_cols).filter(F.col("number_reviews") >= min_reviews)
+    caches = cache_manager(df.sparkSession)
+    heavy = caches.persist(caches.unique_name("heavy_keys"), detect_heavy_keys(counts, key_cols), materialize=False)
+
+    salted = add_salt(df, key_cols, heavy, text_col)
+    kept = spread_over_salts(counts.select(*key_cols), key_cols, heavy)
+    salted = salted.join(kept, on=key_cols + ["_salt"], how="left_semi")
+    return salted, counts, heavy
+
+
+def aggregate_scores(preds, key_cols, heavy, k=3, score_col="prediction", text_col="text_review"):
+    """
+    Per key: number_reviews, score (rounded mean, 3 digits) and the k example reviews
+    closest to the mean - computed as partial aggregates per (key, salt) followed by a merge.
+    `preds` must carry the `_salt` column from filter_by_review_count. It is read twice (means, then examples),
+    so pass a persisted DataFrame when it comes from a UDF (see score_hotel_categories).
+    number_reviews is merged from the same partial counts, so the rows under preds are never re-read for it.
+    """
+    # 1) count and mean: partial sum/count per (key, salt), then merged per key
+    partial = preds.groupBy(*key_cols, "_salt").agg(
+        F.sum(score_col).alias("_sum"), F.count("*").alias("_cnt")
+    )
+    means = partial.groupBy(*key_cols).agg(
+        F.sum("_cnt").alias("number_reviews"), (F.sum("_sum") / F.sum("_cnt")).alias("_mean")
+    )
+
+    # 2) examples: top k per (key, salt) by distance to the mean, then top k of those candidates;
+    # ties are broken by the text (like the final sort_array), so the examples don't depend on partitioning
+    w_rank = Window.partitionBy(*key_cols, "_salt").orderBy(F.col("_abs_diff").asc(), F.col(text_col).asc())
+    candidates = (
+        preds.join(spread_over_salts(means.select(*key_cols, "_mean"), key_cols, heavy), on=key_cols + ["_salt"])
+             .withColumn("_abs_diff", F.abs(F.col(score_col) - F.col("_mean")))
+             .withColumn("_rn", F.row_number().over(w_rank))
+             .filter(F.col("_rn") <= k)
+    )
+    examples = candidates.groupBy(*key_cols).agg(
+        F.slice(F.sort_array(F.collect_list(F.struct("_abs_diff", F.col(text_col).alias("_text")))), 1, k)
+         .alias("_examples")
+    )
+
+    return (
+        means.join(examples, on=key_cols, how="left")
+             .select(
+                 *key_cols,
+                 "number_reviews",
+                 F.round(F.col("_mean"), 3).alias("score"),
+                 F.coalesce(F.transform("_examples", lambda e: e["_text"]), F.array()).alias("example_reviews"),
+             )
+    )
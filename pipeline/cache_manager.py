@@ -0,0 +1,216 @@
+import threading
+import weakref
+
+from pyspark import StorageLevel
+
+# =========================
+# CONFIG
+# =========================
+
+# Serialized in memory, spilling to disk when executors run short. In PySpark StorageLevel.MEMORY_AND_DISK
+# is the serialized level (Scala's MEMORY_AND_DISK_SER); DataFrame.cache() uses MEMORY_AND_DISK_DESER,
+# which takes several times the memory for the same rows.
+STORAGE_LEVEL = StorageLevel.MEMORY_AND_DISK
+
+MB = 1024 * 1024
+
+# One manager per SparkSession, shared by the notebook and the pipeline modules.
+_managers = {}
+
+
+def cache_manager(spark):
+    """
+    The CacheManager of this SparkSession (created on first use).
+    """
+    if id(spark) not in _managers:
+        _managers[id(spark)] = CacheManager(spark)
+    return _managers[id(spark)]
+
+
+# =========================
+# STORAGE INFO
+# =========================
+def cached_bytes(spark, df):
+    """
+    (memory bytes, disk bytes) currently held by df's cache; (None, None) when unknown
+    (not cached, or the JVM internals aren't reachable, e.g. on Spark Connect).
+    """
+    try:
+        cached = spark._jsparkSession.sharedState().cacheManager().lookupCachedData(df._jdf)
+        if cached.isEmpty():
+            return None, None
+        rdd_id = cached.get().cachedRepresentation().cacheBuilder().cachedColumnBuffers().id()
+        for info in spark.sparkContext._jsc.sc().getRDDStorageInfo():
+            if info.id() == rdd_id:
+                return info.memSize(), info.diskSize()
+        return 0, 0  # nothing materialized yet
+    except Exception:
+        return None, None
+
+
+# =========================
+# MANAGER
+# =========================
+class CacheManager:
+    """
+    Persisted stage outputs with an explicit storage level and a count of their remaining consumers.
+
+        caches = cache_manager(spark)
+        df_train = caches.persist("train", df)         # persisted + materialized by one count
+        print(caches.rows("train"))                    # that count, no extra job
+        ...
+        caches.release("train")                        # after its last consumer: unpersisted
+
+    persist(..., inputs=[names]) releases each input once the new output is materialized: a stage built
+    from cached inputs frees them as soon as its own result is cached. Pipeline functions that keep an
+    intermediate cached (heavy keys, MinHash signatures) attach it to the DataFrame they return, so
+    persisting that result - or calling consumed(result) after using it - releases the intermediate too.
+    Persisting under a name that is still cached replaces it (re-running a notebook cell doesn't leak).
+    Pipeline functions name their intermediates with unique_name(), so a second call (a re-run cell,
+    a benchmark loop) never unpersists the intermediates still attached to the first call's result.
+
+    report() lists rows, memory / disk bytes and remaining consumers per stage output.
+    """
+
+    def __init__(self, spark, storage_level=STORAGE_LEVEL):
+        self.spark = spark
+        self.storage_level = storage_level
+        self.entries = {}                               # name -> entry, in persist order
+        self._attached = weakref.WeakKeyDictionary()    # result DataFrame -> names of cached intermediates
+        self._lock = threading.RLock()                  # the sweep persists from several threads
+        self._calls = 0                                 # suffix counter of unique_name()
+
+    # ---------- persisting ----------
+    def persist(self, name, df, consumers=1, inputs=(), materialize=True):
+        """
+        Persists df under name for `consumers` downstream uses and returns it.
+        materialize=True counts it right away (the count is kept, see rows()); with False the cache
+        is filled by the first action that uses it.
+        """
+        with self._lock:
+            if name in self.entries and self.entries[name]["status"] == "cached":
+                self._unpersist(self.entries.pop(name))
+            inputs = list(inputs) + self._attached.pop(df, [])
+            df = df.persist(self.storage_level)
+            entry = {
+                "name": name,
+                "df": df,
+                "consumers": consumers,
+                "inputs": inputs,
+                "rows": None,
+                "memory_bytes": None,
+                "disk_bytes": None,
+                "status": "cached",
+            }
+            self.entries[name] = entry
+
+        if materialize:
+            entry["rows"] = df.count()
+            self._measure(entry)
+            self._release_inputs(entry)
+        return df
+
+    def unique_name(self, prefix):
+        """
+        prefix#<n>, a name no earlier call got: for intermediates that stay cached for a returned DataFrame.
+        """
+        with self._lock:
+            self._calls += 1
+            return f"{prefix}#{self._calls}"
+
+    def rows(self, name):
+        return self.entries[name]["rows"]
+
+    def attach(self, result, *intermediates):
+        """
+        Marks cached intermediates (names or persisted DataFrames) as consumed by result:
+        they are released when result is persisted here, or on consumed(result). Returns result.
+        """
+        with self._lock:
+            names = [self._name_of(x) for x in intermediates]
+            self._attached.setdefault(result, []).extend(n for n in names if n)
+        return result
+
+    def consumed(self, result):
+        """
+        Call after the last action on a result that isn't persisted here (e.g. a write):
+        releases the intermediates attached to it.
+        """
+        with self._lock:
+            names = self._attached.pop(result, [])
+        for name in names:
+            self.release(name)
+
+    # ---------- releasing ----------
+    def release(self, name):
+        """
+        One consumer of name has run; unpersists it after the last one.
+        """
+        with self._lock:
+            entry = self.entries.get(name)
+            if entry is None or entry["status"] != "cached":
+                return
+            entry["consumers"] -= 1
+            if entry["consumers"] > 0:
+                return
+            self._unpersist(entry)
+
+    def unpersist_all(self):
+        with self._lock:
+            for entry in self.entries.values():
+                if entry["status"] == "cached":
+                    self._unpersist(entry)
+
+    def _unpersist(self, entry):
+        self._measure(entry)  # last size, for the report
+        entry["df"].unpersist()
+        entry["status"] = "released"
+        self._release_inputs(entry)
+
+    def _release_inputs(self, entry):
+        inputs, entry["inputs"] = entry["inputs"], []
+        for name in inputs:
+            self.release(name)
+
+    def _name_of(self, x):
+        if isinstance(x, str):
+            return x
+        return next((name for name, e in self.entries.items() if e["df"] is x and e["status"] == "cached"), None)
+
+    # ---------- report ----------
+    def _measure(self, entry):
+        memory, disk = cached_bytes(self.spark, entry["df"])
+        if memory is not None:
+            entry["memory_bytes"], entry["disk_bytes"] = memory, disk
+
+    def report(self):
+        """
+        Prints (and returns) one row per stage output: status, rows, memory / disk MB
+        (current size when cached, last measured size when released) and remaining consumers.
+        """
+        rows = []
+        with self._lock:
+            for entry in self.entries.values():
+                if entry["status"] == "cached":
+                    self._measure(entry)
+                rows.append({
+                    "name": entry["name"],
+                    "status": entry["status"],
+                    "rows": entry["rows"],
+                    "memory_mb": None if entry["memory_bytes"] is None else round(entry["memory_bytes"] / MB, 1),
+                    "disk_mb": None if entry["disk_bytes"] is None else round(entry["disk_bytes"] / MB, 1),
+                    "consumers_left": max(entry["consumers"], 0),
+                })
+
+        columns = ["name", "status", "rows", "memory_mb", "disk_mb", "consumers_left"]
+        widths = {c: max([len(c)] + [len(str(r[c])) for r in rows]) for c in columns}
+        lines = [" | ".join(c.ljust(widths[c]) for c in columns),
+                 "-+-".join("-" * widths[c] for c in columns)]
+        for r in rows:
+            lines.append(" | ".join(
+                str(r[c]).ljust(widths[c]) if c in ("name", "status") else str(r[c]).rjust(widths[c]) for c in columns
+            ))
+        held = sum(r["memory_mb"] or 0 for r in rows if r["status"] == "cached")
+        lines.append(f"[i] Still cached: {sum(r['status'] == 'cached' for r in rows)} outputs, {held:.1f} MB in memory")
+        print("\n".join(lines))
+        return rows
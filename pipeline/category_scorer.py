@@ -0,0 +1,194 @@
+import json
+import re
+
+import numpy as np
+
+from pipeline.normalization import clean_review
+from pipeline.text_rules import review_categories, trim_review_to_category
+
+# =========================
+# CONFIG
+# =========================
+
+# Default file name for the exported models (same folder convention as tool_input.csv).
+MODELS_FILE = "category_models.npz"
+
+
+# =========================
+# EXPORT (runs in the notebook, needs Spark)
+# =========================
+def category_model_arrays(models):
+    """
+    (arrays, meta) for the per-category Spark pipelines - the content of the exported .npz file.
+
+    models:
+        {category: (PipelineModel, sigma)} as built by the training loop in the notebook.
+        Each PipelineModel must be [RegexTokenizer, StopWordsRemover, Word2VecModel, LinearRegressionModel].
+    """
+    arrays = {}
+    meta = {"categories": {}}
+
+    for ctg, (model, sigma) in models.items():
+        tokenizer, remover, w2v, lr = model.stages
+
+        # Word2Vec vocabulary -> (words, matrix) so lookups become a dict + row index.
+        vectors = w2v.getVectors().collect()
+        arrays[f"{ctg}__words"] = np.array([row["word"] for row in vectors], dtype=str)
+        arrays[f"{ctg}__vectors"] = np.array([row["vector"].toArray() for row in vectors], dtype=np.float32)
+        arrays[f"{ctg}__coefficients"] = lr.coefficients.toArray().astype(np.float64)
+
+        meta["categories"][ctg] = {"intercept": float(lr.intercept), "sigma": float(sigma)}
+
+        # Tokenizer settings are identical for every category, keep the last ones seen.
+        meta["token_pattern"] = tokenizer.getPattern()
+        meta["min_token_length"] = tokenizer.getMinTokenLength()
+        meta["stop_words"] = list(remover.getStopWords())
+
+    return arrays, meta
+
+
+def export_category_models(models, path=MODELS_FILE):
+    """
+    Serializes the per-category Spark pipelines into one small .npz file
+    that can be scored with plain numpy (no Spark, no JVM).
+    """
+    arrays, meta = category_model_arrays(models)
+    arrays["meta"] = np.array(json.dumps(meta))
+    np.savez_compressed(path, **arrays)
+    print(f"[i] Exported {len(models)} category models to {path}")
+
+
+# =========================
+# LOCAL SCORER (no Spark)
+# =========================
+class CategoryScorer:
+    """
+    Numpy re-implementation of the notebook's prediction path for a single review:
+    categories -> trimmed segments -> tokenize -> averaged Word2Vec -> linear head.
+    """
+
+    def __init__(self, token_pattern, min_token_length, stop_words, heads):
+        # Java's \W is ASCII-only, so the Python pattern must be too.
+        self.token_re = re.compile(token_pattern, re.ASCII)
+        self.min_token_length = min_token_length
+        self.stop_words = frozenset(w.lower() for w in stop_words)
+        # heads: {category: (word_index, vectors, coefficients, intercept, sigma)}
+        self.heads = heads
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        heads = {}
+        for ctg, info in meta["categories"].items():
+            words = arrays[f"{ctg}__words"].tolist()
+            heads[ctg] = (
+                {w: i for i, w in enumerate(words)},
+                arrays[f"{ctg}__vectors"],
+                arrays[f"{ctg}__coefficients"],
+                info["intercept"],
+                info["sigma"],
+            )
+        return cls(meta["token_pattern"], meta["min_token_length"], meta["stop_words"], heads)
+
+    @classmethod
+    def load(cls, path=MODELS_FILE):
+        with np.load(path, allow_pickle=False) as data:
+            return cls.from_arrays(data, json.loads(str(data["meta"])))
+
+    @classmethod
+    def from_models(cls, models):
+        # Straight from the trained Spark pipelines, without going through a file.
+        return cls.from_arrays(*category_model_arrays(models))
+
+    @property
+    def categories(self):
+        return list(self.heads)
+
+    def tokenize(self, text):
+        """
+        RegexTokenizer (gaps, lowercase, minTokenLength) followed by StopWordsRemover.
+        """
+        tokens = [t for t in self.token_re.split(text.lower()) if len(t) >= self.min_token_length]
+        return [t for t in tokens if t not in self.stop_words]
+
+    def predict_category(self, text, category, clamp=True):
+        """
+        Predicted score for an already trimmed segment text (no noise is added),
+        clamped to 1..10 unless clamp=False.
+        """
+        word_index, vectors, coefficients, intercept, _ = self.heads[category]
+        tokens = self.tokenize(text)
+        if not tokens:
+            features = np.zeros(vectors.shape[1])
+        else:
+            # Spark's Word2VecModel sums known words but divides by the full sentence length.
+            rows = [word_index[t] for t in tokens if t in word_index]
+            features = vectors[rows].sum(axis=0) / len(tokens) if rows else np.zeros(vectors.shape[1])
+        prediction = float(features @ coefficients + intercept)
+        return min(10.0, max(1.0, prediction)) if clamp else prediction
+
+    def score_review(self, text):
+        """
+        Runs the full per-review path and returns one dict per relevant category:
+            {"category", "segment", "score"}
+        Categories without a trained model or without a relevant segment are skipped.
+        The raw text is cleaned first (strict_pattern, like the pipeline's clean_english_reviews),
+        so "hotel's" becomes "hotels" here too.
+        """
+        text = clean_review(text or "")
+        results = []
+        for ctg in review_categories(text):
+            if ctg not in self.heads:
+                continue
+            segment = trim_review_to_category(text, ctg)
+            if not segment:
+                continue
+            results.append({
+                "category": ctg,
+                "segment": segment,
+                "score": round(self.predict_category(segment, ctg), 2),
+            })
+        return results
+
+
+# =========================
+# BATCH SCORER (broadcast to Spark executors)
+# =========================
+class FoldedScorer:
+    """
+    Batch form of CategoryScorer for many (text, category) rows at once.
+
+    The linear head is folded into the vocabulary: score(word) = vector(word) . coefficients,
+    so a prediction is intercept + sum(score of known tokens) / number of tokens -
+    the same value as averaging the Word2Vec vectors first. One float per word and category
+    instead of a whole vector keeps the broadcast small.
+    """
+
+    def __init__(self, scorer):
+        self.token_re = scorer.token_re
+        self.min_token_length = scorer.min_token_length
+        self.stop_words = scorer.stop_words
+        # tables: {category: ({word: score}, intercept)}, sigmas: {category: sigma}
+        self.tables = {}
+        self.sigmas = {}
+        for ctg, (word_index, vectors, coefficients, intercept, sigma) in scorer.heads.items():
+            word_scores = (vectors.astype(np.float64) @ coefficients).tolist()
+            self.tables[ctg] = ({w: word_scores[i] for w, i in word_index.items()}, intercept)
+            self.sigmas[ctg] = sigma
+
+    tokenize = CategoryScorer.tokenize
+
+    def predict_batch(self, texts, categories):
+        """
+        Raw predictions (no noise, no clamping) for already trimmed texts, each scored by
+        its own category's head. Rows whose category has no model come back as NaN.
+        """
+        out = np.full(len(texts), np.nan)
+        for i, (text, ctg) in enumerate(zip(texts, categories)):
+            table = self.tables.get(ctg)
+            if table is None:
+                continue
+            word_scores, intercept = table
+            tokens = self.tokenize(text)
+            known = [word_scores[t] for t in tokens if t in word_scores]
+            out[i] = intercept + (sum(known) / len(tokens) if known else 0.0)
+        return out
@@ -0,0 +1,245 @@
+import hashlib
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# CONFIG
+# =========================
+
+# Character shingles over the normalized text (robust to whitespace changes and truncation).
+SHINGLE_SIZE = 5
+
+# MinHash signature = BANDS * ROWS_PER_BAND hash values.
+# With 16 bands of 4 rows, pairs above ~0.5 Jaccard very likely share at least one band bucket.
+BANDS = 16
+ROWS_PER_BAND = 4
+NUM_PERM = BANDS * ROWS_PER_BAND
+
+# Candidates are only dropped when their estimated Jaccard similarity reaches this value.
+SIMILARITY_THRESHOLD = 0.8
+
+SEED = 42
+
+# Review id = first 15 hex digits (60 bits) of md5(hotel + separator + text): the same value in pandas
+# and Spark, so both engines pick the same representative (the smallest id) and keep the same rows.
+ID_SEPARATOR = "\x1f"
+ID_HEX_DIGITS = 15
+
+# Spark: rounds of min-label propagation over the duplicate links (a cluster's diameter is rarely > 3).
+# Stopping early only keeps a few extra rows - the smallest id of a cluster always keeps its own label.
+MAX_COMPONENT_ITERATIONS = 20
+
+# Fixed random hash functions h_i(x) = (a_i * x + b_i) mod 2^64, top 32 bits kept.
+_rng = np.random.default_rng(SEED)
+_A = _rng.integers(1, 2 ** 32, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2 ** 32, size=NUM_PERM, dtype=np.uint64)
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+# =========================
+# SIGNATURES (plain Python / numpy)
+# =========================
+def normalize_for_shingles(text):
+    # Lowercase, keep letters/digits only, single spaces - so formatting differences disappear.
+    return _NON_ALNUM_RE.sub(" ", (text or "").lower()).strip()
+
+
+def shingles(text, k=SHINGLE_SIZE):
+    text = normalize_for_shingles(text)
+    if len(text) <= k:
+        return {text}
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def minhash_signature(text):
+    """
+    NUM_PERM-long MinHash signature (int64 values) of the review's character shingles.
+    """
+    hashed = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype=np.uint64
+    )
+    with np.errstate(over="ignore"):
+        values = (_A[:, None] * hashed[None, :] + _B[:, None]) >> np.uint64(32)
+    return values.min(axis=1).astype(np.int64)
+
+
+def band_hashes(signature):
+    # One bucket key per band (rows of the signature hashed together).
+    return [
+        zlib.crc32(signature[b * ROWS_PER_BAND:(b + 1) * ROWS_PER_BAND].tobytes())
+        for b in range(BANDS)
+    ]
+
+
+def estimated_similarity(sig_a, sig_b):
+    return float(np.mean(sig_a == sig_b))
+
+
+def review_id(key, text):
+    """
+    Stable review id, equal to review_id_col in Spark (nulls are skipped like concat_ws does).
+    """
+    value = ID_SEPARATOR.join(str(v) for v in (key, text) if not pd.isna(v))
+    return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:ID_HEX_DIGITS], 16)
+
+
+def review_id_col(key_col, text_col):
+    from pyspark.sql import functions as F
+
+    value = F.concat_ws(ID_SEPARATOR, F.col(key_col).cast("string"), F.col(text_col))
+    return F.conv(F.substring(F.md5(value), 1, ID_HEX_DIGITS), 16, 10).cast("long")
+
+
+# =========================
+# LOCAL (pandas) VERSION
+# =========================
+def drop_near_duplicates_pandas(df, text_col="text_review", key_col="hotel_id",
+                                threshold=SIMILARITY_THRESHOLD):
+    """
+    Drops near-duplicate reviews of the same hotel; same links and same kept rows as drop_near_duplicates.
+    Each (hotel, band, bucket) group is linked to its smallest review id only (star, not all pairs),
+    so the work is linear in the number of reviews; a link is only kept after the full-signature
+    similarity check passes. Linked reviews form clusters (union-find) and each cluster keeps its
+    smallest review id, so a cluster is never dropped entirely.
+    """
+    df = df.reset_index(drop=True)
+    rids = [review_id(key, text) for key, text in zip(df[key_col], df[text_col])]
+    signatures = {}
+    buckets = {}
+    for key, rid, text in zip(df[key_col], rids, df[text_col]):
+        if rid in signatures:
+            continue  # exact copy: same id, same links
+        signatures[rid] = minhash_signature(text)
+        for band, bucket in enumerate(band_hashes(signatures[rid])):
+            buckets.setdefault((key, band, bucket), []).append(rid)
+
+    parent = {}
+
+    def root(rid):
+        while parent.get(rid, rid) != rid:
+            rid = parent[rid]
+        return rid
+
+    for members in buckets.values():
+        rep = min(members)
+        for rid in members:
+            if rid != rep and estimated_similarity(signatures[rid], signatures[rep]) >= threshold:
+                a, b = root(rid), root(rep)
+                parent[max(a, b)] = min(a, b)
+
+    return df[[root(rid) == rid for rid in rids]]
+
+
+# =========================
+# SPARK VERSION
+# =========================
+_udfs = {}
+
+
+def minhash_udf():
+    """
+    pandas UDF: array<long> MinHash signature per review.
+    """
+    if "minhash" not in _udfs:
+        from pyspark.sql.functions import pandas_udf
+        from pipeline.spark_metrics import timed_udf
+
+        @pandas_udf("array<long>")
+        @timed_udf("minhash")
+        def minhash(texts: pd.Series) -> pd.Series:
+            return texts.map(minhash_signature)
+
+        _udfs["minhash"] = minhash
+    return _udfs["minhash"]
+
+
+def drop_near_duplicates(df, text_col="text_review", key_col="hotel_id", threshold=SIMILARITY_THRESHOLD):
+    """
+    MinHash LSH near-duplicate removal, blocked per hotel.
+
+    1) signature per review (pandas UDF) and a stable review id (review_id_col, same as pandas)
+    2) explode one row per band; bucket key = hash of the band's rows
+    3) every (hotel, band, bucket) group links its members to the smallest review id in it
+    4) links whose signature similarity >= threshold are kept
+    5) linked reviews form clusters (min-label propagation); each cluster keeps its smallest review id
+    Steps 2-4 are joins/aggregations over n * BANDS rows - no pairwise comparison inside a hotel;
+    step 5 only iterates over the (few) duplicate links.
+    """
+    from pyspark.sql import functions as F
+    from pipeline.cache_manager import cache_manager
+
+    caches = cache_manager(df.sparkSession)
+    cols = df.columns
+    sig = caches.persist(
+        caches.unique_name("minhash_signatures"),
+        df.withColumn("_rid", review_id_col(key_col, text_col))
+          .withColumn("_sig", minhash_udf()(F.col(text_col))),
+        materialize=False
+    )
+
+    bands = sig.select(
+        key_col, "_rid",
+        F.posexplode(F.transform(
+            F.sequence(F.lit(0), F.lit(BANDS - 1)),
+            lambda b: F.xxhash64(F.slice("_sig", b * ROWS_PER_BAND + 1, ROWS_PER_BAND))
+        )).alias("_band", "_bucket")
+    )
+
+    reps = bands.groupBy(key_col, "_band", "_bucket").agg(F.min("_rid").alias("_rep"))
+
+    links = (
+        bands.join(reps, on=[key_col, "_band", "_bucket"])
+             .filter(F.col("_rid") != F.col("_rep"))
+             .select("_rid", "_rep")
+             .distinct()
+    )
+
+    sig_a = sig.select("_rid", F.col("_sig").alias("_sig_a"))
+    sig_b = sig.select(F.col("_rid").alias("_rep"), F.col("_sig").alias("_sig_b"))
+    matches = F.size(F.filter(F.zip_with("_sig_a", "_sig_b", lambda a, b: a == b), lambda eq: eq))
+
+    verified = (
+        links.join(sig_a, on="_rid").join(sig_b, on="_rep")
+             .filter(matches / F.lit(NUM_PERM) >= F.lit(threshold))
+             .select("_rid", "_rep")
+    )
+    # Both directions, read by every propagation round.
+    edges = caches.persist(
+        caches.unique_name("near_duplicate_links"),
+        verified.select(F.col("_rid").alias("_node"), F.col("_rep").alias("_nbr"))
+                .union(verified.select(F.col("_rep").alias("_node"), F.col("_rid").alias("_nbr")))
+    )
+
+    # label = smallest review id reached so far; after convergence, the smallest id of the cluster.
+    labels_prefix = caches.unique_name("near_duplicate_labels")
+    labels_name = f"{labels_prefix}/0"
+    labels = caches.persist(
+        labels_name,
+        edges.groupBy("_node").agg(F.min(F.least("_node", "_nbr")).alias("_label"))
+    )
+    for i in range(1, MAX_COMPONENT_ITERATIONS + 1):
+        nbr_labels = labels.select(F.col("_node").alias("_nbr"), F.col("_label").alias("_nbr_label"))
+        step = (
+            edges.join(nbr_labels, on="_nbr")
+                 .groupBy("_node").agg(F.min("_nbr_label").alias("_nbr_label"))
+                 .join(labels, on="_node")
+                 .select("_node", F.least("_label", "_nbr_label").alias("_label"))
+        )
+        step = caches.persist(f"{labels_prefix}/{i}", step)
+        changed = step.join(labels.withColumnRenamed("_label", "_old"), on="_node") \
+                      .filter(F.col("_label") != F.col("_old")).count()
+        caches.release(labels_name)
+        labels, labels_name = step, f"{labels_prefix}/{i}"
+        if changed == 0:
+            break
+
+    duplicates = labels.filter(F.col("_label") != F.col("_node")).select(F.col("_node").alias("_rid"))
+
+    # sig, the links and the labels stay cached until the result is persisted (or consumed)
+    # through the cache manager.
+    result = sig.join(duplicates, on="_rid", how="left_anti").select(*cols)
+    return caches.attach(result, sig, edges, labels)
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import time
+
+from pyspark.ml import PipelineModel
+from pyspark.ml.functions import array_to_vector, vector_to_array
+from pyspark.sql import functions as F
+from pyspark.sql.utils import AnalysisException
+
+from pipeline.cache_manager import cache_manager
+
+# =========================
+# CONFIG
+# =========================
+
+# Cache root (local folder, dbfs:/ or abfss:// - all file operations go through Hadoop's FileSystem).
+# Layout: <root>/<namespace>/model_version=<version>/*.parquet   (text key -> float[vectorSize])
+#         <root>/<namespace>/model_version=<version>/_last_used   (rewritten on every use)
+#         <root>/<namespace>/_featurizer                          (saved tokenizer + stop words + Word2Vec)
+FEATURE_CACHE_DIR = "_feature_cache"
+
+# Eviction: per namespace, keep the features of this many most recently used model versions.
+KEEP_VERSIONS = 2
+
+LAST_USED_MARKER = "_last_used"
+FEATURIZER_DIR = "_featurizer"
+
+
+# =========================
+# HADOOP FILESYSTEM HELPERS
+# =========================
+def _fs_path(spark, path):
+    jvm = spark.sparkContext._jvm
+    p = jvm.org.apache.hadoop.fs.Path(path)
+    return p.getFileSystem(spark.sparkContext._jsc.hadoopConfiguration()), p
+
+
+def path_exists(spark, path):
+    fs, p = _fs_path(spark, path)
+    return fs.exists(p)
+
+
+def delete_path(spark, path):
+    fs, p = _fs_path(spark, path)
+    return fs.delete(p, True)
+
+
+def touch(spark, path, content=""):
+    # Overwrites a small marker file; its modification time is the "last used" time.
+    fs, p = _fs_path(spark, path)
+    out = fs.create(p, True)
+    out.write(bytearray(content.encode("utf-8")))
+    out.close()
+
+
+def list_dirs(spark, path):
+    """
+    (name, path) of the sub-folders of path; empty when path doesn't exist.
+    """
+    fs, p = _fs_path(spark, path)
+    if not fs.exists(p):
+        return []
+    return [(s.getPath().getName(), s.getPath().toString()) for s in fs.listStatus(p) if s.isDirectory()]
+
+
+def modification_time(spark, path):
+    fs, p = _fs_path(spark, path)
+    return fs.getFileStatus(p).getModificationTime() if fs.exists(p) else 0
+
+
+# =========================
+# KEYS
+# =========================
+def normalized_text(col):
+    # Lowercase + collapsed whitespace: RegexTokenizer("\\W+", lowercase) yields the same tokens,
+    # so texts with the same key always get the same features.
+    return F.trim(F.regexp_replace(F.lower(col), r"\s+", " "))
+
+
+def text_key(col):
+    return F.xxhash64(normalized_text(col))
+
+
+def featurizer_version(featurizer):
+    """
+    Content hash of a fitted [RegexTokenizer, StopWordsRemover, Word2VecModel] PipelineModel:
+    tokenizer settings, stop words and every word vector. Refitting on the same data gives the
+    same version; any change to the embedding gives a new one (and a fresh cache partition).
+    """
+    tokenizer, remover, w2v = featurizer.stages
+    h = hashlib.sha256()
+    h.update(json.dumps([
+        tokenizer.getPattern(), tokenizer.getMinTokenLength(), tokenizer.getGaps(), tokenizer.getToLowercase(),
+        sorted(remover.getStopWords()), remover.getCaseSensitive(), w2v.getVectorSize(),
+    ]).encode("utf-8"))
+    for row in w2v.getVectors().orderBy("word").toLocalIterator():
+        h.update(row["word"].encode("utf-8"))
+        h.update(row["vector"].toArray().tobytes())
+    return h.hexdigest()[:16]
+
+
+# =========================
+# CACHE
+# =========================
+class FeatureCache:
+    """
+    Persistent, content-addressed cache of averaged Word2Vec features.
+
+    Key: (xxhash64 of the normalized text, featurizer version). Values are fixed-size float arrays
+    stored as Parquet, one partition folder per version. features() joins a DataFrame against the
+    cache and only runs the featurizer on texts it hasn't seen, so a rerun after adding a few hundred
+    reviews only tokenizes and embeds those reviews.
+    """
+
+    def __init__(self, spark, namespace, featurizer, cache_dir=FEATURE_CACHE_DIR, keep_versions=KEEP_VERSIONS):
+        self.spark = spark
+        self.featurizer = featurizer
+        self.namespace = namespace
+        self.namespace_dir = f"{cache_dir.rstrip('/')}/{namespace}"
+        self.version = featurizer_version(featurizer)
+        self.path = f"{self.namespace_dir}/model_version={self.version}"
+        self.keep_versions = keep_versions
+
+    def _read(self):
+        # Missing folder -> None (first use of this version).
+        try:
+            return self.spark.read.parquet(self.path)
+        except AnalysisException:
+            return None
+
+    def features(self, df, text_col="text_review", features_col="features"):
+        """
+        df plus a `features_col` ml Vector column (same values as the featurizer's output).
+        Misses are computed, appended to the cache and then read back with the hits.
+
+        The keyed input is read twice (misses, then the final join), so it is persisted and counted once
+        (df's lineage, e.g. the sentiment model, runs once); it stays cached until the returned DataFrame
+        is persisted or consumed through the cache manager (see CacheManager.attach).
+        """
+        caches = cache_manager(self.spark)
+        keyed = caches.persist(caches.unique_name(f"feature_input/{self.namespace}"),
+                               df.withColumn("_text_key", text_key(F.col(text_col))))
+
+        todo = keyed.select("_text_key", text_col).dropDuplicates(["_text_key"])
+        cached = self._read()
+        if cached is not None:
+            todo = todo.join(cached.select("_text_key"), on="_text_key", how="left_anti")
+
+        new = self.featurizer.transform(todo).select(
+            "_text_key", vector_to_array(F.col("features"), "float32").alias("_features")
+        )
+        new.write.mode("append").parquet(self.path)
+        self.mark_used()
+        self.evict_stale_versions()
+
+        cached = self.spark.read.parquet(self.path)
+        result = (
+            keyed.join(cached, on="_text_key")
+                 .withColumn(features_col, array_to_vector(F.col("_features")))
+                 .drop("_text_key", "_features")
+        )
+        return caches.attach(result, keyed)
+
+    def mark_used(self):
+        touch(self.spark, f"{self.path}/{LAST_USED_MARKER}", str(time.time()))
+
+    def evict_stale_versions(self):
+        """
+        Deletes the partitions of all but the keep_versions most recently used versions
+        (never the current one). Returns the deleted versions.
+        """
+        versions = [
+            (modification_time(self.spark, f"{path}/{LAST_USED_MARKER}"), name, path)
+            for name, path in list_dirs(self.spark, self.namespace_dir)
+            if name.startswith("model_version=")
+        ]
+        versions.sort(reverse=True)
+        stale = [(name, path) for _, name, path in versions[self.keep_versions:]
+                 if name != f"model_version={self.version}"]
+        for name, path in stale:
+            delete_path(self.spark, path)
+            print(f"[i] Evicted stale feature cache {path}")
+        return [name.split("=", 1)[1] for name, _ in stale]
+
+
+# =========================
+# FEATURIZER PERSISTENCE
+# =========================
+def load_or_fit_featurizer(spark, namespace, train_df, fit, cache_dir=FEATURE_CACHE_DIR, refit=False, reuse_if=None):
+    """
+    Reuses the featurizer saved by a previous run (so cached features stay valid), or fits a new one
+    with fit(train_df) and saves it. refit=True always fits again, e.g. after a large amount of new data;
+    reuse_if(saved_featurizer) can reject a saved one (e.g. fitted with other settings).
+    """
+    path = f"{cache_dir.rstrip('/')}/{namespace}/{FEATURIZER_DIR}"
+    if not refit and path_exists(spark, path):
+        featurizer = PipelineModel.load(path)
+        if reuse_if is None or reuse_if(featurizer):
+            return featurizer
+    featurizer = fit(train_df)
+    featurizer.write().overwrite().save(path)
+    return featurizer
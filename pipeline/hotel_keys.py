@@ -0,0 +1,146 @@
+import os
+
+import pandas as pd
+
+# =========================
+# CONFIG
+# =========================
+
+# Persisted hotel dictionary: one row per hotel, hotel_id (int) <-> hotel_name (lower("name, city, country")).
+# Ids never change once assigned (new hotels get the next free ids), so every run, the local engine
+# and the interface join on the same ids. Copy it next to tool_input.csv for the interface.
+HOTEL_DICTIONARY_FILE = "hotel_dictionary.csv"
+
+NAME_SEPARATOR = ", "
+
+
+# =========================
+# HOTEL NAMES
+# =========================
+def hotel_names(df, cols):
+    """
+    lower(concat_ws(", ", cols)) for a pandas DataFrame: nulls are skipped, like Spark's concat_ws.
+    """
+    names = pd.Series("", index=df.index, dtype="string")
+    started = pd.Series(False, index=df.index)
+    for c in cols:
+        values = df[c].astype("string")
+        present = values.notna()
+        prefix = names.where(~started, names + NAME_SEPARATOR)
+        names = names.where(~present, prefix + values)
+        started |= present
+    return names.str.lower().astype(object)
+
+
+def hotel_name_col(*cols):
+    """
+    Spark column with the same hotel name as hotel_names (the notebook's concat_ws cells).
+    """
+    from pyspark.sql import functions as F
+
+    return F.lower(F.concat_ws(NAME_SEPARATOR, *[F.col(c) if isinstance(c, str) else c for c in cols]))
+
+
+# =========================
+# DICTIONARY
+# =========================
+class HotelDictionary:
+    """
+    Stable hotel name -> compact integer id mapping. Names are turned into ids once, at ingestion;
+    categorization, prediction and aggregation shuffle / sort / join on the int, and names are only
+    joined back on the final one-row-per-hotel output.
+
+        hotels = HotelDictionary()                       # loads hotel_dictionary.csv if it exists
+        df = hotels.encode(df, "hotel_name")             # Spark: hotel_name -> hotel_id (int)
+        ...
+        out = hotels.decode(summary)                     # Spark: adds hotel_name back
+        hotels.save()
+
+    ids_for / lookup / names_for are the pandas versions (local engine, streaming publisher, interface).
+    """
+
+    def __init__(self, path=HOTEL_DICTIONARY_FILE):
+        self.path = path
+        self.ids = {}       # hotel_name -> hotel_id
+        self.names = {}     # hotel_id -> hotel_name
+        if path and os.path.exists(path):
+            saved = pd.read_csv(path, dtype={"hotel_id": "int64", "hotel_name": str}, keep_default_na=False)
+            self.ids = dict(zip(saved["hotel_name"], saved["hotel_id"].tolist()))
+            self.names = {i: n for n, i in self.ids.items()}
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ---------- pandas ----------
+    def ids_for(self, names):
+        """
+        int64 ids of names (a Series or list), assigning new ids to names seen for the first time.
+        New names are numbered in sorted order, so the same input always gets the same ids.
+        """
+        names = pd.Series(names, dtype=object)
+        new = sorted(n for n in names.dropna().unique() if n not in self.ids)
+        if new:
+            next_id = max(self.names, default=-1) + 1
+            for i, name in enumerate(new, start=next_id):
+                self.ids[name] = i
+                self.names[i] = name
+            self._dirty = True
+        return names.map(self.ids).astype("int64")
+
+    def lookup(self, names):
+        """
+        Ids of names without assigning new ones (<NA> for unknown hotels).
+        """
+        return pd.Series(names, dtype=object).map(self.ids).astype("Int64")
+
+    def names_for(self, ids):
+        return pd.Series(ids).map(self.names)
+
+    def frame(self):
+        return pd.DataFrame(
+            sorted(self.names.items()), columns=["hotel_id", "hotel_name"]
+        ).astype({"hotel_id": "int64"})
+
+    def save(self, path=None):
+        """
+        Writes the dictionary (only when ids were added, or to a new path). Returns the path.
+        """
+        path = path or self.path
+        if not self._dirty and path == self.path and os.path.exists(path):
+            return path
+        # Write then rename, so an interrupted run never leaves a half-written dictionary.
+        self.frame().to_csv(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+        if path == self.path:
+            self._dirty = False
+        return path
+
+    # ---------- Spark ----------
+    def encode(self, df, name_col="hotel_name", id_col="hotel_id"):
+        """
+        Replaces name_col with the int id_col. The distinct names are collected (one row per hotel),
+        new ones get ids and the dictionary is saved; the mapping of these names is broadcast-joined,
+        so encoding never shuffles the reviews.
+        """
+        from pyspark.sql import functions as F
+
+        names = [r[0] for r in df.select(name_col).distinct().collect()]
+        mapping = pd.DataFrame({name_col: names, id_col: self.ids_for(names).to_numpy()})
+        self.save()
+        mapping_df = df.sparkSession.createDataFrame(mapping, f"`{name_col}` string, `{id_col}` long")
+        others = [c for c in df.columns if c != name_col]
+        return df.join(F.broadcast(mapping_df), on=name_col, how="inner").select(id_col, *others)
+
+    def decode(self, df, id_col="hotel_id", name_col="hotel_name"):
+        """
+        Joins the hotel names back (broadcast) next to id_col; meant for final, one-row-per-hotel outputs.
+        """
+        from pyspark.sql import functions as F
+
+        mapping_df = df.sparkSession.createDataFrame(
+            self.frame().rename(columns={"hotel_id": id_col, "hotel_name": name_col}),
+            f"`{id_col}` long, `{name_col}` string"
+        )
+        others = [c for c in df.columns if c != id_col]
+        return df.join(F.broadcast(mapping_df), on=id_col, how="left").select(id_col, name_col, *others)
@@ -0,0 +1,228 @@
+import csv
+import io
+import json
+
+from pyspark.sql.utils import AnalysisException
+from pyspark.sql.types import StructType, StructField, StringType, DoubleType
+
+# =========================
+# CONFIG
+# =========================
+
+# Azure storage layout used by the notebook.
+STORAGE_ACCOUNT = "lab94290"
+GROUP = "itay_asaf_antal"
+
+# Columnar cache folder, created next to the sources (ABFS or local root).
+# Each cache keeps the size / modification time of the CSV it was built from (SOURCE_VERSION_FILE, ignored by
+# Parquet readers since it starts with "_"); when the scrapers change the CSV, the next read rebuilds the cache.
+CACHE_DIR = "_parquet_cache"
+SOURCE_VERSION_FILE = "_source_version.json"
+
+# Explicit column types per source. CSV columns not listed here are read as strings.
+# Rating stays a string on purpose: scrapers write "N/A" and the notebook casts it later.
+SCRAPED_REVIEW_TYPES = {
+    "Rating": StringType(),
+    "Review": StringType(),
+}
+REAL_SCORE_TYPES = {
+    "Staff": DoubleType(),
+    "Facilities": DoubleType(),
+    "Cleanliness": DoubleType(),
+    "Comfort": DoubleType(),
+    "Location": DoubleType(),
+    "Free_Wifi": DoubleType(),
+}
+
+# Every raw input the notebook reads.
+#   container/path - location inside the storage account (path is also the file name under a local root)
+#   format         - "csv" sources are converted to the Parquet cache on first read
+#   types          - explicit schema (csv only)
+#   partition_by   - partition columns of the Parquet cache (enables partition pruning on filters)
+SOURCES = {
+    "scraped_booking": {
+        "container": "submissions", "path": f"{GROUP}/scraped_booking.csv",
+        "format": "csv", "types": SCRAPED_REVIEW_TYPES, "partition_by": ["Country"],
+    },
+    "scraped_expedia": {
+        "container": "submissions", "path": f"{GROUP}/scraped_expedia.csv",
+        "format": "csv", "types": SCRAPED_REVIEW_TYPES, "partition_by": ["Country"],
+    },
+    "scraped_booking_real_scores": {
+        "container": "submissions", "path": f"{GROUP}/scraped_booking_real_scores.csv",
+        "format": "csv", "types": REAL_SCORE_TYPES, "partition_by": [],
+    },
+    "origin_booking": {
+        "container": "booking", "path": "booking_1_9.parquet",
+        "format": "parquet",
+    },
+    "origin_airbnb": {
+        "container": "airbnb", "path": "airbnb_1_12_parquet",
+        "format": "parquet",
+    },
+}
+
+
+# =========================
+# LOCATIONS
+# =========================
+def configure_abfs(spark, sas_token, account=STORAGE_ACCOUNT):
+    # Tell ABFS to use SAS for the account and give the fixed token provider.
+    sas_token = sas_token.lstrip('?')
+    spark.conf.set(f"fs.azure.account.auth.type.{account}.dfs.core.windows.net", "SAS")
+    spark.conf.set(f"fs.azure.sas.token.provider.type.{account}.dfs.core.windows.net",
+                   "org.apache.hadoop.fs.azurebfs.sas.FixedSASTokenProvider")
+    spark.conf.set(f"fs.azure.sas.fixed.token.{account}.dfs.core.windows.net", sas_token)
+
+
+def source_base(name, local_root=None, account=STORAGE_ACCOUNT):
+    """
+    Folder that holds the source (and its Parquet cache).
+    With local_root set, all sources are expected directly under that folder (local stand-in for ABFS).
+    """
+    if local_root:
+        return local_root.rstrip("/")
+    src = SOURCES[name]
+    base = f"abfss://{src['container']}@{account}.dfs.core.windows.net"
+    folder = src["path"].rsplit("/", 1)[0] if "/" in src["path"] else ""
+    return f"{base}/{folder}" if folder else base
+
+
+def source_uri(name, local_root=None, account=STORAGE_ACCOUNT):
+    return f"{source_base(name, local_root, account)}/{SOURCES[name]['path'].rsplit('/', 1)[-1]}"
+
+
+def cache_uri(name, local_root=None, account=STORAGE_ACCOUNT):
+    return f"{source_base(name, local_root, account)}/{CACHE_DIR}/{name}"
+
+
+# =========================
+# SCHEMAS
+# =========================
+def read_csv_header(spark, uri):
+    # Reads only the first line to learn the column order of the file.
+    first_line = spark.read.text(uri).limit(1).first()[0]
+    return next(csv.reader(io.StringIO(first_line.lstrip("\ufeff"))))
+
+
+def schema_for_header(header, types):
+    """
+    Explicit schema in the file's own column order: listed columns get their declared type,
+    the rest are strings. Avoids inferSchema's extra full pass over the file.
+    """
+    return StructType([StructField(c, types.get(c, StringType()), True) for c in header])
+
+
+# =========================
+# READ
+# =========================
+def _read_raw_csv(spark, uri, types):
+    schema = schema_for_header(read_csv_header(spark, uri), types)
+    return (spark.read.format("csv")
+        .schema(schema)
+        .option("header", "true")
+        .option("multiLine", "true")
+        .option("escape", '"')
+        .option("quote", '"')
+        .load(uri)
+    )
+
+
+def read_source(spark, name, sas_token=None, local_root=None, columns=None, where=None, refresh=False):
+    """
+    Reads one raw source as a DataFrame.
+
+    CSV sources are converted once into a partitioned Parquet cache next to the source;
+    later reads hit the cache, so `columns` and `where` are pushed down as column pruning
+    and (partition) predicate filters instead of re-parsing multi-line CSV.
+    The cache is rebuilt when the CSV's size or modification time changed since it was built
+    (e.g. after the scrapers appended rows); refresh=True forces a rebuild.
+
+    name       : key of SOURCES
+    sas_token  : SAS token for the source's container (not needed with local_root)
+    local_root : local folder with the same file names, used instead of ABFS
+    columns    : optional list of columns to select
+    where      : optional Column / SQL string filter
+    """
+    src = SOURCES[name]
+    if sas_token and not local_root:
+        configure_abfs(spark, sas_token)
+
+    uri = source_uri(name, local_root)
+
+    if src["format"] == "parquet":
+        df = spark.read.parquet(uri)
+    else:
+        cache = cache_uri(name, local_root)
+        version = source_version(spark, uri)
+        df = None if refresh else _read_cache(spark, cache, version)
+        if df is None:
+            print(f"[i] Building Parquet cache for {name}: {cache}")
+            raw = _read_raw_csv(spark, uri, src["types"])
+            if src["partition_by"]:
+                # One task per partition value, so each partition folder gets a single file.
+                raw = raw.repartition(*src["partition_by"])
+            raw.write.mode("overwrite").partitionBy(*src["partition_by"]).parquet(cache)
+            _write_text(spark, f"{cache}/{SOURCE_VERSION_FILE}", json.dumps(version))
+            df = spark.read.parquet(cache)
+
+    if where is not None:
+        df = df.filter(where)
+    if columns is not None:
+        df = df.select(*columns)
+    return df
+
+
+def _read_cache(spark, cache, version):
+    # Missing cache folder, or built from another version of the source -> None (rebuild).
+    saved = _read_text(spark, f"{cache}/{SOURCE_VERSION_FILE}")
+    if saved is None or json.loads(saved) != version:
+        return None
+    try:
+        return spark.read.parquet(cache)
+    except AnalysisException:
+        return None
+
+
+# =========================
+# SOURCE VERSIONS (through Hadoop's FileSystem, so ABFS and local paths work the same)
+# =========================
+def _fs_path(spark, path):
+    jvm = spark.sparkContext._jvm
+    p = jvm.org.apache.hadoop.fs.Path(path)
+    return p.getFileSystem(spark.sparkContext._jsc.hadoopConfiguration()), p
+
+
+def source_version(spark, uri):
+    """
+    {"size", "modified"} of the source file (plus its ETag when the store reports one, like ABFS).
+    """
+    fs, p = _fs_path(spark, uri)
+    status = fs.getFileStatus(p)
+    version = {"size": status.getLen(), "modified": status.getModificationTime()}
+    try:
+        version["etag"] = status.getEtag()
+    except Exception:
+        pass  # plain FileStatus (local files) has no ETag
+    return version
+
+
+def _write_text(spark, path, content):
+    fs, p = _fs_path(spark, path)
+    out = fs.create(p, True)
+    out.write(bytearray(content.encode("utf-8")))
+    out.close()
+
+
+def _read_text(spark, path):
+    fs, p = _fs_path(spark, path)
+    if not fs.exists(p):
+        return None
+    stream = fs.open(p)
+    try:
+        reader = spark.sparkContext._jvm.java.io.BufferedReader(
+            spark.sparkContext._jvm.java.io.InputStreamReader(stream, "UTF-8")
+        )
+        return reader.readLine()
+    finally:
+        stream.close()
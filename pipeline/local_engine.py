@@ -0,0 +1,314 @@
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+from pipeline.category_scorer import CategoryScorer, MODELS_FILE
+from pipeline.dedup import drop_near_duplicates_pandas
+from pipeline.hotel_keys import HOTEL_DICTIONARY_FILE, HotelDictionary, hotel_names
+from pipeline.normalization import clean_english_reviews
+from pipeline.text_rules import categories_kw, review_categories, trim_review_to_category
+
+# =========================
+# CONFIG
+# =========================
+
+# Local inputs: (path, source kind). CSV and Parquet are both supported.
+# Kinds:
+#   "scraped_booking" - HotelName, City, Country, Rating, Review (booking_scraper.py output)
+#   "scraped_expedia" - Hotel Name, City, Country, Rating, Review
+#   "reviews"         - already prepared hotel_name, text_review (e.g. the sampled booking/airbnb dumps)
+INPUTS = [
+    ("scraped_booking.csv", "scraped_booking"),
+    ("scraped_expedia.csv", "scraped_expedia"),
+]
+
+# Hotels kept in the output (same filter as hotels_id_with_real_category_scores). None = keep all.
+REAL_SCORES_FILE = "scraped_booking_real_scores.csv"
+OUTPUT_FILE = "tool_input.csv"
+
+# Hotel names are turned into the dictionary's int ids as chunks are read (pipeline/hotel_keys.py);
+# spill files, buckets and aggregation only carry the int, names are joined back in the output.
+DICTIONARY_FILE = HOTEL_DICTIONARY_FILE
+
+# Temporary per-bucket spill files between the two passes (deleted at the end).
+SPILL_DIR = "local_engine_spill"
+
+# Memory bounds: rows per input chunk, number of hotel buckets, chunks in flight per worker.
+CHUNK_ROWS = 50000
+NUM_BUCKETS = 64
+NUM_WORKERS = os.cpu_count() or 1
+IN_FLIGHT_PER_WORKER = 2
+
+# Same constants as the prediction cell in the notebook.
+TOO_SMALL_REVIEWS_NUM = 20
+K = 3  # number of example reviews to keep per category
+
+# Noise added to each prediction (sigma * NOISE_SCALE, like predict_with_regression_linear_model).
+# Set NOISE_SCALE = 0 for a fully deterministic tool_input.csv.
+NOISE_SCALE = 0.5
+SEED = 42
+
+
+# =========================
+# INPUT ADAPTERS
+# =========================
+# Columns that make up the hotel name of each source kind (lower(concat_ws(", ", ...)), like the notebook).
+SOURCE_NAME_COLUMNS = {
+    "scraped_booking": ["HotelName", "City", "Country"],
+    "scraped_expedia": ["Hotel Name", "City", "Country"],
+    "reviews": ["hotel_name"],
+}
+
+
+def encode_hotels(source, chunk, dictionary):
+    # Runs in the driver process (the dictionary assigns the ids): adds the int hotel_id of every row.
+    return chunk.assign(hotel_id=dictionary.ids_for(hotel_names(chunk, SOURCE_NAME_COLUMNS[source])))
+
+
+def prepare_scraped(chunk):
+    out = pd.DataFrame({
+        "hotel_id": chunk["hotel_id"],
+        "text_review": chunk["Review"],
+        "label": chunk["Rating"],
+    })
+    return filter_valid_labels(out)
+
+
+def prepare_reviews(chunk):
+    return chunk[["hotel_id", "text_review"]].copy()
+
+
+SOURCE_ADAPTERS = {
+    "scraped_booking": prepare_scraped,
+    "scraped_expedia": prepare_scraped,
+    "reviews": prepare_reviews,
+}
+
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS):
+    """
+    Yields pandas chunks of at most chunk_rows rows without loading the whole file.
+    """
+    if path.endswith(".parquet") or os.path.isdir(path):
+        import pyarrow.dataset as ds
+        for batch in ds.dataset(path, format="parquet").to_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        # Quoted multi-line reviews are handled by pandas' default CSV dialect.
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+# =========================
+# STAGES (pandas versions of the notebook functions)
+# =========================
+def filter_valid_labels(df):
+    """
+    Keeps rows whose label casts to a number and rounds into 1..10 (like the notebook's label cell).
+    """
+    # Spark rounds half up (6.5 -> 7); pandas' round() would round half to even.
+    label = np.floor(pd.to_numeric(df["label"], errors="coerce") + 0.5)
+    df = df.assign(label=label)
+    return df[df["label"].between(1, 10)]
+
+
+def clean_and_filter_english_reviews(df, text_review_col="text_review"):
+    """
+    Same steps as the Spark version (shared kernel in normalization.py): drop nulls,
+    strip disallowed characters, keep long enough reviews that langdetect marks as English.
+    """
+    df = df.dropna(subset=[text_review_col])
+    cleaned = clean_english_reviews(df[text_review_col].astype(str))
+    return df.assign(**{text_review_col: cleaned})[cleaned.notna()]
+
+
+def bucket_of(hotel_ids, num_buckets=NUM_BUCKETS):
+    # Int ids are stable across processes, so the bucket is just the id modulo num_buckets.
+    return hotel_ids % num_buckets
+
+
+# =========================
+# PASS 1: clean chunks and spill them by hotel bucket
+# =========================
+def _prepare_chunk(source, chunk, chunk_id, spill_dir, num_buckets):
+    df = SOURCE_ADAPTERS[source](chunk)
+    df = clean_and_filter_english_reviews(df, "text_review")[["hotel_id", "text_review"]]
+    if df.empty:
+        return 0
+
+    for bucket, part in df.groupby(bucket_of(df["hotel_id"], num_buckets)):
+        bucket_dir = os.path.join(spill_dir, f"bucket={bucket}")
+        os.makedirs(bucket_dir, exist_ok=True)
+        part.to_parquet(os.path.join(bucket_dir, f"part-{chunk_id:06d}.parquet"), index=False)
+    return len(df)
+
+
+# =========================
+# PASS 2: score one bucket (all reviews of its hotels are in it)
+# =========================
+_scorer = None
+
+
+def _init_worker(models_file):
+    # Each worker process loads the exported models once.
+    global _scorer
+    _scorer = CategoryScorer.load(models_file)
+
+
+def score_bucket(df, scorer, rng, noise_scale=NOISE_SCALE):
+    """
+    Categorize -> trim -> count per (hotel_id, category) -> predict -> aggregate.
+    Returns one dict per (hotel_id, category) with score, number_reviews and example_reviews.
+    """
+    df = drop_near_duplicates_pandas(df.drop_duplicates())
+
+    # create_categories_column + explode + trim_review_to_category_relevant_text
+    rows = []
+    for hotel_id, text in zip(df["hotel_id"], df["text_review"]):
+        for ctg in review_categories(text):
+            trimmed = trim_review_to_category(text, ctg)
+            if trimmed:
+                rows.append((hotel_id, ctg, trimmed))
+    if not rows:
+        return []
+    long_df = pd.DataFrame(rows, columns=["hotel_id", "category", "text_review"])
+
+    results = []
+    for ctg in categories_kw:
+        if ctg not in scorer.heads:
+            continue
+        df_ctg = long_df[long_df["category"] == ctg]
+        counts = df_ctg.groupby("hotel_id")["text_review"].transform("size")
+        df_ctg = df_ctg[counts >= TOO_SMALL_REVIEWS_NUM]
+        if df_ctg.empty:
+            continue
+
+        sigma = scorer.heads[ctg][4]
+        # Noise is added to the raw prediction and only then clamped, like the Spark version.
+        preds = np.array([scorer.predict_category(t, ctg, clamp=False) for t in df_ctg["text_review"]])
+        preds = np.clip(preds + sigma * noise_scale * rng.standard_normal(len(preds)), 1.0, 10.0)
+        df_ctg = df_ctg.assign(prediction=preds)
+
+        for hotel_id, g in df_ctg.groupby("hotel_id", sort=True):
+            mean = g["prediction"].mean()
+            # K reviews closest to the hotel's mean prediction "show" why it got its score;
+            # ties are broken by the text, like the Spark aggregation's sort_array over (abs_diff, text).
+            examples = g.assign(abs_diff=(g["prediction"] - mean).abs()) \
+                .sort_values(["abs_diff", "text_review"], kind="stable")["text_review"].head(K).tolist()
+            results.append({
+                "hotel_id": hotel_id,
+                "category": ctg,
+                "score": round(float(mean), 3),
+                "number_reviews": len(g),
+                "example_reviews": examples,
+            })
+    return results
+
+
+def _score_bucket_dir(bucket_dir, bucket, seed, noise_scale):
+    df = pd.read_parquet(bucket_dir)
+    rng = np.random.default_rng([seed, bucket])
+    return score_bucket(df, _scorer, rng, noise_scale)
+
+
+# =========================
+# OUTPUT
+# =========================
+def hotels_summary_as_json(category_rows, dictionary, hotel_ids=None):
+    """
+    One row per hotel (hotel_id, hotel_name, hotel_categories_score) with the same JSON layout as the notebook:
+        {"<category>": {"score": ..., "number_reviews": ..., "examples": [...]}, ...}
+    Names are joined back from the hotel dictionary.
+    """
+    per_hotel = {}
+    for r in category_rows:
+        if hotel_ids is not None and r["hotel_id"] not in hotel_ids:
+            continue
+        per_hotel.setdefault(r["hotel_id"], {})[r["category"]] = {
+            "score": r["score"],
+            "number_reviews": r["number_reviews"],
+            "examples": r["example_reviews"],
+        }
+
+    out = pd.DataFrame(
+        [(h, json.dumps(cats, separators=(",", ":"), ensure_ascii=False)) for h, cats in sorted(per_hotel.items())],
+        columns=["hotel_id", "hotel_categories_score"]
+    ).astype({"hotel_id": "int64"})
+    out.insert(1, "hotel_name", dictionary.names_for(out["hotel_id"]))
+    return out
+
+
+def load_real_score_hotel_ids(path, dictionary):
+    real = pd.read_csv(path)
+    return set(dictionary.ids_for(hotel_names(real, ["HotelName", "City", "Country"])).tolist())
+
+
+# =========================
+# DRIVER
+# =========================
+def run_local_pipeline(
+        inputs=INPUTS,
+        models_file=MODELS_FILE,
+        output_file=OUTPUT_FILE,
+        real_scores_file=REAL_SCORES_FILE,
+        dictionary_file=DICTIONARY_FILE,
+        spill_dir=SPILL_DIR,
+        num_workers=NUM_WORKERS,
+        num_buckets=NUM_BUCKETS,
+        chunk_rows=CHUNK_ROWS,
+        noise_scale=NOISE_SCALE,
+        seed=SEED
+):
+    """
+    Runs clean -> categorize -> trim -> predict -> aggregate on local files and writes tool_input.csv.
+    Memory is bounded by chunk_rows (pass 1) and by the largest hotel bucket (pass 2).
+    """
+    if os.path.exists(spill_dir):
+        shutil.rmtree(spill_dir)
+    os.makedirs(spill_dir)
+    dictionary = HotelDictionary(dictionary_file)
+
+    try:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                 initargs=(models_file,)) as pool:
+            # Pass 1: bounded number of chunks in flight so the reader can't run ahead of the workers.
+            pending = set()
+            chunk_id = 0
+            total_rows = 0
+            for path, source in inputs:
+                print(f"[i] Reading {path} ({source})")
+                for chunk in iter_chunks(path, chunk_rows):
+                    if len(pending) >= num_workers * IN_FLIGHT_PER_WORKER:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        total_rows += sum(f.result() for f in done)
+                    chunk = encode_hotels(source, chunk, dictionary)
+                    pending.add(pool.submit(_prepare_chunk, source, chunk, chunk_id, spill_dir, num_buckets))
+                    chunk_id += 1
+            total_rows += sum(f.result() for f in pending)
+            print(f"[i] Pass 1 done: {total_rows} clean English reviews in {chunk_id} chunks")
+
+            # Pass 2: one task per non-empty bucket.
+            futures = [
+                pool.submit(_score_bucket_dir, os.path.join(spill_dir, name),
+                            int(name.split("=")[1]), seed, noise_scale)
+                for name in sorted(os.listdir(spill_dir))
+            ]
+            category_rows = [r for f in futures for r in f.result()]
+            print(f"[i] Pass 2 done: {len(category_rows)} (hotel, category) scores")
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    hotel_ids = load_real_score_hotel_ids(real_scores_file, dictionary) if real_scores_file else None
+    out = hotels_summary_as_json(category_rows, dictionary, hotel_ids)
+    out.to_csv(output_file, index=False)
+    dictionary.save()
+    print(f"✅ DONE – wrote {len(out)} hotels to {output_file}")
+    return out
+
+
+if __name__ == "__main__":
+    # Run from the repo root: python -m pipeline.local_engine
+    run_local_pipeline()
@@ -0,0 +1,200 @@
+import re
+import unicodedata
+
+import pandas as pd
+
+from pipeline.text_rules import MIN_REVIEW_LENGTH, strict_pattern
+
+# =========================
+# CONFIG
+# =========================
+
+# Comprehensive list of countries in lowercase for filtering (frozenset -> O(1) lookups).
+VALID_COUNTRIES = frozenset([
+    "afghanistan", "albania", "algeria", "andorra", "angola", "antigua and barbuda", "argentina", "armenia", "australia",
+    "austria", "azerbaijan", "bahamas", "bahrain", "bangladesh", "barbados", "belarus", "belgium", "belize", "benin",
+    "bhutan", "bolivia", "bosnia and herzegovina", "botswana", "brazil", "brunei", "bulgaria", "burkina faso", "burundi",
+    "cote d ivoire", "cabo verde", "cambodia", "cameroon", "canada", "central african republic", "chad", "chile", "china",
+    "colombia", "comoros", "congo", "costa rica", "croatia", "cuba", "cyprus", "czechia", "czech republic",
+    "democratic republic of the congo", "denmark", "djibouti", "dominica", "dominican republic", "ecuador", "egypt",
+    "el salvador", "equatorial guinea", "eritrea", "estonia", "eswatini", "ethiopia", "fiji", "finland", "france", "gabon",
+    "gambia", "georgia", "germany", "ghana", "greece", "grenada", "guatemala", "guinea", "guinea bissau", "guyana", "haiti",
+    "honduras", "hungary", "iceland", "india", "indonesia", "iran", "iraq", "ireland", "israel", "italy", "jamaica", "japan",
+    "jordan", "kazakhstan", "kenya", "kiribati", "kuwait", "kyrgyzstan", "laos", "latvia", "lebanon", "lesotho", "liberia",
+    "libya", "liechtenstein", "lithuania", "luxembourg", "madagascar", "malawi", "malaysia", "maldives", "mali", "malta",
+    "marshall islands", "mauritania", "mauritius", "mexico", "micronesia", "moldova", "monaco", "mongolia", "montenegro",
+    "morocco", "mozambique", "myanmar", "namibia", "nauru", "nepal", "netherlands", "new zealand", "nicaragua", "niger",
+    "nigeria", "north korea", "north macedonia", "norway", "oman", "pakistan", "palau", "palestine", "panama",
+    "papua new guinea", "paraguay", "peru", "philippines", "poland", "portugal", "qatar", "romania", "russia", "rwanda",
+    "saint kitts and nevis", "saint lucia", "saint vincent and the grenadines", "samoa", "san marino", "sao tome and principe",
+    "saudi arabia", "senegal", "serbia", "seychelles", "sierra leone", "singapore", "slovakia", "slovenia", "solomon islands",
+    "somalia", "south africa", "south korea", "south sudan", "spain", "sri lanka", "sudan", "suriname", "sweden",
+    "switzerland", "syria", "tajikistan", "tanzania", "thailand", "timor leste", "togo", "tonga", "trinidad and tobago",
+    "tunisia", "turkey", "turkmenistan", "tuvalu", "uganda", "ukraine", "united arab emirates", "united kingdom", "uk",
+    "united states", "usa", "united states of america", "uruguay", "uzbekistan", "vanuatu", "venezuela", "vietnam",
+    "yemen", "zambia", "zimbabwe"
+])
+
+# Characters kept by the review cleaner (same set as strict_pattern in text_rules.py).
+REVIEW_ALLOWED = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 \t\n\r\f\v!,.?-()")
+
+# Java's \s (used by the Spark regexes) is ASCII whitespace only.
+ASCII_WHITESPACE = set(" \t\n\r\f\v")
+
+# Code points covered by the translation tables (Latin, Greek, Cyrillic, punctuation...).
+# Anything above goes through the (slower) regex fallback.
+TABLE_RANGE = 0x3000
+
+
+# =========================
+# TRANSLATION TABLES (built once per process)
+# =========================
+def _fold_accents(text):
+    # NFD + drop combining marks (Mn), exactly what the old normalize_udf did per character.
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+def _build_country_table():
+    """
+    One str.translate table for the whole country pipeline:
+    lower -> fold accents -> anything that is not a-z / whitespace becomes a space.
+    """
+    table = {}
+    for cp in range(TABLE_RANGE):
+        ch = chr(cp)
+        out = "".join(
+            c if ("a" <= c <= "z" or c in ASCII_WHITESPACE) else " "
+            for c in _fold_accents(ch.lower())
+        )
+        if out != ch:
+            table[cp] = out
+    return table
+
+
+def _build_review_table():
+    # Deletes every character outside REVIEW_ALLOWED (strict_pattern as a lookup table).
+    return {cp: None for cp in range(TABLE_RANGE) if chr(cp) not in REVIEW_ALLOWED}
+
+
+COUNTRY_TABLE = _build_country_table()
+REVIEW_TABLE = _build_review_table()
+_NON_COUNTRY_CHARS_RE = re.compile(r"[^a-z\s]", re.ASCII)
+_NON_REVIEW_CHARS_RE = re.compile(strict_pattern, re.ASCII)
+
+
+# =========================
+# KERNELS (plain Python / pandas)
+# =========================
+def normalize_country(location):
+    """
+    Last comma-separated part of an airbnb location, lowercased, accent-folded,
+    non-letters replaced by spaces, whitespace collapsed and trimmed. None stays None.
+    """
+    if location is None:
+        return None
+    text = location.rsplit(",", 1)[-1].translate(COUNTRY_TABLE)
+    if not text.isascii():
+        text = _NON_COUNTRY_CHARS_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+def clean_review(text):
+    """
+    Removes every character strict_pattern would remove.
+    """
+    if text is None:
+        return None
+    text = text.translate(REVIEW_TABLE)
+    if not text.isascii():
+        text = _NON_REVIEW_CHARS_RE.sub("", text)
+    return text
+
+
+def detect_language(text):
+    from langdetect import detect
+    try:
+        return detect(text)
+    except Exception:
+        return "error"
+
+
+def clean_english_reviews(texts):
+    """
+    Fused cleaning kernel over a pandas Series:
+    strip disallowed characters, drop reviews shorter than MIN_REVIEW_LENGTH (Spark trim = spaces only)
+    and keep only those langdetect marks as English. Dropped rows come back as None.
+    """
+    from langdetect import DetectorFactory
+    DetectorFactory.seed = 0
+
+    cleaned = texts.map(clean_review, na_action="ignore")
+    long_enough = cleaned.notna() & (cleaned.str.strip(" ").str.len() >= MIN_REVIEW_LENGTH)
+    # langdetect only runs on rows that survived the cheap checks.
+    is_en = cleaned[long_enough].map(detect_language) == "en"
+    return cleaned.where(long_enough & is_en.reindex(cleaned.index, fill_value=False), None)
+
+
+def extract_countries(locations):
+    """
+    pandas version of the country step: returns (country, keep) columns for a Series of locations.
+    """
+    countries = locations.map(normalize_country, na_action="ignore")
+    return pd.DataFrame({
+        "country": countries,
+        "keep": countries.isna() | (countries == "") | countries.isin(VALID_COUNTRIES),
+    })
+
+
+# =========================
+# SPARK WRAPPERS (pandas UDFs over Arrow batches)
+# =========================
+_udfs = {}
+
+
+def clean_english_review_udf():
+    """
+    pandas UDF: cleaned review text, or null when the review is too short or not English.
+    """
+    if "clean_english_review" not in _udfs:
+        from pyspark.sql.functions import pandas_udf
+        from pipeline.spark_metrics import timed_udf
+
+        @pandas_udf("string")
+        @timed_udf("clean_english_review")
+        def clean_english_review(texts: pd.Series) -> pd.Series:
+            return clean_english_reviews(texts)
+
+        _udfs["clean_english_review"] = clean_english_review
+    return _udfs["clean_english_review"]
+
+
+def country_udf():
+    """
+    pandas UDF: struct<country: string, keep: boolean> from an airbnb location column.
+    """
+    if "country" not in _udfs:
+        from pyspark.sql.functions import pandas_udf
+        from pipeline.spark_metrics import timed_udf
+
+        @pandas_udf("country string, keep boolean")
+        @timed_udf("country")
+        def country(locations: pd.Series) -> pd.DataFrame:
+            return extract_countries(locations)
+
+        _udfs["country"] = country
+    return _udfs["country"]
+
+
+def clean_and_filter_english_reviews(df, text_review_col):
+    """
+    Cleans review text by removing unwanted characters and filters out short or non-English reviews.
+    Keeps only English reviews with sufficient length and returns a cleaned DataFrame.
+    One JVM <-> Python crossing per Arrow batch instead of a regex pass plus a row-at-a-time UDF.
+    """
+    from pyspark.sql import functions as F
+
+    return (
+        df.dropna(subset=[text_review_col])
+          .withColumn(text_review_col, clean_english_review_udf()(F.col(text_review_col)))
+          .filter(F.col(text_review_col).isNotNull())
+    )
@@ -0,0 +1,234 @@
+import json
+from contextlib import ExitStack, contextmanager
+
+from pipeline.cache_manager import cache_manager
+from pipeline.spark_metrics import measure, STAGE_SUM_FIELDS
+
+# =========================
+# CONFIG
+# =========================
+
+# Written by report() at the end of the run: per-stage totals + a flame graph tree.
+PROFILE_FILE = "profile_report.json"
+
+# Metrics added up when a stage runs more than once (e.g. "ingest" for every source).
+SUMMED_METRICS = ["wall_s", "num_jobs", "num_stages"] + list(STAGE_SUM_FIELDS.values())
+MAX_METRICS = ["peak_execution_memory_bytes", "peak_jvm_heap_bytes", "peak_driver_rss_bytes"]
+
+MB = 1024 * 1024
+
+
+# =========================
+# PROFILER
+# =========================
+class PipelineProfiler:
+    """
+    Per-stage breakdown of a notebook run: wall time, task time, GC, spill, shuffle and Python UDF time.
+
+    Spark is lazy, so a stage is charged for the jobs that *run* while it is open (counts, displays,
+    writes). Use checkpoint(df) at the end of a stage to compute its result there instead of in a later one.
+
+        profiler = PipelineProfiler(spark)
+        profiler.begin("clean")          # notebook style: every cell until the next begin() / end()
+        ...
+        with profiler.stage("dedup"):    # nested block, shown as a child of "clean"
+            ...
+        profiler.report()
+
+    In a notebook, begin() measures each following cell on its own (IPython pre/post_run_cell hooks):
+    nothing stays open between cells, so idle time isn't counted and each cell keeps the job group
+    Databricks gives it. Outside IPython the stage stays open until the next begin() / end().
+
+    With enabled=False every call is a no-op, except that checkpoint() still persists through the cache manager
+    (caching and releasing must not depend on profiling).
+    """
+
+    def __init__(self, spark, enabled=True):
+        self.spark = spark
+        self.enabled = enabled
+        self.totals = {}      # stage path (tuple of names) -> merged metrics
+        self._path = []       # names of the open stages, outermost first
+        self._top = None      # ExitStack of the begin() stage's open measurement (current cell)
+        self._section = None  # name of the begin() stage
+        self._shell = None    # IPython shell the cell hooks are registered on
+
+    # ---------- opening / closing stages ----------
+    def begin(self, name):
+        """
+        Ends the current top-level stage (if any) and starts `name` (from here to the end of this cell,
+        then every following cell). A name used again later (e.g. "ingest" for each source) adds to the same stage.
+        """
+        if not self.enabled:
+            return
+        self.end()
+        self._section = name
+        self._register_cell_hooks()
+        self._open_cell()
+
+    def end(self):
+        self._close_cell()
+        self._section = None
+
+    # ---------- one measurement per notebook cell ----------
+    def _register_cell_hooks(self):
+        if self._shell is not None:
+            return
+        try:
+            from IPython import get_ipython
+            self._shell = get_ipython()
+        except ImportError:
+            self._shell = None
+        if self._shell is not None:
+            self._shell.events.register("pre_run_cell", self._pre_run_cell)
+            self._shell.events.register("post_run_cell", self._post_run_cell)
+
+    def _unregister_cell_hooks(self):
+        if self._shell is not None:
+            self._shell.events.unregister("pre_run_cell", self._pre_run_cell)
+            self._shell.events.unregister("post_run_cell", self._post_run_cell)
+            self._shell = None
+
+    def _pre_run_cell(self, *info):
+        if self._section is not None:
+            self._open_cell()
+
+    def _post_run_cell(self, *result):
+        self._close_cell()
+
+    def _open_cell(self):
+        self._close_cell()
+        self._top = ExitStack()
+        self._top.enter_context(self._measured(self._section))
+
+    def _close_cell(self):
+        if self._top is not None:
+            self._top.close()
+            self._top = None
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        with self._measured(name):
+            yield
+
+    @contextmanager
+    def _measured(self, name):
+        self._path.append(name)
+        path = tuple(self._path)
+        # Registered on open, so the report lists stages in the order they started (parents first).
+        self.totals.setdefault(path, {"runs": 0, "python_udf_s": {}})
+        m = None  # stays None if measure() fails before yielding: the original error is raised, not masked
+        try:
+            with measure(self.spark, name) as m:
+                yield
+        finally:
+            self._path.pop()
+            if m is not None:
+                self._merge(path, m)
+
+    def checkpoint(self, df, name=None, consumers=1, inputs=()):
+        """
+        Persists and counts df inside the current stage through the cache manager, so its cost is charged
+        here (and later stages reuse it); name defaults to the stage path, inputs are released once it's
+        cached (see CacheManager.persist). Persists the same way when profiling is off.
+        """
+        return cache_manager(self.spark).persist(
+            name or "/".join(self._path) or "checkpoint", df, consumers=consumers, inputs=inputs
+        )
+
+    def _merge(self, path, m):
+        total = self.totals[path]
+        total["runs"] += 1
+        for key in SUMMED_METRICS:
+            total[key] = total.get(key, 0) + (m.get(key) or 0)
+        for key in MAX_METRICS:
+            total[key] = max(total.get(key, 0), m.get(key) or 0)
+        for udf, seconds in m.get("python_udf_s", {}).items():
+            total["python_udf_s"][udf] = total["python_udf_s"].get(udf, 0.0) + seconds
+
+    # ---------- report ----------
+    def summary_rows(self):
+        """
+        One row per stage path, in the order stages were first opened.
+        Metrics are the stage's own jobs (nested stages are their own rows).
+        """
+        rows = []
+        for path, t in self.totals.items():
+            if not t["runs"]:
+                continue  # still open
+            rows.append({
+                "stage": "/".join(path),
+                "runs": t["runs"],
+                "wall_s": round(t["wall_s"], 3),
+                "task_s": round(t["executor_run_time_ms"] / 1000, 3),
+                "gc_s": round(t["jvm_gc_time_ms"] / 1000, 3),
+                "python_udf_s": round(sum(t["python_udf_s"].values()), 3),
+                "spill_mb": round((t["memory_spilled_bytes"] + t["disk_spilled_bytes"]) / MB, 1),
+                "shuffle_read_mb": round(t["shuffle_read_bytes"] / MB, 1),
+                "shuffle_write_mb": round(t["shuffle_write_bytes"] / MB, 1),
+                "peak_jvm_heap_mb": round(t["peak_jvm_heap_bytes"] / MB, 1),
+                "jobs": t["num_jobs"],
+                "tasks": t["num_tasks"],
+                "udfs": {udf: round(s, 3) for udf, s in t["python_udf_s"].items()},
+            })
+        return rows
+
+    def summary_table(self):
+        columns = ["stage", "runs", "wall_s", "task_s", "gc_s", "python_udf_s", "spill_mb",
+                   "shuffle_read_mb", "shuffle_write_mb", "peak_jvm_heap_mb", "jobs", "tasks"]
+        rows = self.summary_rows()
+        widths = {c: max([len(c)] + [len(str(r[c])) for r in rows]) for c in columns}
+        lines = [" | ".join(c.ljust(widths[c]) for c in columns),
+                 "-+-".join("-" * widths[c] for c in columns)]
+        for r in rows:
+            lines.append(" | ".join(
+                str(r[c]).ljust(widths[c]) if c == "stage" else str(r[c]).rjust(widths[c]) for c in columns
+            ))
+        return "\n".join(lines)
+
+    def flame(self):
+        """
+        Flame graph tree ({"name", "value", "children"}, d3-flame-graph format) in task milliseconds,
+        i.e. cluster time rather than wall time. Python UDF and GC time are leaves of their stage
+        (capped at the stage's own task time, since they run inside its tasks).
+        """
+        root = {"name": "pipeline", "value": 0, "children": []}
+        nodes = {(): root}
+        for path, t in self.totals.items():
+            if not t["runs"]:
+                continue
+            own_ms = t["executor_run_time_ms"]
+            leaves = [{"name": f"python_udf:{udf}", "value": int(s * 1000)} for udf, s in t["python_udf_s"].items()]
+            leaves.append({"name": "jvm_gc", "value": t["jvm_gc_time_ms"]})
+            budget = own_ms
+            for leaf in leaves:
+                leaf["value"] = min(leaf["value"], budget)
+                budget -= leaf["value"]
+            node = {"name": path[-1], "value": own_ms, "wall_ms": int(t["wall_s"] * 1000),
+                    "children": [leaf for leaf in leaves if leaf["value"] > 0]}
+            nodes[path] = node
+            nodes.get(path[:-1], root)["children"].append(node)
+
+        def add_children(node):
+            # A node's value covers its own task time plus all of its nested stages.
+            node["value"] += sum(add_children(c) for c in node["children"] if "wall_ms" in c)
+            return node["value"]
+
+        add_children(root)
+        return root
+
+    def report(self, path=PROFILE_FILE):
+        """
+        Closes the open stage, prints the summary table and writes it with the flame tree to path.
+        """
+        if not self.enabled:
+            return None
+        self.end()
+        self._unregister_cell_hooks()
+        print(self.summary_table())
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"stages": self.summary_rows(), "flame": self.flame()}, f, indent=2)
+        print(f"[i] Wrote profile to {path}")
+        return path
@@ -0,0 +1,58 @@
+from pyspark.sql import functions as F, Window
+
+# =========================
+# CONFIG
+# =========================
+
+# Resolution of the hash sampler: fractions are applied in steps of 1 / HASH_BUCKETS.
+HASH_BUCKETS = 10000
+
+
+# =========================
+# HOTEL-LEVEL SAMPLING
+# =========================
+def hotel_sample_condition(key_col, fraction, seed=42):
+    """
+    Deterministic per-hotel coin flip: hash(seed, key) mod HASH_BUCKETS < fraction * HASH_BUCKETS.
+    Every row of a hotel gets the same answer, on every run and every cluster size,
+    so the sample always contains whole hotels.
+    """
+    threshold = int(round(fraction * HASH_BUCKETS))
+    bucket = F.pmod(F.xxhash64(F.lit(seed), F.col(key_col)), F.lit(HASH_BUCKETS))
+    return bucket < F.lit(threshold)
+
+
+def sample_hotels(df, key_col, fraction, seed=42):
+    """
+    Keeps about `fraction` of the distinct hotels (all of their rows).
+    Apply it right after reading, before from_json / explode, so the heavy work
+    only runs on the hotels that are kept.
+    """
+    return df.filter(hotel_sample_condition(key_col, fraction, seed))
+
+
+def explode_capped(array_col, max_items):
+    """
+    explode() over at most the first `max_items` elements of each array, so the review cap is applied
+    while exploding instead of after it. The cap is per input row: use explode_capped_per_hotel when a
+    hotel can span several rows.
+    """
+    return F.explode(F.slice(F.col(array_col), 1, max_items))
+
+
+def explode_capped_per_hotel(df, key_col, array_col, out_col, max_items):
+    """
+    Explodes array_col into out_col, keeping at most `max_items` rows per hotel even when a hotel
+    spans several input rows (e.g. two listings encoded to the same hotel_id): every array is capped
+    while exploding (explode_capped), then the exploded rows are ranked per hotel by position in their
+    array (ties broken by a hash of the element, so the kept rows don't depend on partitioning).
+    Returns df with out_col instead of array_col.
+    """
+    w = Window.partitionBy(key_col).orderBy(F.col("_pos"), F.xxhash64(F.col(out_col)))
+    return (
+        df.select("*", F.posexplode(F.slice(F.col(array_col), 1, max_items)).alias("_pos", out_col))
+          .drop(array_col)
+          .withColumn("_rn", F.row_number().over(w))
+          .filter(F.col("_rn") <= max_items)
+          .drop("_pos", "_rn")
+    )
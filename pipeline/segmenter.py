@@ -0,0 +1,102 @@
+import re
+from bisect import bisect_left
+
+# =========================
+# CONFIG
+# =========================
+
+# Character classes of the Java regex engine Spark uses for split_regex (no UNICODE_CHARACTER_CLASS):
+# \s is ASCII whitespace and "." matches anything except a line terminator.
+WHITESPACE = " \t\n\x0b\f\r"
+LINE_TERMINATORS = "\n\r\u0085\u2028\u2029"
+SENTENCE_END = ".!?"
+
+_WS = "[" + re.escape(WHITESPACE) + "]"
+
+# Every comma and every maximal whitespace run, in order: the only places a split can start.
+# Neither pattern can backtrack, so one pass over the text is linear.
+_CANDIDATE_RE = re.compile(",|" + _WS + "+")
+
+# Characters the lookahead's tempered dot can't pass (besides a whitespace run followed by "and").
+_BREAK_RE = re.compile("[," + re.escape(LINE_TERMINATORS) + "]")
+
+
+# =========================
+# SEGMENTER
+# =========================
+class ReviewSegmenter:
+    """
+    Splits a lowercased review into exactly the same pieces as re.split(split_regex, text)
+    (or Spark's split(text, split_regex)), without backtracking.
+
+    split_regex re-runs its keyword lookahead at every comma / "and", and its \\s+ alternatives
+    backtrack over every whitespace run once per position in the run, so long whitespace- or
+    comma-heavy reviews take quadratic time (a 20k-space review takes seconds).
+    Here the text is scanned once for split candidates (commas, whitespace runs), once for
+    keyword start positions and once for "stops", and each candidate is then decided with two
+    binary searches: a keyword follows in the same phrase when the first keyword start after it
+    comes before the first stop (",", a line break, or whitespace + "and" + whitespace).
+
+    Split points, tried in this order (same as split_regex):
+      1) whitespace after ".", "!", "?" (covers the "..." rule)
+      2) whitespace + contrast word + whitespace (first contrast word in list order)
+      3) (whitespace + "and" + whitespace | "," + whitespace) when a keyword follows in the same phrase
+    """
+
+    def __init__(self, contrast_words, keywords):
+        # Alternation order = list order, so the first contrast word followed by whitespace wins, as in split_regex.
+        self._contrast_re = re.compile("(?:" + "|".join(re.escape(w) for w in contrast_words) + ")" + _WS)
+        # Zero-width, so overlapping keywords ("clean sheets" / "sheets") all get their start position.
+        # A space in a keyword matches a whole whitespace run, like "\s+" in kws_regex.
+        alternation = "|".join(re.escape(kw).replace(r"\ ", _WS + "+") for kw in keywords)
+        self._keyword_start_re = re.compile(r"\b(?=(?:" + alternation + r")\b)")
+
+    def split(self, text):
+        """
+        Pieces of text between the split points, including empty ones (like re.split).
+        """
+        n = len(text)
+        candidates = [(m.start(), m.end()) for m in _CANDIDATE_RE.finditer(text)]
+        run_end = {start: end for start, end in candidates if text[start] != ","}
+
+        def and_follows(e):
+            # "and" + whitespace right after a whitespace run ending at e.
+            return e + 3 < n and text.startswith("and", e) and text[e + 3] in WHITESPACE
+
+        keyword_starts = [m.start() for m in self._keyword_start_re.finditer(text)]
+        stops = sorted(
+            [m.start() for m in _BREAK_RE.finditer(text)]
+            + [start for start, end in run_end.items() if and_follows(end)]
+        )
+
+        def keyword_follows(p):
+            # p is never inside a whitespace run, so the first stop >= p is a plain lookup.
+            k, s = bisect_left(keyword_starts, p), bisect_left(stops, p)
+            next_keyword = keyword_starts[k] if k < len(keyword_starts) else n + 1
+            next_stop = stops[s] if s < len(stops) else n
+            return next_keyword < next_stop
+
+        pieces, start = [], 0
+        for i, e in candidates:
+            if i < start:
+                continue  # inside the previous split
+            end = None
+            if text[i] == ",":
+                k = run_end.get(i + 1, i + 1)
+                if keyword_follows(k):
+                    end = k
+            elif i > 0 and text[i - 1] in SENTENCE_END:
+                end = e
+            else:
+                contrast = self._contrast_re.match(text, e)
+                if contrast:
+                    end = run_end[contrast.end() - 1]
+                elif and_follows(e):
+                    k = run_end[e + 3]
+                    if keyword_follows(k):
+                        end = k
+            if end is not None:
+                pieces.append(text[start:i])
+                start = end
+        pieces.append(text[start:])
+        return pieces
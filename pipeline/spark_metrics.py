@@ -0,0 +1,218 @@
+import functools
+import json
+import resource
+import time
+import urllib.request
+import warnings
+from contextlib import contextmanager
+
+# =========================
+# CONFIG
+# =========================
+
+# The status store is filled by an asynchronous listener: after an action returns,
+# wait up to this long for its jobs/stages to show up as finished in the REST API.
+SETTLE_TIMEOUT_S = 10.0
+SETTLE_POLL_S = 0.2
+
+# Stage fields summed per measured block (names as returned by /api/v1/.../stages).
+STAGE_SUM_FIELDS = {
+    "numTasks": "num_tasks",
+    "executorRunTime": "executor_run_time_ms",
+    "executorCpuTime": "executor_cpu_time_ns",
+    "jvmGcTime": "jvm_gc_time_ms",
+    "inputBytes": "input_bytes",
+    "shuffleReadBytes": "shuffle_read_bytes",
+    "shuffleWriteBytes": "shuffle_write_bytes",
+    "memoryBytesSpilled": "memory_spilled_bytes",
+    "diskBytesSpilled": "disk_spilled_bytes",
+}
+
+# Spark settings that make per-stage peak memory available in the REST API.
+METRICS_CONF = {
+    "spark.eventLog.logStageExecutorMetrics": "true",
+    "spark.executor.processTreeMetrics.enabled": "true",
+}
+
+
+# =========================
+# REST API
+# =========================
+def rest_get(sc, path):
+    """
+    GET on the application's monitoring REST API (needs spark.ui.enabled, the default).
+    path is relative to /api/v1/applications/<app id>.
+    """
+    if not sc.uiWebUrl:
+        raise RuntimeError("Spark UI is disabled (spark.ui.enabled=false), so the monitoring REST API isn't available")
+    url = f"{sc.uiWebUrl}/api/v1/applications/{sc.applicationId}{path}"
+    with urllib.request.urlopen(url, timeout=30) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def last_job_id(sc):
+    # Job ids only grow, so the jobs of a block are the ones with a larger id than this at its start.
+    return max((j["jobId"] for j in rest_get(sc, "/jobs")), default=-1)
+
+
+def jobs_since(sc, after_job_id, groups):
+    return [j for j in rest_get(sc, "/jobs") if j["jobId"] > after_job_id and j.get("jobGroup") in groups]
+
+
+def wait_for_jobs(sc, after_job_id, groups, timeout=SETTLE_TIMEOUT_S):
+    """
+    Returns the jobs started after after_job_id in one of groups, once none of them is still running.
+    """
+    deadline = time.time() + timeout
+    while True:
+        jobs = jobs_since(sc, after_job_id, groups)
+        running = any(j["status"] == "RUNNING" for j in jobs)
+        if not running or time.time() > deadline:
+            return jobs
+        time.sleep(SETTLE_POLL_S)
+
+
+def stages_of_jobs(sc, jobs):
+    stage_ids = {s for j in jobs for s in j.get("stageIds", [])}
+    if not stage_ids:
+        return []
+    # Skipped stages (shuffle output reused from an earlier job) did no work, so they're left out.
+    return [s for s in rest_get(sc, "/stages") if s["stageId"] in stage_ids and s["status"] != "SKIPPED"]
+
+
+def driver_peak_memory(sc):
+    # App-wide peak so far, reported by the driver's (in local mode: the only) executor heartbeat.
+    for e in rest_get(sc, "/executors"):
+        if e["id"] == "driver":
+            return e.get("peakMemoryMetrics") or {}
+    return {}
+
+
+def python_driver_peak_rss():
+    # ru_maxrss is in KiB on Linux; this is the peak of this Python process so far.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# =========================
+# PYTHON UDF TIME
+# =========================
+
+# name -> accumulator of seconds spent inside that Python UDF (summed over all tasks).
+_udf_timers = {}
+
+
+def timed_udf(name):
+    """
+    Decorator for the Python function behind a pandas UDF: adds the time spent in each call
+    to a Spark accumulator, so measure() can report Python UDF time per block.
+    Without an active SparkContext the function is returned unchanged.
+
+        @pandas_udf("string")
+        @timed_udf("clean_english_review")
+        def clean_english_review(texts: pd.Series) -> pd.Series: ...
+    """
+    def decorate(fn):
+        from pyspark import SparkContext
+
+        sc = SparkContext._active_spark_context
+        if sc is None:
+            return fn
+        if name not in _udf_timers:
+            _udf_timers[name] = sc.accumulator(0.0)
+        acc = _udf_timers[name]
+
+        # functools.wraps keeps the type hints pandas_udf uses to pick the UDF type.
+        @functools.wraps(fn)
+        def timed(*args):
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                acc.add(time.perf_counter() - start)
+        return timed
+    return decorate
+
+
+def udf_seconds():
+    # Driver-side snapshot of all UDF timers (updated when tasks finish).
+    return {name: acc.value for name, acc in _udf_timers.items()}
+
+
+# =========================
+# MEASURE A BLOCK OF SPARK WORK
+# =========================
+
+# Job ids of the measure() blocks that are open right now (outermost first): a finished nested block
+# adds its jobs to the enclosing blocks' list, so they only count the jobs they ran themselves.
+_open_blocks = []
+
+def summarize_stages(stages):
+    """
+    Sums the STAGE_SUM_FIELDS over the given stages and takes the max of their peaks.
+    """
+    out = {name: sum(s.get(field, 0) or 0 for s in stages) for field, name in STAGE_SUM_FIELDS.items()}
+    out["num_stages"] = len(stages)
+    out["peak_execution_memory_bytes"] = max([s.get("peakExecutionMemory", 0) or 0 for s in stages], default=0)
+    out["peak_jvm_heap_bytes"] = max(
+        [(s.get("peakExecutorMetrics") or {}).get("JVMHeapMemory", 0) for s in stages], default=0
+    )
+    return out
+
+
+def _add_job_metrics(sc, metrics, after_job_id, groups, nested_job_ids):
+    jobs = [j for j in wait_for_jobs(sc, after_job_id, groups) if j["jobId"] not in nested_job_ids]
+    for outer in _open_blocks:
+        outer.extend(j["jobId"] for j in jobs)
+    metrics["num_jobs"] = len(jobs)
+    metrics.update(summarize_stages(stages_of_jobs(sc, jobs)))
+
+    # Fall back to the app-wide JVM peak when per-stage executor metrics aren't enabled.
+    if not metrics["peak_jvm_heap_bytes"]:
+        metrics["peak_jvm_heap_bytes"] = driver_peak_memory(sc).get("JVMHeapMemory", 0)
+
+
+@contextmanager
+def measure(spark, name):
+    """
+    Fills the yielded dict with wall time, Python UDF time and the summed stage metrics of every job
+    the block triggered: the jobs started while it ran under the caller's job group. The job group
+    is left alone (Databricks sets one per command and cancels a cell through it), so keep a block
+    inside one notebook cell. Blocks can be nested: the outer block only counts the jobs it ran itself.
+    When the REST API can't be reached (UI disabled, port blocked) only wall time, Python UDF time and
+    the driver RSS are filled, with a warning; the measured code itself is never affected.
+
+        with measure(spark, "trim") as m:
+            out.write.format("noop").mode("overwrite").save()
+        print(m["wall_s"], m["shuffle_write_bytes"])
+    """
+    sc = spark.sparkContext
+    metrics = {"name": name}
+    groups = {sc.getLocalProperty("spark.jobGroup.id")}
+    try:
+        after_job_id = last_job_id(sc)
+    except Exception as e:
+        warnings.warn(f"Spark job metrics unavailable ({e}); measuring wall time only")
+        after_job_id = None
+    nested_job_ids = []
+    _open_blocks.append(nested_job_ids)
+    udf_before = udf_seconds()
+    start = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics["wall_s"] = time.perf_counter() - start
+        _open_blocks.remove(nested_job_ids)
+        groups.add(sc.getLocalProperty("spark.jobGroup.id"))
+
+        if after_job_id is not None:
+            try:
+                _add_job_metrics(sc, metrics, after_job_id, groups, nested_job_ids)
+            except Exception as e:
+                warnings.warn(f"Spark job metrics unavailable ({e}); measuring wall time only")
+        metrics["peak_driver_rss_bytes"] = python_driver_peak_rss()
+
+        udf_after = udf_seconds()
+        metrics["python_udf_s"] = {
+            udf: seconds - udf_before.get(udf, 0.0)
+            for udf, seconds in udf_after.items() if seconds > udf_before.get(udf, 0.0)
+        }
@@ -0,0 +1,393 @@
+import re
+
+import pandas as pd
+from pyspark.ml import Pipeline, PipelineModel
+from pyspark.ml.feature import RegexTokenizer, StopWordsRemover, Word2Vec
+from pyspark.ml.regression import LinearRegression
+from pyspark.sql import functions as F
+from pyspark.sql.functions import pandas_udf
+
+from pipeline.aggregation import filter_by_review_count, aggregate_scores
+from pipeline.cache_manager import cache_manager
+from pipeline.category_scorer import CategoryScorer, FoldedScorer
+from pipeline.feature_cache import FeatureCache, load_or_fit_featurizer, FEATURE_CACHE_DIR
+from pipeline.spark_metrics import timed_udf
+from pipeline.text_rules import categories_kw, split_segments
+
+# =========================
+# CONFIG
+# =========================
+
+# Same constants as the prediction cell in the notebook.
+TOO_SMALL_REVIEWS_NUM = 20
+K = 3  # number of example reviews to keep per category
+
+# Strong words that move the score by 4 instead of 2 (see adjust_review_score).
+hard_neg_re = r"(terrible|awful|horrible|disgusting|unacceptable|worst|broken|ridiculous|appalling)"
+hard_pos_re = r"(amazing|excellent|perfect|outstanding|fantastic|wonderful|exceptional|incredible)"
+
+# Word2Vec + LinearRegression settings of the category models (pipeline/sweep.py searches around them).
+DEFAULT_PARAMS = {
+    "vector_size": 50,
+    "window_size": 3,
+    "min_count": 2,
+    "reg_param": 0.05,
+    "elastic_net_param": 0.0,
+}
+W2V_PARAMS = ("vector_size", "window_size", "min_count")
+LR_PARAMS = ("reg_param", "elastic_net_param")
+
+
+# =========================
+# CATEGORIZE AND TRIM
+# =========================
+def create_categories_column(df, text_review_col):
+    """
+    Creates a 'categories' array column for each review.
+    Each review is assigned to all categories whose keywords appear in the text.
+    If no category matches, take out the review and not use it.
+    """
+    txt = F.lower(F.col(text_review_col))
+
+    cat_cols = []
+    for ctg, kws in categories_kw.items():
+        is_ctg = None
+        for k in kws:
+            cond = txt.contains(k)
+            is_ctg = cond if is_ctg is None else (is_ctg | cond)
+
+        cat_cols.append(F.when(is_ctg, F.lit(ctg)))
+
+    df = df.withColumn("categories_raw", F.array(*cat_cols))
+    df = df.withColumn(
+        "categories",
+        F.expr("filter(categories_raw, x -> x is not null)")
+    ).drop("categories_raw")
+
+    return df.filter(F.size("categories") > 0)
+
+
+def category_hits_sql(kws):
+    # SQL predicate on a segment `s`: true when it contains one of the keywords as whole words.
+    patterns = []
+    for k in [k.lower() for k in kws]:
+        k_esc = re.escape(k)
+        k_esc = k_esc.replace(r"\ ", r"\s+")
+        patterns.append(f"rlike(s, '\\\\b{k_esc}\\\\b')")
+
+    return " OR ".join(patterns) if patterns else "false"
+
+
+_udfs = {}
+
+
+def split_segments_udf():
+    """
+    pandas UDF: pieces of a lowercased review at the split_regex split points.
+    Same result as split(text, split_regex), but linear in the review length
+    (the regex is quadratic on long comma- or whitespace-heavy reviews).
+    """
+    if "split_segments" not in _udfs:
+        @pandas_udf("array<string>")
+        @timed_udf("split_segments")
+        def split_review_segments(texts: pd.Series) -> pd.Series:
+            return texts.map(lambda t: None if t is None else split_segments(t))
+
+        _udfs["split_segments"] = split_review_segments
+    return _udfs["split_segments"]
+
+
+def _keep_relevant_segments(df, hits_sql):
+    # Split -> keep the segments matching hits_sql -> join them back into text_review.
+    return (
+        df
+        .withColumn("_segments", split_segments_udf()(F.lower("text_review")))
+        .withColumn("_segments", F.expr("filter(_segments, s -> trim(s) <> '')"))
+        .withColumn(
+            "_hits",
+            F.expr(f"filter(_segments, s -> ({hits_sql}))")
+        )
+        .withColumn(
+            "_hits",
+            F.expr("transform(_hits, s -> regexp_replace(trim(s), '[.!?]+$', ''))")
+        )
+        .withColumn("text_review", F.concat_ws(". ", F.col("_hits")))
+        .drop("_segments", "_hits")
+        .filter(F.length("text_review") > 0)
+    )
+
+
+def trim_review_to_category_relevant_text(df):
+    """
+    First splits each review into chunks using sentence punctuation and contrast words.
+    Then conditionally splits on "and"/commas only when the following phrase contains a category keyword, and keeps only the chunks relevant to each category.
+    """
+    category_dfs = {}
+
+    for ctg, kws in categories_kw.items():
+        hits_sql = category_hits_sql(kws)
+
+        category_dfs[ctg] = (
+            _keep_relevant_segments(df.filter(F.col("category") == ctg), hits_sql)
+            .select(*[c for c in ["hotel_id", "hotel_name", "text_review", "label"] if c in df.columns])
+        )
+
+    return category_dfs
+
+
+def trim_long_to_category_relevant_text(df):
+    """
+    Same trimming as trim_review_to_category_relevant_text, but in one pass over the long
+    (hotel_id, category, text_review) table: the keyword predicate is picked per row by its category.
+    Keeps the category column.
+    """
+    cases = " ".join(
+        f"WHEN '{ctg}' THEN ({category_hits_sql(kws)})" for ctg, kws in categories_kw.items()
+    )
+    hits_sql = f"CASE category {cases} ELSE false END"
+
+    return (
+        _keep_relevant_segments(df.filter(F.col("category").isin(list(categories_kw))), hits_sql)
+        .select(*[c for c in ["hotel_id", "hotel_name", "category", "text_review", "label"] if c in df.columns])
+    )
+
+
+# =========================
+# SCORE ADJUSTMENT
+# =========================
+def adjust_review_score(df):
+    df_scored = (
+        df
+        .withColumn("is_hard_neg", (F.col("sentiment") == "negative") & F.lower(F.col("text_review")).rlike(hard_neg_re))
+        .withColumn("is_hard_pos", (F.col("sentiment") == "positive") & F.lower(F.col("text_review")).rlike(hard_pos_re))
+
+        # apply scoring rules (hard first, then regular)
+        .withColumn(
+            "rating_adj_raw",
+            F.when(F.col("is_hard_neg") & (F.col("label") >= 6), F.col("label") - F.lit(4.0))
+            .when(F.col("is_hard_pos") & (F.col("label") <= 6), F.col("label") + F.lit(4.0))
+            .when((F.col("sentiment") == "negative") & (F.col("label") >= 6), F.col("label") - F.lit(2.0))
+            .when((F.col("sentiment") == "positive") & (F.col("label") <= 6), F.col("label") + F.lit(2.0))
+            .otherwise(F.col("label"))
+        )
+        # clamp to valid range
+        .withColumn("label", F.least(F.lit(10.0), F.greatest(F.lit(1.0), F.col("rating_adj_raw"))))
+        .drop("rating_adj_raw")
+    )
+    return df_scored.select("text_review", "label")
+
+
+# =========================
+# TRAIN
+# =========================
+def featurization_stages(
+        vector_size=DEFAULT_PARAMS["vector_size"],
+        window_size=DEFAULT_PARAMS["window_size"],
+        min_count=DEFAULT_PARAMS["min_count"]
+):
+    """
+    Text -> features part of the category model: tokenize, remove stop words, average Word2Vec embeddings.
+    """
+    tokenizer = RegexTokenizer(
+        inputCol="text_review",
+        outputCol="tokens",
+        pattern="\\W+",
+        minTokenLength=2
+    )
+
+    remover = StopWordsRemover(
+        inputCol="tokens",
+        outputCol="filtered_tokens"
+    )
+
+    w2v = Word2Vec(
+        inputCol="filtered_tokens",
+        outputCol="features",
+        vectorSize=vector_size,
+        windowSize=window_size,
+        minCount=min_count
+    )
+    return [tokenizer, remover, w2v]
+
+
+def regression_stage(reg_param=DEFAULT_PARAMS["reg_param"], elastic_net_param=DEFAULT_PARAMS["elastic_net_param"]):
+    return LinearRegression(
+        featuresCol="features",
+        labelCol="label",
+        predictionCol="prediction",
+        regParam=reg_param,                  # regularization קל לריאליזם
+        elasticNetParam=elastic_net_param    # 0.0 = Ridge-style
+    )
+
+
+def train_regression_linear_model(train_df):
+    """
+    Trains a text-based linear regression model using Word2Vec embeddings.
+    The function tokenizes review text, removes stop words, learns word embeddings,
+    and fits a regularized linear regression to predict numeric review scores.
+
+    train_df:
+        text_review : string
+        label       : double
+    """
+    pipeline = Pipeline(stages=featurization_stages() + [regression_stage()])
+    model = pipeline.fit(train_df)
+    return model
+
+
+def train_category_model_cached(
+        spark,
+        category,
+        train_df,
+        cache_dir=FEATURE_CACHE_DIR,
+        refit_embeddings=False,
+        params=None
+):
+    """
+    Same model as train_regression_linear_model + estimate_noise_sigma, but the Word2Vec features
+    come from the persistent feature cache: the featurizer saved by the previous run is reused
+    (unless refit_embeddings, or it was fitted with other Word2Vec settings than params),
+    and only reviews not seen before are tokenized and embedded.
+    params: DEFAULT_PARAMS-style settings, e.g. picked by pipeline/sweep.py (missing keys = defaults).
+    Returns (model, sigma) - the model is a regular [tokenizer, remover, w2v, lr] PipelineModel.
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    w2v_params = {k: params[k] for k in W2V_PARAMS}
+
+    def same_settings(featurizer):
+        w2v = featurizer.stages[-1]
+        return (w2v.getVectorSize(), w2v.getWindowSize(), w2v.getMinCount()) == tuple(w2v_params.values())
+
+    featurizer = load_or_fit_featurizer(
+        spark, category, train_df, Pipeline(stages=featurization_stages(**w2v_params)).fit,
+        cache_dir=cache_dir, refit=refit_embeddings, reuse_if=same_settings,
+    )
+    cache = FeatureCache(spark, category, featurizer, cache_dir=cache_dir)
+    caches = cache_manager(spark)
+    features_name = f"train_features/{category}"
+    features = caches.persist(features_name, cache.features(train_df.select("text_review", "label")))
+
+    lr_model = regression_stage(**{k: params[k] for k in LR_PARAMS}).fit(features)
+    model = PipelineModel(stages=featurizer.stages + [lr_model])
+    # Residuals on the cached features - no second pass through the featurizer.
+    sigma = estimate_noise_sigma(lr_model, features)
+    caches.release(features_name)
+    return model, sigma
+
+
+def estimate_noise_sigma(model, train_df):
+    """
+    Estimates the standard deviation of the model's prediction error (noise)
+        by computing residuals (label - prediction) on the training data.
+    This value is later used to add realistic Gaussian noise to predictions.
+    """
+    preds = model.transform(train_df)
+    preds = preds.withColumn("residual", F.col("label") - F.col("prediction"))
+    sigma = (
+        preds
+        .agg(F.stddev("residual").alias("sigma"))
+        .collect()[0]["sigma"]
+    )
+    return float(sigma) if sigma is not None else 0.0
+
+
+# =========================
+# PREDICT AND AGGREGATE
+# =========================
+def predict_with_regression_linear_model(model, df, sigma, noise_scale=0.5):
+    """
+    Generates predictions using a trained model and adds Gaussian noise
+    to simulate realistic variability in text-based score predictions.
+
+    noise_scale:
+        1.0 = realistic noise level
+        <1  = reduced noise
+        >1  = increased noise
+    """
+    preds = model.transform(df)
+    preds = preds.withColumn(
+        "prediction",
+        F.col("prediction") + F.lit(sigma * noise_scale) * F.randn()
+    )
+    preds = preds.withColumn(
+        "prediction",
+        F.greatest(F.lit(1.0), F.least(F.col("prediction"), F.lit(10.0)))
+    )
+    return preds
+
+
+def category_prediction_udf(folded_bc):
+    """
+    pandas UDF (category, text_review) -> raw prediction of that category's model,
+    using the broadcast FoldedScorer (vocab tables + linear heads of every category).
+    """
+    @pandas_udf("double")
+    @timed_udf("category_scorer")
+    def predict(categories: pd.Series, texts: pd.Series) -> pd.Series:
+        return pd.Series(folded_bc.value.predict_batch(texts.tolist(), categories.tolist()), index=texts.index)
+
+    return predict
+
+
+def predict_all_categories(df, folded_bc, noise_scale=0.5):
+    """
+    Multi-category version of predict_with_regression_linear_model for a long
+    (category, text_review, ...) table: one tokenization and one UDF pass for all categories,
+    then the same per-category Gaussian noise and clamping to 1..10.
+    """
+    folded = folded_bc.value
+    noise_sd = F.create_map(*[x for ctg, sigma in folded.sigmas.items()
+                              for x in (F.lit(ctg), F.lit(sigma * noise_scale))])
+    preds = df.withColumn("prediction", category_prediction_udf(folded_bc)(F.col("category"), F.col("text_review")))
+    preds = preds.withColumn(
+        "prediction",
+        F.col("prediction") + noise_sd[F.col("category")] * F.randn()
+    )
+    preds = preds.withColumn(
+        "prediction",
+        F.greatest(F.lit(1.0), F.least(F.col("prediction"), F.lit(10.0)))
+    )
+    return preds
+
+
+def score_hotel_categories(test_long, models, min_reviews=TOO_SMALL_REVIEWS_NUM, k=K, noise_scale=0.5):
+    """
+    Keeps (hotel, category) pairs with at least min_reviews reviews, predicts noisy scores with each
+    category's model and aggregates per (hotel_id, category) into score, number_reviews and k examples.
+
+    test_long: trimmed (hotel_id, category, text_review) rows, e.g. from trim_long_to_category_relevant_text.
+    models: {category: (PipelineModel, sigma)} from the training loop.
+
+    All categories go through one count, one prediction UDF and one aggregation
+    (instead of one model transform, groupBy and union per category).
+    """
+    folded = FoldedScorer(CategoryScorer.from_models(models))
+    folded_bc = test_long.sparkSession.sparkContext.broadcast(folded)
+
+    key_cols = ["hotel_id", "category"]
+    caches = cache_manager(test_long.sparkSession)
+    # The trimmed rows are read by the count / skew detection and again by the prediction: cached (by the
+    # first of those jobs) so the split / trim UDFs under test_long run once; released once preds is cached.
+    reviews_name = caches.unique_name("category_reviews")
+    df = caches.persist(
+        reviews_name,
+        test_long.filter(F.col("category").isin(list(folded.tables))).select(*key_cols, "text_review"),
+        materialize=False
+    )
+
+    # Save hotel's category information only if there are enough reviews
+    df_enough_reviews, _, heavy = filter_by_review_count(df, key_cols, min_reviews)
+
+    # The aggregation reads the predictions twice (partial means, then the examples closest to the mean):
+    # cached once, so the prediction UDF runs once per review and both use the same noisy predictions.
+    preds = caches.persist(
+        caches.unique_name("predictions"), predict_all_categories(df_enough_reviews, folded_bc, noise_scale),
+        inputs=[reviews_name]
+    )
+
+    # count, mean score and k reviews closest to the mean ("show" why they got their score)
+    result = aggregate_scores(preds, key_cols, heavy, k=k).select(
+        "hotel_id", "category", "score", "example_reviews", "number_reviews"
+    )
+    # The predictions and heavy keys stay cached until the result is persisted (or consumed) through the cache manager.
+    return caches.attach(result, preds, heavy)
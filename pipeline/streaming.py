@@ -0,0 +1,263 @@
+import json
+import os
+
+import pandas as pd
+
+from pipeline.category_scorer import CategoryScorer, FoldedScorer, MODELS_FILE
+from pipeline.ingestion import schema_for_header, SCRAPED_REVIEW_TYPES
+from pipeline.hotel_keys import HOTEL_DICTIONARY_FILE, HotelDictionary, hotel_name_col
+from pipeline.local_engine import hotels_summary_as_json, load_real_score_hotel_ids
+from pipeline.normalization import clean_and_filter_english_reviews
+from pipeline.stages import (
+    create_categories_column,
+    trim_long_to_category_relevant_text,
+    predict_all_categories,
+    TOO_SMALL_REVIEWS_NUM,
+    K,
+)
+
+# =========================
+# CONFIG
+# =========================
+
+# One folder per source; scrapers drop finished CSV part files into them (see STREAM_DIR in the scrapers).
+# Files whose names start with "." or "_" are ignored, so parts can be written under a temp name and renamed.
+#   columns      - CSV header of the part files (same layout as the scraper output)
+#   name_column  - hotel name column used for hotel_name (like the notebook's concat_ws cells)
+STREAM_SOURCES = {
+    "scraped_booking": {
+        "dir": os.path.join("stream_input", "scraped_booking"),
+        "columns": ["HotelName", "Country", "City", "Rating", "Review"],
+        "name_column": "HotelName",
+    },
+    "scraped_expedia": {
+        "dir": os.path.join("stream_input", "scraped_expedia"),
+        "columns": ["Hotel Name", "City", "Country", "Rating", "Review"],
+        "name_column": "Hotel Name",
+    },
+}
+
+# Published outputs: the same tool_input.csv layout as the notebook, plus the long
+# (hotel_name, category) table it is built from (reloaded when the job restarts).
+OUTPUT_FILE = "tool_input.csv"
+SCORES_FILE = "stream_category_scores.parquet"
+
+# New hotels show up in the middle of the stream, so the state is keyed by hotel name and the publisher
+# (on the driver) maps names to the hotel dictionary's int ids when it writes tool_input.csv.
+DICTIONARY_FILE = HOTEL_DICTIONARY_FILE
+
+# Only hotels with real category scores are published, like the notebook. None = publish every hotel.
+REAL_SCORES_FILE = None
+
+CHECKPOINT_DIR = "stream_checkpoint"
+TRIGGER_INTERVAL = "10 seconds"
+MAX_FILES_PER_TRIGGER = 50
+
+# The same review re-scraped within this delay is dropped (dedup state is kept this long).
+DEDUP_WATERMARK = "7 days"
+
+# Per (hotel, category) state keeps the running sum/count and this many example candidates,
+# the ones closest to the running mean (the batch version picks the K closest out of all reviews).
+MAX_CANDIDATES = 20
+
+NOISE_SCALE = 0.5
+
+
+# =========================
+# STATE (plain Python)
+# =========================
+def merge_category_state(state, predictions, texts, max_candidates=MAX_CANDIDATES):
+    """
+    Folds new (prediction, text) pairs into a (count, total, candidates_json) state tuple.
+    Returns the new state tuple and the current mean.
+    """
+    count, total, candidates_json = state if state is not None else (0, 0.0, "[]")
+    candidates = json.loads(candidates_json)
+
+    count += len(predictions)
+    total += float(sum(predictions))
+    candidates.extend([float(p), t] for p, t in zip(predictions, texts))
+
+    mean = total / count if count else 0.0
+    candidates.sort(key=lambda c: abs(c[0] - mean))
+    return (count, total, json.dumps(candidates[:max_candidates])), mean
+
+
+def update_category_scores(key, batches, state):
+    """
+    applyInPandasWithState function for one (hotel_name, category):
+    updates the bounded state and emits the current score row.
+    """
+    new_state = state.get if state.exists else None
+    mean = 0.0
+    for pdf in batches:
+        new_state, mean = merge_category_state(new_state, pdf["prediction"].tolist(), pdf["text_review"].tolist())
+    state.update(new_state)
+
+    count, _, candidates_json = new_state
+    yield pd.DataFrame({
+        "hotel_name": [key[0]],
+        "category": [key[1]],
+        "number_reviews": [count],
+        "score": [round(mean, 3)],
+        "example_reviews": [[text for _, text in json.loads(candidates_json)[:K]]],
+    })
+
+
+OUTPUT_SCHEMA = "hotel_name string, category string, number_reviews long, score double, example_reviews array<string>"
+STATE_SCHEMA = "count long, total double, candidates string"
+
+
+# =========================
+# PUBLISHER (runs on the driver, once per micro-batch)
+# =========================
+class ToolInputPublisher:
+    """
+    foreachBatch sink: merges the updated (hotel_name, category) rows into the latest scores
+    and atomically rewrites tool_input.csv, so the interface always reads a complete file.
+    """
+
+    def __init__(self, output_file=OUTPUT_FILE, scores_file=SCORES_FILE,
+                 real_scores_file=REAL_SCORES_FILE, min_reviews=TOO_SMALL_REVIEWS_NUM,
+                 dictionary_file=DICTIONARY_FILE):
+        self.output_file = output_file
+        self.scores_file = scores_file
+        self.min_reviews = min_reviews
+        self.dictionary = HotelDictionary(dictionary_file)
+        self.hotel_ids = load_real_score_hotel_ids(real_scores_file, self.dictionary) if real_scores_file else None
+        self.scores = {}
+        if os.path.exists(scores_file):
+            for r in pd.read_parquet(scores_file).to_dict("records"):
+                r["example_reviews"] = list(r["example_reviews"])
+                self.scores[(r["hotel_name"], r["category"])] = r
+
+    def __call__(self, batch_df, batch_id):
+        # Only keys touched by this micro-batch are in batch_df, so collecting it stays small.
+        updated = batch_df.toPandas()
+        if updated.empty:
+            return
+        for r in updated.to_dict("records"):
+            r["example_reviews"] = list(r["example_reviews"])
+            self.scores[(r["hotel_name"], r["category"])] = r
+        self.publish()
+        print(f"[i] Batch {batch_id}: {len(updated)} (hotel, category) scores updated")
+
+    def publish(self):
+        rows = list(self.scores.values())
+        _atomic_write(self.scores_file, lambda path: pd.DataFrame(rows).to_parquet(path, index=False))
+
+        # Same rule as the batch pipeline: a category is shown only with enough reviews.
+        shown = [r for r in rows if r["number_reviews"] >= self.min_reviews]
+        ids = self.dictionary.ids_for([r["hotel_name"] for r in shown]).tolist()
+        shown = [{**r, "hotel_id": i} for r, i in zip(shown, ids)]
+        out = hotels_summary_as_json(shown, self.dictionary, self.hotel_ids)
+        self.dictionary.save()
+        _atomic_write(self.output_file, lambda path: out.to_csv(path, index=False))
+
+
+def _atomic_write(path, write):
+    # Readers never see a half-written file: write next to it, then rename over it.
+    tmp = f"{path}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+# =========================
+# STREAMING JOB
+# =========================
+def read_source_stream(spark, name):
+    """
+    Streaming DataFrame (hotel_name, text_review) over one source folder.
+    """
+    from pyspark.sql import functions as F
+
+    src = STREAM_SOURCES[name]
+    os.makedirs(src["dir"], exist_ok=True)
+    raw = (spark.readStream.format("csv")
+        .schema(schema_for_header(src["columns"], SCRAPED_REVIEW_TYPES))
+        .option("header", "true")
+        .option("multiLine", "true")
+        .option("escape", '"')
+        .option("quote", '"')
+        .option("maxFilesPerTrigger", MAX_FILES_PER_TRIGGER)
+        .load(src["dir"])
+    )
+    return raw.select(
+        hotel_name_col(src["name_column"], "City", "Country").alias("hotel_name"),
+        F.col("Review").alias("text_review"),
+    )
+
+
+def build_scores_stream(spark, folded, sources=tuple(STREAM_SOURCES), noise_scale=NOISE_SCALE):
+    """
+    clean -> dedup (within the watermark) -> categorize -> trim -> predict -> stateful per-(hotel, category) scores.
+    Every step except the last is stateless, so each micro-batch only touches its new reviews.
+    """
+    from pyspark.sql import functions as F
+    from pyspark.sql.streaming.state import GroupStateTimeout
+
+    reviews = None
+    for name in sources:
+        df = read_source_stream(spark, name)
+        reviews = df if reviews is None else reviews.unionByName(df)
+
+    reviews = clean_and_filter_english_reviews(reviews, "text_review")
+    reviews = (
+        reviews.withColumn("ingested_at", F.current_timestamp())
+               .withWatermark("ingested_at", DEDUP_WATERMARK)
+               .dropDuplicatesWithinWatermark(["hotel_name", "text_review"])
+    )
+
+    long_df = create_categories_column(reviews, "text_review").select(
+        "hotel_name", "text_review", F.explode("categories").alias("category")
+    )
+    long_df = trim_long_to_category_relevant_text(long_df)
+    long_df = long_df.filter(F.col("category").isin(list(folded.tables)))
+
+    folded_bc = spark.sparkContext.broadcast(folded)
+    preds = predict_all_categories(long_df, folded_bc, noise_scale).select("hotel_name", "category", "text_review", "prediction")
+
+    return preds.groupBy("hotel_name", "category").applyInPandasWithState(
+        update_category_scores,
+        outputStructType=OUTPUT_SCHEMA,
+        stateStructType=STATE_SCHEMA,
+        outputMode="update",
+        timeoutConf=GroupStateTimeout.NoTimeout,
+    )
+
+
+def run_streaming(
+        spark=None,
+        models_file=MODELS_FILE,
+        checkpoint_dir=CHECKPOINT_DIR,
+        trigger_interval=TRIGGER_INTERVAL,
+        publisher=None,
+        await_termination=True
+):
+    """
+    Starts the streaming job and returns the StreamingQuery.
+    Scores are published after every micro-batch that brought new reviews.
+    """
+    if spark is None:
+        from pyspark.sql import SparkSession
+        spark = SparkSession.builder.master("local[*]").appName("review-metric-streaming").getOrCreate()
+
+    folded = FoldedScorer(CategoryScorer.load(models_file))
+    scores = build_scores_stream(spark, folded)
+
+    query = (scores.writeStream
+        .outputMode("update")
+        .foreachBatch(publisher or ToolInputPublisher())
+        .option("checkpointLocation", checkpoint_dir)
+        .trigger(processingTime=trigger_interval)
+        .start()
+    )
+    print(f"[i] Streaming from {[s['dir'] for s in STREAM_SOURCES.values()]} every {trigger_interval}")
+    if await_termination:
+        query.awaitTermination()
+    return query
+
+
+if __name__ == "__main__":
+    # Run from the repo root: python -m pipeline.streaming
+    run_streaming()
@@ -0,0 +1,201 @@
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from pyspark.ml import PipelineModel
+from pyspark.ml.evaluation import RegressionEvaluator
+
+from pipeline.cache_manager import cache_manager
+from pipeline.feature_cache import FEATURE_CACHE_DIR
+from pipeline.stages import (
+    DEFAULT_PARAMS, LR_PARAMS, W2V_PARAMS, featurization_stages, regression_stage, train_category_model_cached,
+)
+
+# =========================
+# CONFIG
+# =========================
+
+# Grid: every Word2Vec setting x every LinearRegression setting (the defaults of stages.py are included).
+VECTOR_SIZES = [25, 50, 100]
+WINDOW_SIZES = [3, 5]
+MIN_COUNTS = [2, 5]
+REG_PARAMS = [0.0, 0.01, 0.05, 0.2]
+ELASTIC_NET_PARAMS = [0.0]
+
+# Per category: fit on (1 - VALIDATION_FRACTION) of the training reviews, score RMSE on the rest.
+VALIDATION_FRACTION = 0.2
+SEED = 42
+
+# Concurrent Spark fits (Word2Vec settings first, then every regression head on their features).
+PARALLELISM = 4
+
+# Which configuration to keep per category:
+#   "best"     - lowest validation RMSE
+#   "cheapest" - lowest fit time among the configurations within NEAR_BEST_TOLERANCE (relative) of the best RMSE
+PICK = "best"
+NEAR_BEST_TOLERANCE = 0.01
+
+
+# =========================
+# GRID
+# =========================
+def param_grid(
+        vector_sizes=VECTOR_SIZES,
+        window_sizes=WINDOW_SIZES,
+        min_counts=MIN_COUNTS,
+        reg_params=REG_PARAMS,
+        elastic_net_params=ELASTIC_NET_PARAMS
+):
+    """
+    (Word2Vec settings, LinearRegression settings): two lists of dicts keyed like DEFAULT_PARAMS.
+    """
+    w2v_grid = [dict(zip(W2V_PARAMS, values)) for values in itertools.product(vector_sizes, window_sizes, min_counts)]
+    lr_grid = [dict(zip(LR_PARAMS, values)) for values in itertools.product(reg_params, elastic_net_params)]
+    return w2v_grid, lr_grid
+
+
+# =========================
+# SWEEP
+# =========================
+def sweep_category(
+        category,
+        train_df,
+        grid=None,
+        validation_fraction=VALIDATION_FRACTION,
+        parallelism=PARALLELISM,
+        seed=SEED
+):
+    """
+    Evaluates the grid for one category's (text_review, label) training data on a train/validation split.
+
+    Reviews are tokenized once (the tokens don't depend on the grid) and cached; each Word2Vec setting
+    is fitted once and its train/validation features are cached, so every regression head of that
+    setting is fitted on cached features. Fits run concurrently (parallelism threads).
+
+    One row per configuration: the settings, w2v_fit_s (Word2Vec fit + embedding of both splits),
+    lr_fit_s, fit_s (their sum: the cost of training this configuration), train_rmse and val_rmse.
+    Sorted by val_rmse; empty when a split has no rows.
+    """
+    w2v_grid, lr_grid = grid or param_grid()
+    train, val = train_df.select("text_review", "label").randomSplit(
+        [1 - validation_fraction, validation_fraction], seed=seed
+    )
+
+    # Tokenizer + stop words are plain transformers (no fit needed).
+    tokenize = PipelineModel(stages=featurization_stages()[:2])
+    caches = cache_manager(train_df.sparkSession)
+    prefix = f"sweep/{category}"
+    cached = [f"{prefix}/tokens/train", f"{prefix}/tokens/val"]
+    train_tokens = caches.persist(cached[0], tokenize.transform(train).select("filtered_tokens", "label"),
+                                  materialize=False)
+    val_tokens = caches.persist(cached[1], tokenize.transform(val).select("filtered_tokens", "label"),
+                                materialize=False)
+
+    evaluator = RegressionEvaluator(labelCol="label", predictionCol="prediction", metricName="rmse")
+
+    def embed(w2v_params):
+        start = time.perf_counter()
+        w2v_model = featurization_stages(**w2v_params)[-1].fit(train_tokens)
+        name = f"{prefix}/features/" + "-".join(f"{k}={v}" for k, v in w2v_params.items())
+        cached.extend([f"{name}/train", f"{name}/val"])
+        train_features = caches.persist(f"{name}/train", w2v_model.transform(train_tokens).select("features", "label"))
+        val_features = caches.persist(f"{name}/val", w2v_model.transform(val_tokens).select("features", "label"))
+        return w2v_params, train_features, val_features, time.perf_counter() - start
+
+    def fit_head(job):
+        (w2v_params, train_features, val_features, w2v_s), lr_params = job
+        start = time.perf_counter()
+        lr_model = regression_stage(**lr_params).fit(train_features)
+        lr_s = time.perf_counter() - start
+        return {
+            "category": category,
+            **w2v_params,
+            **lr_params,
+            "w2v_fit_s": round(w2v_s, 2),
+            "lr_fit_s": round(lr_s, 2),
+            "fit_s": round(w2v_s + lr_s, 2),
+            "train_rmse": lr_model.summary.rootMeanSquaredError,
+            "val_rmse": evaluator.evaluate(lr_model.transform(val_features)),
+        }
+
+    try:
+        n_train, n_val = train_tokens.count(), val_tokens.count()
+        if n_train == 0 or n_val == 0:
+            print(f"[!] {category}: not enough reviews to sweep ({n_train} train / {n_val} validation)")
+            return pd.DataFrame()
+
+        with ThreadPoolExecutor(max_workers=parallelism) as pool:
+            embedded = list(pool.map(embed, w2v_grid))
+            rows = list(pool.map(fit_head, itertools.product(embedded, lr_grid)))
+    finally:
+        for name in cached:
+            caches.release(name)
+
+    return pd.DataFrame(rows).sort_values(["val_rmse", "fit_s"]).reset_index(drop=True)
+
+
+def choose_params(results, pick=PICK, tolerance=NEAR_BEST_TOLERANCE):
+    """
+    DEFAULT_PARAMS-style settings of the picked configuration (DEFAULT_PARAMS when results is empty).
+    """
+    if results.empty:
+        return dict(DEFAULT_PARAMS)
+    if pick == "best":
+        row = results.sort_values(["val_rmse", "fit_s"]).iloc[0]
+    elif pick == "cheapest":
+        near_best = results[results["val_rmse"] <= results["val_rmse"].min() * (1 + tolerance)]
+        row = near_best.sort_values(["fit_s", "val_rmse"]).iloc[0]
+    else:
+        raise ValueError(f"Unknown pick: {pick}")
+    return {k: type(v)(row[k]) for k, v in DEFAULT_PARAMS.items()}
+
+
+def format_sweep(results, tolerance=NEAR_BEST_TOLERANCE, top=10):
+    """
+    Fit time next to validation error for the top configurations of one category.
+    "best" = lowest RMSE, "near" = within tolerance of it, "cheapest" = fastest of those.
+    """
+    if results.empty:
+        return ""
+    best_rmse = results["val_rmse"].min()
+    near = results["val_rmse"] <= best_rmse * (1 + tolerance)
+    best = results["val_rmse"].idxmin()
+    cheapest = results[near]["fit_s"].idxmin()
+
+    cols = list(DEFAULT_PARAMS) + ["w2v_fit_s", "lr_fit_s", "fit_s", "train_rmse", "val_rmse"]
+    table = results[cols].copy()
+    table["pick"] = ["best" if i == best else "near" if near[i] else "" for i in results.index]
+    table.loc[cheapest, "pick"] = (table.loc[cheapest, "pick"] + " cheapest").strip()
+    shown = table.head(top)
+    if cheapest not in shown.index:
+        shown = pd.concat([shown, table.loc[[cheapest]]])
+
+    header = f"=== {results['category'].iloc[0]}: {len(results)} configurations, best val RMSE {best_rmse:.4f} ==="
+    return header + "\n" + shown.to_string(float_format=lambda x: f"{x:.4f}")
+
+
+def sweep_category_models(
+        spark,
+        train_dfs,
+        pick=PICK,
+        tolerance=NEAR_BEST_TOLERANCE,
+        cache_dir=FEATURE_CACHE_DIR,
+        **sweep_kwargs
+):
+    """
+    Sweeps every category, prints the report, picks a configuration per category and retrains it on all
+    of the category's training data (through the feature cache, like the regular training loop).
+    Returns (models {category: (PipelineModel, sigma)}, chosen {category: params}, all sweep results).
+    """
+    models, chosen, results = {}, {}, []
+    for ctg, train_df in train_dfs.items():
+        ctg_results = sweep_category(ctg, train_df, **sweep_kwargs)
+        print(format_sweep(ctg_results, tolerance))
+
+        chosen[ctg] = choose_params(ctg_results, pick, tolerance)
+        print(f"[i] {ctg}: using {chosen[ctg]}")
+        models[ctg] = train_category_model_cached(spark, ctg, train_df, cache_dir=cache_dir, params=chosen[ctg])
+        results.append(ctg_results)
+
+    return models, chosen, (pd.concat(results, ignore_index=True) if results else pd.DataFrame())
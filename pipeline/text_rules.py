@@ -0,0 +1,211 @@
+import re
+
+from pipeline.segmenter import ReviewSegmenter
+
+# =========================
+# CLEANING
+# =========================
+
+# Pattern: Anything NOT (a-z, A-Z, 0-9, space, !, ,, ., ?, -, (, ))
+strict_pattern = r"[^a-zA-Z0-9\s\!\,\.\?\-\(\)]"
+
+# Reviews shorter than this (after cleaning) are dropped before language detection.
+MIN_REVIEW_LENGTH = 20
+
+
+# =========================
+# CATEGORY KEYWORDS
+# =========================
+
+# Single source of truth for the category keyword lists and review split rules.
+# The notebook imports these names directly, and the interface uses the pure-Python
+# helpers below, so Spark and the live scoring panel always tag and trim the same way.
+# NOTE: keep the lists byte-identical to what the models were trained with
+# (including quirks such as the missing comma after "comfy").
+
+categories_kw = {
+  "cleanliness": [
+    "clean","cleanliness","spotless","tidy","neat","hygienic","sanitary",
+    "dirty","dusty","dust","grime","stain","stained","smell","odor","mould","mold","mildew",
+    "housekeeping","clean towels","clean sheets","fresh linens","not cleaned",
+    "filthy", "unclean", "smelly", "stinky", "musty", "damp", "smoke", "smoky",
+    "bugs", "insects", "cockroaches", "ants", "hair", "hairs",
+    "immaculate","pristine","sparkling","well kept","well-kept","sanitized","sanitised",
+    "cleaned","not clean","not cleaned properly","deep clean","deep-clean","fresh smell",
+    "reek","reeking","stink","stinky smell","sewage","drain smell",
+    "sticky","sticky floor","greasy","grease","slimy","moldy","mouldy",
+    "cobweb","cobwebs","bedbugs","bed bugs","mosquitoes","flies","spider","spiders",
+    "vacuum","vacuumed","mop","mopped","trash","garbage","bin","bins"
+  ],
+  "comfort": [
+    "comfortable","comfort","cozy","snug", "comfy"
+    "bed","mattress","pillow","pillows","bedding","sheets","linens",
+    "soft bed","hard bed","uncomfortable","lumpy",
+    "noise","noisy","quiet","soundproof","thin walls",
+    "temperature","hot","cold","heating","heater","air conditioning","ac",
+    "spacious","cramped","small room","room size", "comfy",
+    "firm bed", "soft mattress", "hard mattress", "blanket", "blankets", "duvet", "sleep", "slept", "sleeping",
+    "warm", "cool", "freezing", "aircon", "ventilation",
+    "restful","relaxing","good sleep","sleep well","good night sleep",
+    "king bed","queen bed","double bed","single bed","twin bed",
+    "sofa bed","couch","sofa","couch bed","extra bed","rollaway","crib","cot",
+    "squeaky","creaky","bed frame","springs",
+    "blackout","blackout curtains","curtains","blinds",
+    "stuffy","humid","humidity","draught","draft","drafty","draughty",
+    "street noise","traffic noise","construction noise","earplugs"
+  ],
+  "facilities": [
+    "facilities","amenities","equipment",
+    "gym","fitness","pool","swimming pool","sauna","spa","jacuzzi","hot tub",
+    "elevator","lift","lobby","lounge","terrace","garden","patio",
+    "parking","car park","garage",
+    "restaurant","bar","breakfast area","cafeteria", "breakfast",
+    "laundry","washing machine","dryer",
+    "kitchenette","kitchen","microwave","fridge","refrigerator","kettle",
+    "tv","television","channels", "bathroom", "shower", "toilet",
+    "water pressure", "hot water", "cold water", "coffee", "tea", "coffee machine",
+    "dishwasher", "oven", "stove", "workspace", "desk", "balcony",
+    "air conditioner","air conditioning unit","heater","radiator",
+    "hairdryer","hair dryer","toiletries","soap","shampoo","conditioner","body wash",
+    "towels","bath towel","bathrobe","robes","slippers",
+    "bathtub","bath tub","sink","drain","bidet",
+    "iron","ironing board","safe","minibar","mini bar",
+    "usb","usb outlet","charger","charging","plug","socket","outlet",
+    "vending machine","ice machine","water dispenser","water cooler",
+    "kids club","playground","game room","games room",
+    "meeting room","conference room","business center",
+    "shuttle","airport shuttle","bike rental","bicycle"
+  ],
+  "staff": [
+    "staff","service","team","personnel","receptionist","front desk","reception",
+    "helpful","friendly","polite","welcoming","attentive","professional","kind",
+    "rude","unfriendly","unhelpful","disrespectful","arrogant",
+    "check-in","check in","check-out","checkout",
+    "communication","responsive","response time",
+    "host", "hosts", "manager", "owner", "support", "customer service", "greet", "greeted",
+     "concierge","porter","bellboy","bellhop","doorman",
+    "courteous","accommodating","helped","assisted","supportive","patient",
+    "ignored","ignoring","impolite","unprofessional",
+    "efficient","inefficient","slow","quick","prompt","delayed",
+    "early check-in","early check in","late check-out","late check out",
+    "upgrade","upgraded","reservation","booking issue","refund"
+  ],
+  "location": [
+    "location","located","area","neighborhood","neighbourhood",
+    "central","city center","city centre","downtown","in the center",
+    "close to","near","nearby","walking distance","steps away",
+    "transport","public transport","metro","subway","train","bus","station",
+    "safe area","unsafe","sketchy", "close by",
+    "convenient", "conveniently located", "distance",
+    "far", "far from", "away from", "walkable",
+    "near the beach","beach","seafront","waterfront",
+    "old town","city centre","main square",
+    "restaurants nearby","shops nearby","shopping","supermarket","grocery",
+    "attractions","sights","tourist area",
+    "airport","near the airport","port","harbor","harbour",
+    "quiet area","noisy area","busy area",
+    "hill","steep","remote","isolated"
+  ],
+  "free_wifi": [
+    "wifi","wi-fi", "wi fi", "wireless","internet","connection","network","router",
+    "password","speed","fast wifi","slow wifi","unstable","disconnect","drops",
+    "no signal","coverage","bandwidth","streaming","zoom","video call","free wifi",
+    "signal", "lag", "laggy", "buffering", "connect", "connected",
+    "internet access","wifi signal","signal strength","strong signal","weak signal",
+    "login","log in","sign in","portal",
+    "download","upload","mbps","ping","latency",
+    "ethernet","lan","wired internet","modem","hotspot"
+  ]
+}
+
+# =========================
+# SPLIT RULES
+# =========================
+
+# Words that usually flip the sentiment of a sentence ("great room but dirty bathroom").
+# Reviews are always cut on these, so each side can be scored on its own.
+contrast_words = [
+    "but", "however", "though", "although", "yet", "whereas", "while", "on the other hand",
+    "even though", "even if", "still", "nevertheless", "nonetheless", "except", "except for",
+    "apart from", "aside from","instead", "otherwise", "rather", "rather than", "despite",
+    "in spite of", "regardless", "regardless of", "unfortunately", "sadly",
+]
+contrast_regex = "|".join(contrast_words)
+
+kws_words = [kw for kws in categories_kw.values() for kw in kws]
+kws_regex = "|".join(kw.replace(" ", r"\s+") for kw in kws_words)
+
+# Split points (the reference definition; reviews are split with the linear-time
+# ReviewSegmenter below, which gives the same pieces - see benchmarks/pathological_reviews.py):
+# 1) after "..." or sentence punctuation
+# 2) around contrast words
+# 3) on "and"/commas, but only when the phrase that follows mentions a category keyword
+split_regex = (
+    r"(?<=\.{3})\s+"
+    r"|(?<=[.!?])\s+"
+    r"|\s+(?:" + contrast_regex +r")\s+"
+    r"|(?:\s+and\s+|,\s*)"
+      r"(?=(?:(?!\s+and\s+|,\s*).)*\b(?:" + kws_regex + r")\b)"
+)
+
+
+def keyword_pattern(kw):
+    """
+    Word-bounded regex for a single keyword (spaces match any whitespace run).
+    Same pattern the Spark trim step builds for its rlike filters.
+    """
+    return r"\b" + re.escape(kw.lower()).replace(r"\ ", r"\s+") + r"\b"
+
+
+# =========================
+# PURE-PYTHON HELPERS
+# =========================
+
+# Compiled once at import time; these mirror the Spark column expressions in the notebook
+# so a single review can be tagged and trimmed without a Spark session.
+_SPLIT_RE = re.compile(split_regex)
+_SEGMENTER = ReviewSegmenter(contrast_words, kws_words)
+_TRAILING_PUNCT_RE = re.compile(r"[.!?]+$")
+_CATEGORY_HITS_RE = {
+    ctg: re.compile("|".join(keyword_pattern(k) for k in kws))
+    for ctg, kws in categories_kw.items()
+}
+
+
+def review_categories(text):
+    """
+    Returns every category whose keywords appear (as substrings) in the review,
+    in the same order as categories_kw - like create_categories_column.
+    """
+    txt = (text or "").lower()
+    return [ctg for ctg, kws in categories_kw.items() if any(k in txt for k in kws)]
+
+
+def split_segments(text):
+    """
+    Pieces of an already lowercased review at the split_regex split points, including empty ones
+    (same as re.split(split_regex, text)), in linear time.
+    """
+    return _SEGMENTER.split(text)
+
+
+def split_review(text):
+    """
+    Splits a lowercased review into non-empty segments at the split_regex split points.
+    Blank means spaces only, like Spark's trim() (a segment of tabs / newlines is kept).
+    """
+    return [s for s in split_segments((text or "").lower()) if s.strip(" ")]
+
+
+def trim_review_to_category(text, category):
+    """
+    Keeps only the segments that mention the category's keywords and joins them with ". ",
+    like trim_review_to_category_relevant_text. Returns "" when nothing is relevant.
+    """
+    hits_re = _CATEGORY_HITS_RE[category]
+    hits = [
+        _TRAILING_PUNCT_RE.sub("", s.strip(" "))
+        for s in split_review(text)
+        if hits_re.search(s)
+    ]
+    return ". ".join(hits)
@@ -0,0 +1,183 @@
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from blocking import LAYOUT_CHANGED, OK, ProxyPool, check_page, run_hotel_queue
+from snapshots import parse_html
+
+# =========================
+# CONFIG
+# =========================
+
+# Local stand-in for Booking / Expedia that blocks like they do, to exercise blocking.py without a
+# browser or real proxies:  python block_simulator.py
+HOST = "127.0.0.1"
+NUM_HOTELS = 12
+LAYOUT_CHANGED_HOTELS = {5}  # served without review cards (a redesign), must not be retried
+
+# Simulated proxy endpoints, in the order the pool sees them:
+#   captcha  - every request gets a captcha page
+#   flaky    - each session is rate limited (429) after `rate_limit_after` requests
+#   soft     - each session gets an empty reviews dialog after `soft_block_after` requests
+#   good     - always fine, slightly slower
+SIM_ENDPOINTS = {
+    "captcha.proxy:8001": {"captcha": True},
+    "flaky.proxy:8002": {"rate_limit_after": 3},
+    "soft.proxy:8003": {"soft_block_after": 2},
+    "good.proxy:8004": {"latency_s": 0.02},
+}
+
+# Same as booking_scraper.REVIEW_CARD_SELECTOR (not imported: that needs selenium).
+REVIEW_CARD_SELECTOR = '[data-testid="review-card"], li.review_item'
+
+OK_PAGE = """<html><head><title>Hotel {n} - Reviews</title></head><body>
+<div role="dialog"><h2>Guest reviews</h2>
+<div data-testid="review-card"><div data-testid="review-positive-text">Great location {n}</div></div>
+<div data-testid="review-card"><div data-testid="review-positive-text">Friendly staff {n}</div></div>
+</div></body></html>"""
+LAYOUT_PAGE = """<html><head><title>Hotel {n}</title></head><body>
+<div class="reviews-v2"><p>Guests loved the breakfast</p></div></body></html>"""
+CAPTCHA_PAGE = """<html><head><title>Just a moment...</title></head><body>
+<div class="g-recaptcha"></div><p>Are you a robot? Please confirm you are not a robot.</p></body></html>"""
+RATE_LIMIT_PAGE = """<html><head><title>429</title></head><body><h1>Too Many Requests</h1></body></html>"""
+SOFT_BLOCK_PAGE = """<html><head><title>Hotel {n} - Reviews</title></head><body>
+<div role="dialog"><div class="spinner"></div></div></body></html>"""
+
+
+# =========================
+# STAND-IN SERVER
+# =========================
+class _Handler(BaseHTTPRequestHandler):
+    session_requests = {}  # (endpoint, session) -> requests served
+    lock = threading.Lock()
+
+    def do_GET(self):
+        endpoint = self.headers.get("X-Sim-Proxy", "")
+        session = self.headers.get("X-Sim-Session", "")
+        behavior = SIM_ENDPOINTS.get(endpoint, {})
+        with self.lock:
+            count = self.session_requests.get((endpoint, session), 0) + 1
+            self.session_requests[(endpoint, session)] = count
+
+        n = int(self.path.rstrip("/").rsplit("/", 1)[-1])
+        time.sleep(behavior.get("latency_s", 0))
+        status, page = 200, OK_PAGE
+        if behavior.get("captcha"):
+            page = CAPTCHA_PAGE
+        elif count > behavior.get("rate_limit_after", count):
+            status, page = 429, RATE_LIMIT_PAGE
+        elif count > behavior.get("soft_block_after", count):
+            page = SOFT_BLOCK_PAGE
+        elif n in LAYOUT_CHANGED_HOTELS:
+            page = LAYOUT_PAGE
+
+        body = page.format(n=n).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer((HOST, 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# =========================
+# HTTP "DRIVER"
+# =========================
+class SimDriver:
+    """
+    The few driver calls the block layer makes (get, title, find_element(s), proxy, delete_all_cookies),
+    over plain HTTP. Setting .proxy starts a new session on that endpoint, like Selenium Wire + a provider.
+    """
+
+    def __init__(self, proxy):
+        self.title = ""
+        self._doc = parse_html("")
+        self.proxy = proxy
+
+    @property
+    def proxy(self):
+        return self._proxy
+
+    @proxy.setter
+    def proxy(self, proxy):
+        self._proxy = proxy
+        url = urlparse(proxy["http"])
+        self.endpoint = f"{url.hostname}:{url.port}"
+        self.session = uuid.uuid4().hex
+
+    def get(self, url):
+        request = urllib.request.Request(url, headers={"X-Sim-Proxy": self.endpoint, "X-Sim-Session": self.session})
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                html = response.read().decode("utf-8")
+        except urllib.error.HTTPError as e:
+            html = e.read().decode("utf-8")  # the browser renders error pages too
+        self._doc = parse_html(html)
+        titles = self._doc.find_elements("tag name", "title")
+        self.title = titles[0].text if titles else ""
+
+    def find_elements(self, by, value):
+        return self._doc.find_elements(by, value)
+
+    def find_element(self, by, value):
+        return self._doc.find_element(by, value)
+
+    def delete_all_cookies(self):
+        pass
+
+
+# =========================
+# RUN
+# =========================
+def run_simulation():
+    server = start_server()
+    base_url = f"http://{HOST}:{server.server_address[1]}/hotel"
+    try:
+        endpoints = [
+            {"host": name.split(":")[0], "port": name.split(":")[1], "user": "sim", "password": "sim"}
+            for name in SIM_ENDPOINTS
+        ]
+        pool = ProxyPool(endpoints, stats_file=None)
+        driver = SimDriver(pool.next_proxy())
+        backoffs = []
+
+        def scrape_one(n):
+            started = time.time()
+            driver.get(f"{base_url}/{n}")
+            return check_page(driver, REVIEW_CARD_SELECTOR, pool, started)
+
+        # Backoff delays are recorded instead of slept.
+        results = run_hotel_queue(range(NUM_HOTELS), scrape_one, pool, driver, sleep=backoffs.append)
+    finally:
+        server.shutdown()
+
+    expected = {str(n): LAYOUT_CHANGED if n in LAYOUT_CHANGED_HOTELS else OK for n in range(NUM_HOTELS)}
+    checks = {
+        "every hotel ends ok (or layout_changed, not retried)": results == expected,
+        "blocks triggered rotation + backoff": len(backoffs) >= 3,
+        "captcha endpoint ranked last": min(pool.endpoints, key=lambda n: -pool._health(n)[0]) == "captcha.proxy:8001",
+        "healthy endpoint ranked first": min(pool.endpoints, key=pool._health) == "good.proxy:8004",
+    }
+    for name, passed in checks.items():
+        print(f"[{'i' if passed else '!'}] {name}")
+    print(f"[i] Backoffs (s): {', '.join(f'{b:.0f}' for b in backoffs)}")
+    return all(checks.values())
+
+
+if __name__ == "__main__":
+    if not run_simulation():
+        sys.exit("[!] Block simulation failed")
+    print("[i] Block simulation passed")
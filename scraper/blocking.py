@@ -0,0 +1,280 @@
+import json
+import os
+import random
+import time
+import uuid
+from collections import deque
+
+from snapshots import CSS_SELECTOR, TAG_NAME
+
+# =========================
+# CONFIG
+# =========================
+
+# Page states returned by check_page().
+OK = "ok"
+CAPTCHA = "captcha"
+RATE_LIMITED = "rate_limited"        # 429 pages, "unusual traffic" pages, empty review dialogs (soft blocks)
+LAYOUT_CHANGED = "layout_changed"    # not blocked, but the expected elements aren't there (fix the selectors)
+
+# Blocked states: rotate the proxy, back off and requeue the hotel.
+BLOCKED_STATES = {CAPTCHA, RATE_LIMITED}
+
+# Captcha widgets / challenge frames, only looked for when the expected elements are missing: normal pages
+# can carry an invisible reCAPTCHA v3 badge (.grecaptcha-badge) or a hidden captcha container.
+CAPTCHA_SELECTOR = (
+    'iframe[src*="captcha"], iframe[title*="challenge"], [id="px-captcha"], .g-recaptcha, .h-captcha, '
+    '[id*="captcha"], [class*="captcha"]'
+)
+
+# Visible-text markers, only looked at when the expected elements are missing
+# (review text like "access denied to the pool" must not flag a normal page).
+CAPTCHA_MARKERS = [
+    "captcha", "are you a robot", "verify you are human", "verify you're human", "press and hold",
+    "confirm you are not a robot", "security check",
+]
+RATE_LIMIT_MARKERS = [
+    "too many requests", "rate limit", "unusual traffic", "access denied", "temporarily blocked",
+    "you have been blocked", "request blocked", "try again later", "service unavailable",
+]
+
+# A reviews dialog that opened but has no text is Booking's soft block.
+DIALOG_SELECTOR = '[role="dialog"]'
+
+# Exponential backoff after a block: BACKOFF_BASE_S * 2^(consecutive blocks - 1), capped, +-jitter.
+# Rate limits wait RATE_LIMIT_BACKOFF_FACTOR times longer than captchas.
+BACKOFF_BASE_S = 20
+BACKOFF_MAX_S = 600
+BACKOFF_JITTER = 0.25
+RATE_LIMIT_BACKOFF_FACTOR = 3
+
+# A blocked hotel is retried (at the back of the queue) up to this many attempts in total.
+MAX_ATTEMPTS = 3
+
+# A proxy endpoint that just got blocked is not picked again for this long (unless all of them are).
+BLOCK_COOLDOWN_S = 300
+
+# Smoothing of the per-endpoint page load latency (exponentially weighted moving average).
+LATENCY_EWMA_ALPHA = 0.3
+
+# Proxy user name per session. Providers with sticky sessions put a session id in the user name,
+# e.g. "{user}-session-{session}"; every rotation then gets a fresh exit IP. "{user}" = no sessions.
+SESSION_USER_FORMAT = "{user}"
+
+# Per-endpoint stats are kept across runs, so healthy endpoints are preferred from the start.
+PROXY_STATS_FILE = "proxy_stats.json"
+
+
+# =========================
+# PAGE STATE
+# =========================
+def check_page(driver, expected_selector, pool=None, started_at=None):
+    """
+    Classifies the current page as OK, CAPTCHA, RATE_LIMITED or LAYOUT_CHANGED.
+    driver can also be a parsed snapshot (snapshots.parse_html). With a pool, the result and the
+    time since started_at (page load latency) are recorded for the current proxy endpoint.
+    """
+    state = page_state(driver, expected_selector, getattr(driver, "title", "") or "")
+    if pool is not None:
+        pool.record(state, time.time() - started_at if started_at else None)
+    return state
+
+
+def page_state(root, expected_selector, title=""):
+    if root.find_elements(CSS_SELECTOR, expected_selector):
+        return OK
+    if root.find_elements(CSS_SELECTOR, CAPTCHA_SELECTOR):
+        return CAPTCHA
+
+    # Only now read the visible text (one more WebDriver round trip on a live page).
+    try:
+        body = root.find_element(TAG_NAME, "body").text
+    except Exception:
+        body = ""
+    text = f"{title}\n{body}".lower()
+    if any(m in text for m in CAPTCHA_MARKERS):
+        return CAPTCHA
+    if any(m in text for m in RATE_LIMIT_MARKERS):
+        return RATE_LIMITED
+
+    dialogs = root.find_elements(CSS_SELECTOR, DIALOG_SELECTOR)
+    if dialogs and not any(d.text.strip() for d in dialogs):
+        return RATE_LIMITED
+    return LAYOUT_CHANGED
+
+
+def backoff_delay(consecutive_blocks, state, rng=random):
+    delay = BACKOFF_BASE_S * 2 ** max(consecutive_blocks - 1, 0)
+    if state == RATE_LIMITED:
+        delay *= RATE_LIMIT_BACKOFF_FACTOR
+    delay = min(delay, BACKOFF_MAX_S)
+    return delay * rng.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+
+
+# =========================
+# PROXY POOL
+# =========================
+class ProxyPool:
+    """
+    Proxy endpoints ({"host", "port", "user", "password"}) with per-endpoint success / block / latency stats.
+    next_proxy() picks the healthiest endpoint that isn't cooling down after a block
+    (highest smoothed success rate, then lowest latency) and starts a fresh session on it.
+
+        pool = ProxyPool(PROXY_ENDPOINTS)
+        driver = init_driver(proxy=pool.next_proxy())
+        ...
+        pool.rotate(driver)   # after a block: new endpoint / session, cookies cleared
+    """
+
+    def __init__(self, endpoints, stats_file=PROXY_STATS_FILE, clock=time.time):
+        self.endpoints = {self.name(ep): ep for ep in endpoints}
+        self.stats_file = stats_file
+        self.clock = clock
+        self.stats = {name: self._empty_stats() for name in self.endpoints}
+        if stats_file and os.path.exists(stats_file):
+            with open(stats_file, encoding="utf-8") as f:
+                saved = json.load(f)
+            for name in self.stats:
+                self.stats[name].update({k: v for k, v in saved.get(name, {}).items() if k != "blocked_until"})
+        self.current = None
+        self.session = None
+
+    @staticmethod
+    def name(endpoint):
+        return f"{endpoint['host']}:{endpoint['port']}"
+
+    @staticmethod
+    def _empty_stats():
+        return {"checks": 0, "ok": 0, "blocks": {}, "latency_ewma_s": None, "blocked_until": 0.0}
+
+    # ---------- choosing ----------
+    def _health(self, name):
+        s = self.stats[name]
+        success_rate = (s["ok"] + 1) / (s["checks"] + 2)  # Laplace smoothing: unknown endpoints get 0.5
+        latency = s["latency_ewma_s"] if s["latency_ewma_s"] is not None else 0.0
+        return -success_rate, latency
+
+    def next_proxy(self):
+        """
+        Selenium Wire 'proxy' options for the chosen endpoint and a new session.
+        """
+        now = self.clock()
+        available = [n for n in self.endpoints if self.stats[n]["blocked_until"] <= now]
+        if available:
+            self.current = min(available, key=self._health)
+        else:
+            # Everything is cooling down: take the one that comes back first.
+            self.current = min(self.endpoints, key=lambda n: self.stats[n]["blocked_until"])
+        self.session = uuid.uuid4().hex[:8]
+
+        ep = self.endpoints[self.current]
+        user = SESSION_USER_FORMAT.format(user=ep["user"], session=self.session)
+        auth = f"{user}:{ep['password']}@" if ep.get("user") else ""
+        print(f"[i] Proxy: {self.current} (session {self.session})")
+        return {
+            'http': f"http://{auth}{ep['host']}:{ep['port']}",
+            'https': f"https://{auth}{ep['host']}:{ep['port']}",
+            'no_proxy': 'localhost,127.0.0.1'
+        }
+
+    def rotate(self, driver):
+        # Selenium Wire switches the upstream proxy of a running browser; cookies tie the old session to us.
+        driver.proxy = self.next_proxy()
+        try:
+            driver.delete_all_cookies()
+        except Exception:
+            pass
+
+    # ---------- stats ----------
+    def record(self, state, latency_s=None):
+        if self.current is None:
+            return
+        s = self.stats[self.current]
+        s["checks"] += 1
+        if state in BLOCKED_STATES:
+            s["blocks"][state] = s["blocks"].get(state, 0) + 1
+            s["blocked_until"] = self.clock() + BLOCK_COOLDOWN_S
+        else:
+            # Layout changes aren't the proxy's fault.
+            s["ok"] += 1
+        if latency_s is not None and state not in BLOCKED_STATES:
+            prev = s["latency_ewma_s"]
+            s["latency_ewma_s"] = latency_s if prev is None else (
+                LATENCY_EWMA_ALPHA * latency_s + (1 - LATENCY_EWMA_ALPHA) * prev
+            )
+
+    def report(self):
+        lines = [f"{'endpoint':<28} {'checks':>6} {'ok %':>6} {'latency s':>9}  blocks"]
+        for name in sorted(self.endpoints, key=self._health):
+            s = self.stats[name]
+            ok_pct = 100 * s["ok"] / s["checks"] if s["checks"] else 0.0
+            latency = f"{s['latency_ewma_s']:.2f}" if s["latency_ewma_s"] is not None else "-"
+            lines.append(f"{name:<28} {s['checks']:>6} {ok_pct:>6.1f} {latency:>9}  {s['blocks'] or '-'}")
+        return "\n".join(lines)
+
+    def save(self):
+        if not self.stats_file:
+            return
+        tmp = f"{self.stats_file}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.stats, f, indent=2)
+        os.replace(tmp, self.stats_file)
+
+
+# =========================
+# HOTEL QUEUE
+# =========================
+def run_hotel_queue(
+        hotels,
+        scrape_one,
+        pool,
+        driver,
+        name_of=str,
+        pause_s=0,
+        max_attempts=MAX_ATTEMPTS,
+        sleep=time.sleep
+):
+    """
+    Scrapes hotels in order with scrape_one(hotel) -> page state.
+    Blocked hotels (captcha / rate limit) rotate the proxy, back off exponentially and go to the back
+    of the queue (up to max_attempts attempts). Layout changes are not retried: they need a selector fix.
+    Returns {name_of(hotel): final state}.
+    """
+    queue = deque((hotel, 1) for hotel in hotels)
+    results = {}
+    consecutive_blocks = 0
+
+    while queue:
+        hotel, attempt = queue.popleft()
+        name = name_of(hotel)
+        print(f"\n--- {name} (attempt {attempt}/{max_attempts}, {len(queue)} queued) ---")
+        state = scrape_one(hotel)
+        results[name] = state
+
+        if state in BLOCKED_STATES:
+            consecutive_blocks += 1
+            if attempt < max_attempts:
+                queue.append((hotel, attempt + 1))
+                print(f"[!] {state} on {name} - requeued")
+            else:
+                print(f"[!] {state} on {name} - giving up after {attempt} attempts")
+            pool.rotate(driver)
+            delay = backoff_delay(consecutive_blocks, state)
+            print(f"[i] Backing off for {delay:.1f}s")
+            sleep(delay)
+            continue
+
+        consecutive_blocks = 0
+        if state == LAYOUT_CHANGED:
+            print(f"[!] Layout changed on {name} - selectors need an update (not retried)")
+        if queue and pause_s:
+            # Cooldown reduces risk of detection / throttling between hotels.
+            print(f"Cooling down for {pause_s} seconds...")
+            sleep(pause_s)
+
+    pool.save()
+    print("\n" + pool.report())
+    blocked = sum(1 for s in results.values() if s in BLOCKED_STATES)
+    print(f"[i] {len(results)} hotels: {sum(1 for s in results.values() if s == OK)} ok, "
+          f"{blocked} blocked, {sum(1 for s in results.values() if s == LAYOUT_CHANGED)} layout changed")
+    return results
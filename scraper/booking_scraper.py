@@ -5,6 +5,9 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from snapshots import open_archive, snapshot_page, SnapshotArchive
+from blocking import OK, BLOCKED_STATES, ProxyPool, check_page, run_hotel_queue
+
 # =========================
 # CONFIG
 # =========================
@@ -19,12 +22,30 @@ PROXY_PORT = "..."
 PROXY_USER = "..."
 PROXY_PASS = "..."
 
+# All proxy endpoints to use (more can be added). After a captcha / rate limit the scraper rotates
+# to a fresh session on the healthiest endpoint (see blocking.py; stats are kept in proxy_stats.json).
+PROXY_ENDPOINTS = [
+    {"host": PROXY_HOST, "port": PROXY_PORT, "user": PROXY_USER, "password": PROXY_PASS},
+]
+
 # Safety limit: maximum number of reviews to scrape per hotel.
 MAX_REVIEWS = 500
 
 # Must match the Chrome major version used by undetected_chromedriver on your machine.
 CHROME_VERSION = 142  # Make sure this matches your installed Chrome version.
 
+# Optional: folder watched by the streaming job (pipeline/streaming.py), e.g. "stream_input/scraped_booking".
+# When set, each finished hotel is also written there as its own small CSV part file.
+STREAM_DIR = None
+
+# Optional: archive folder for raw review pages (see snapshots.py), e.g. "snapshots".
+# When set, the review cards of every page are saved (compressed, content-addressed) so the
+# extraction below can be re-run offline with reparse_snapshots.py after a parser fix.
+SNAPSHOT_DIR = None
+
+# Review cards (multiple selectors to handle different Booking layouts).
+REVIEW_CARD_SELECTOR = '[data-testid="review-card"], li.review_item'
+
 
 # =========================
 # INPUT DATA
@@ -50,11 +71,11 @@ HOTELS_LIST = [
 # =========================
 # DRIVER
 # =========================
-def init_driver(headless=False):
-    # Selenium Wire proxy config (HTTP + HTTPS).
+def init_driver(headless=False, proxy=None):
+    # Selenium Wire proxy config (HTTP + HTTPS); proxy comes from ProxyPool.next_proxy() when given.
     # verify_ssl=False reduces SSL/cert failures when proxies intercept traffic.
     proxy_options = {
-        'proxy': {
+        'proxy': proxy or {
             'http': f'http://{PROXY_USER}:{PROXY_PASS}@{PROXY_HOST}:{PROXY_PORT}',
             'https': f'https://{PROXY_USER}:{PROXY_PASS}@{PROXY_HOST}:{PROXY_PORT}',
             'no_proxy': 'localhost,127.0.0.1'  # Don't proxy local traffic.
@@ -147,6 +168,117 @@ def open_reviews_tab(driver):
     print("⚠️ Warning: Could not find explicit reviews tab button (might already be open).")
 
 
+# =========================
+# CARD EXTRACTION
+# =========================
+def extract_review_text(card):
+    # Works on a live Selenium card and on an archived one (snapshots.parse_html), so
+    # reparse_snapshots.py re-runs exactly this logic offline.
+    parts = []  # Combined review text segments (positive + negative or fallback).
+    has_content = False  # Tracks whether we successfully extracted explicit text blocks.
+
+    # Step 1: Preferred extraction via Booking's positive/negative blocks (more reliable formatting).
+    try:
+        pos = card.find_element(By.CSS_SELECTOR, '[data-testid="review-positive-text"]').text.strip()
+        if pos:
+            parts.append(pos)
+            has_content = True
+    except:
+        pass
+
+    try:
+        neg = card.find_element(By.CSS_SELECTOR, '[data-testid="review-negative-text"]').text.strip()
+        if neg:
+            parts.append(neg)
+            has_content = True
+    except:
+        pass
+
+    # Step 2: Fallback extraction ("bulldozer") if structured blocks are missing/empty in Selenium.
+    # This grabs the raw card text and filters out UI/system lines and hotel responses.
+    if not has_content:
+        try:
+            raw_text = card.text
+            clean_lines = []
+            stop_reading = False
+
+            for line in raw_text.split('\n'):
+                # Stop capturing once we hit the hotel's response section.
+                if "Hotel response" in line or "Responded on" in line:
+                    stop_reading = True
+
+                if stop_reading:
+                    continue
+
+                line_lower = line.lower()
+
+                # Filter common UI noise / metadata lines.
+                if "reviewed:" in line_lower:
+                    continue
+                if "score" in line_lower and len(line) < 10:
+                    continue
+                if "helpful" in line_lower:
+                    continue
+                if "read more" in line_lower:
+                    continue
+
+                # Keep only lines that look like real content.
+                if len(line) > 5:
+                    clean_lines.append(line)
+
+            if clean_lines:
+                parts.append(" ".join(clean_lines))
+
+        except:
+            pass
+
+    # Combine extracted segments into one review text string.
+    return " ".join(parts).strip()
+
+
+def extract_review_score(card):
+    # Extract numeric score if present.
+    try:
+        raw_score = card.find_element(By.CSS_SELECTOR, '[data-testid="review-score"]').text.strip()
+        return raw_score.replace("Scored", "").replace("Score", "").strip().split()[0]
+    except:
+        return "N/A"
+
+
+def collect_page_reviews(cards, seen_reviews, limit):
+    # Yields (review_text, score) for the valid, not yet seen cards of one page (at most `limit`).
+    found = 0
+    for card in cards:
+        if found >= limit:
+            break
+
+        review_text = extract_review_text(card)
+
+        # Final validation + dedup.
+        if not review_text or review_text in seen_reviews:
+            continue
+
+        # Skip placeholder/empty reviews.
+        if "no comments available" in review_text.lower():
+            continue
+
+        score = extract_review_score(card)
+        seen_reviews.add(review_text)
+        found += 1
+        yield review_text, score
+
+
+def rows_from_snapshots(pages, meta, max_reviews=MAX_REVIEWS):
+    # Offline version of the page loop below: pages are parsed snapshots (snapshots.parse_html) in order.
+    seen_reviews = set()
+    rows = []
+    for page in pages:
+        cards = page.find_elements(By.CSS_SELECTOR, REVIEW_CARD_SELECTOR)
+        for review_text, score in collect_page_reviews(cards, seen_reviews, max_reviews - len(rows)):
+            rows.append([meta["hotel_name"], meta["country"], meta["city"], score, review_text])
+    return rows
+
+
 # =========================
 # MAIN SCRAPER
 # =========================
@@ -156,13 +288,19 @@ def scrape_booking_hotel(
         country,
         city,
         hotel_name,
-        max_reviews=500
+        max_reviews=500,
+        pool=None,
+        seen_reviews=None
 ):
     # Per-hotel routine:
     # 1) load hotel page (force English)
     # 2) accept cookies
     # 3) open reviews section
-    # 4) collect review cards across pagination until max_reviews reached
+    # 4) check for blocks (captcha / rate limit / changed layout)
+    # 5) collect review cards across pagination until max_reviews reached
+    # Returns the page state (blocking.py); a blocked hotel is requeued by run_hotel_queue.
+    # seen_reviews carries the reviews already written by an earlier (blocked) attempt, so a retry
+    # continues where it stopped instead of writing them again.
     wait = WebDriverWait(driver, 25)
 
     # Force English via URL to reduce localization differences in the reviews UI.
@@ -175,6 +313,7 @@ def scrape_booking_hotel(
     print(f"[i] Opening hotel page: {hotel_name}")
     print(f"[i] URL: {hotel_url}")
 
+    started = time.time()
     driver.get(hotel_url)
     time.sleep(5)  # Initial buffer for JS-heavy Booking pages.
 
@@ -219,8 +358,20 @@ def scrape_booking_hotel(
 
     time.sleep(3)  # Extra buffer to reduce race conditions when reading card content.
 
-    collected = 0  # Total unique reviews written for this hotel.
-    seen_reviews = set()  # Dedup guard: prevents saving the same text twice.
+    # Captcha, soft block (e.g. an empty reviews dialog) or a layout we don't know: don't scrape.
+    state = check_page(driver, REVIEW_CARD_SELECTOR, pool, started)
+    if state != OK:
+        print(f"[!] Page state: {state} – no review cards scraped")
+        return state
+
+    archive = open_archive(SNAPSHOT_DIR)  # None unless snapshots are on.
+    scrape_id = SnapshotArchive.new_scrape_id(hotel_url)
+    page = 1
+
+    if seen_reviews is None:
+        seen_reviews = set()  # Dedup guard: prevents saving the same text twice.
+    collected = len(seen_reviews)  # Total unique reviews written for this hotel.
+    hotel_rows = []  # Rows of this hotel, for the streaming part file.
 
     # Ensure output file exists and has headers before appending.
     # (Append mode prevents overwriting previous runs/hotels.)
@@ -235,101 +386,30 @@ def scrape_booking_hotel(
 
         while collected < max_reviews:
             # Locate review cards (multiple selectors to handle different Booking layouts).
-            cards = driver.find_elements(By.CSS_SELECTOR, '[data-testid="review-card"], li.review_item')
+            cards = driver.find_elements(By.CSS_SELECTOR, REVIEW_CARD_SELECTOR)
 
             if not cards:
-                print("[!] No reviews found on this page.")
+                # Blocked mid-way (the reviews so far are kept; a retry skips them) or really the end.
+                state = check_page(driver, REVIEW_CARD_SELECTOR, pool)
+                if state in BLOCKED_STATES:
+                    print(f"[!] Blocked on page {page}: {state}")
+                else:
+                    state = OK
+                    print("[!] No reviews found on this page.")
                 break
 
             print(f"[i] Processing {len(cards)} cards on current view...")
 
-            for card in cards:
-                if collected >= max_reviews:
-                    break
-
-                parts = []  # Combined review text segments (positive + negative or fallback).
-                has_content = False  # Tracks whether we successfully extracted explicit text blocks.
-
-                # Step 1: Preferred extraction via Booking's positive/negative blocks (more reliable formatting).
-                try:
-                    pos = card.find_element(By.CSS_SELECTOR, '[data-testid="review-positive-text"]').text.strip()
-                    if pos:
-                        parts.append(pos)
-                        has_content = True
-                except:
-                    pass
-
-                try:
-                    neg = card.find_element(By.CSS_SELECTOR, '[data-testid="review-negative-text"]').text.strip()
-                    if neg:
-                        parts.append(neg)
-                        has_content = True
-                except:
-                    pass
-
-                # Step 2: Fallback extraction ("bulldozer") if structured blocks are missing/empty in Selenium.
-                # This grabs the raw card text and filters out UI/system lines and hotel responses.
-                if not has_content:
-                    try:
-                        raw_text = card.text
-                        clean_lines = []
-                        stop_reading = False
-
-                        for line in raw_text.split('\n'):
-                            # Stop capturing once we hit the hotel's response section.
-                            if "Hotel response" in line or "Responded on" in line:
-                                stop_reading = True
-
-                            if stop_reading:
-                                continue
-
-                            line_lower = line.lower()
-
-                            # Filter common UI noise / metadata lines.
-                            if "reviewed:" in line_lower:
-                                continue
-                            if "score" in line_lower and len(line) < 10:
-                                continue
-                            if "helpful" in line_lower:
-                                continue
-                            if "read more" in line_lower:
-                                continue
-
-                            # Keep only lines that look like real content.
-                            if len(line) > 5:
-                                clean_lines.append(line)
-
-                        if clean_lines:
-                            parts.append(" ".join(clean_lines))
-
-                    except:
-                        pass
-
-                # Combine extracted segments into one review text string.
-                review_text = " ".join(parts).strip()
-
-                # Final validation + dedup.
-                if not review_text or review_text in seen_reviews:
-                    continue
-
-                # Skip placeholder/empty reviews.
-                if "no comments available" in review_text.lower():
-                    continue
-
-                # Extract numeric score if present.
-                try:
-                    raw_score = card.find_element(By.CSS_SELECTOR, '[data-testid="review-score"]').text.strip()
-                    score = raw_score.replace("Scored", "").replace("Score", "").strip().split()[0]
-                except:
-                    score = "N/A"
-
-                seen_reviews.add(review_text)
+            snapshot_page(archive, driver, REVIEW_CARD_SELECTOR, "booking", hotel_url, scrape_id, page,
+                          {"hotel_name": hotel_name, "country": country, "city": city})
 
+            for review_text, score in collect_page_reviews(cards, seen_reviews, max_reviews - collected):
                 # Write a single row for this review.
                 # NOTE: This writes 4 fields, while the header above includes 6 columns (Rating, Date, Review).
                 # Keeping this untouched as requested; adjust later if you want column alignment.
                 writer.writerow([hotel_name, country, city, score, review_text])
                 f.flush()  # Persist incrementally in case the run stops mid-way.
+                hotel_rows.append([hotel_name, country, city, score, review_text])
 
                 collected += 1
                 print(f"[+] {collected}/{max_reviews} | Rate: {score}")
@@ -350,13 +430,38 @@ def scrape_booking_hotel(
                 time.sleep(1)
                 driver.execute_script("arguments[0].click();", next_btn)
                 print("[>>] Clicked Next Page...")
+                page += 1
                 time.sleep(4)  # Wait for the next page of cards to load.
             except:
                 # If pagination control is missing, we reached the end (or layout differs).
                 print("[i] No next page button – stopping")
                 break
 
+    if STREAM_DIR and hotel_rows:
+        write_stream_part(hotel_rows, hotel_name)
+
     print(f"\n✅ DONE – collected {collected} reviews")
+    return state
+
+
+# =========================
+# STREAMING OUTPUT
+# =========================
+def write_stream_part(rows, hotel_name):
+    # One CSV per hotel, written under a hidden temp name and renamed when complete,
+    # so the streaming job never reads a half-written file (Spark skips names starting with ".").
+    import os
+    os.makedirs(STREAM_DIR, exist_ok=True)
+    safe_name = "".join(c if c.isalnum() else "_" for c in hotel_name)[:50]
+    file_name = f"part-{int(time.time() * 1000)}-{safe_name}.csv"
+    tmp_path = os.path.join(STREAM_DIR, "." + file_name)
+
+    with open(tmp_path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["HotelName", "Country", "City", "Rating", "Review"])
+        writer.writerows(rows)
+    os.replace(tmp_path, os.path.join(STREAM_DIR, file_name))
+    print(f"[i] Streaming part written: {file_name}")
 
 
 
@@ -378,8 +483,9 @@ if __name__ == "__main__":
     else:
         print(f"[i] Found existing file: {OUTPUT_FILE} - Appending new data...")
 
-    # Start the browser session (headless=False for visibility/debugging).
-    driver = init_driver(headless=False)
+    # Start the browser session (headless=False for visibility/debugging) on the healthiest proxy.
+    pool = ProxyPool(PROXY_ENDPOINTS)
+    driver = init_driver(headless=False, proxy=pool.next_proxy())
 
     # Optional: quick proxy check by printing the outbound IP.
     try:
@@ -390,23 +496,25 @@ if __name__ == "__main__":
     except:
         pass
 
-    try:
-        # Iterate over all hotels in HOTELS_LIST and scrape each one.
-        for i, hotel in enumerate(HOTELS_LIST):
-            print(f"\n--- Processing hotel {i + 1}/{len(HOTELS_LIST)}: {hotel['hotel_name']} ---")
-
-            scrape_booking_hotel(
-                driver,
-                hotel_url=hotel['url'],
-                country=hotel['country'],
-                city=hotel['city'],
-                hotel_name=hotel['hotel_name'],
-                max_reviews=MAX_REVIEWS
-            )
+    # Reviews written so far per hotel URL (kept across retries of a blocked hotel).
+    seen_by_hotel = {}
+
+    def scrape_one(hotel):
+        return scrape_booking_hotel(
+            driver,
+            hotel_url=hotel['url'],
+            country=hotel['country'],
+            city=hotel['city'],
+            hotel_name=hotel['hotel_name'],
+            max_reviews=MAX_REVIEWS,
+            pool=pool,
+            seen_reviews=seen_by_hotel.setdefault(hotel['url'], set())
+        )
 
-            # Cooldown reduces risk of detection / throttling between hotels.
-            print("Cooling down for 30 seconds...")
-            time.sleep(30)
+    try:
+        # Scrape all hotels in HOTELS_LIST; blocked ones rotate the proxy, back off and are retried later.
+        # Cooldown between hotels reduces risk of detection / throttling.
+        run_hotel_queue(HOTELS_LIST, scrape_one, pool, driver, name_of=lambda h: h['hotel_name'], pause_s=30)
 
 
     finally:
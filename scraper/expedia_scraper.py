@@ -1,3 +1,4 @@
+import os
 import time
 import random
 import csv
@@ -6,26 +7,144 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from snapshots import open_archive, snapshot_page, SnapshotArchive
+from blocking import OK, LAYOUT_CHANGED, ProxyPool, check_page, run_hotel_queue
+
 # --- Your proxy credentials ---
 PROXY_HOST = "..."
 PROXY_PORT = "..."
 PROXY_USER = "..."
 PROXY_PASS = "..."
 
+# --- All proxy endpoints (healthiest one is used, rotated after blocks; see blocking.py) ---
+PROXY_ENDPOINTS = [
+    {"host": PROXY_HOST, "port": PROXY_PORT, "user": PROXY_USER, "password": PROXY_PASS},
+]
+
 # --- Hotels list ---
+# hotel_name is only needed for the streaming part files (STREAM_DIR).
 HOTELS_LIST = [
-    {"location": "city, country", "url": ""},
-    {"location": "city, country", "url": ""},
+    {"hotel_name": "", "location": "city, country", "url": ""},
+    {"hotel_name": "", "location": "city, country", "url": ""},
 ]
 OUTPUT_FILE = "scraped_expedia.csv"
 TARGET_REVIEWS_PER_HOTEL = 30
 DEBUG_MODE = True
 
+# "Load more" loop: reviews are parsed as they load and loading stops once TARGET_REVIEWS_PER_HOTEL
+# valid reviews are in. A click that adds no article within LOAD_MORE_TIMEOUT_S means we've reached the end.
+LOAD_MORE_TIMEOUT_S = 10
+MAX_LOAD_MORE_CLICKS = 500  # safety limit
+
+# Rendered text of the articles after the first arguments[0] ones: one round trip per batch,
+# instead of a find_elements over the whole list plus one .text call per card.
+NEW_ARTICLES_JS = """
+return Array.from(document.getElementsByTagName('article')).slice(arguments[0]).map(a => a.innerText);
+"""
+COUNT_ARTICLES_JS = "return document.getElementsByTagName('article').length;"
+
+# Optional: folder watched by the streaming job (pipeline/streaming.py), e.g. "stream_input/scraped_expedia".
+# When set, each finished hotel is also written there as its own small CSV part file, with the stream's
+# "Hotel Name", "City", "Country", "Rating", "Review" columns (city / country are split from the location).
+STREAM_DIR = None
+STREAM_COLUMNS = ["Hotel Name", "City", "Country", "Rating", "Review"]
+
+# Optional: archive folder for raw review pages (see snapshots.py), e.g. "snapshots".
+# When set, the loaded reviews section is saved after the "Load more" loop, so parse_review_article can be
+# re-run offline with reparse_snapshots.py after a parser fix.
+SNAPSHOT_DIR = None
+REVIEWS_CONTAINER_SELECTOR = 'section[data-stid="reviews-container"]'
+
+
+def parse_review_article(card):
+    # Returns (rating, review_body) for one review <article>, or None when it isn't a valid review.
+    # Works on a live Selenium element and on an archived one (snapshots.parse_html).
+    return parse_review_text(card.text)
+
+
+def parse_review_text(full_text):
+    # Same, from the article's rendered text.
+    lines = full_text.split('\n')
+    rating = "N/A"
+
+    # A. Rating
+    for line in lines:
+        if "/10" in line:
+            rating = line.split("/")[0].strip()
+            break
+
+    # B. Find the date line and cut everything before it
+    cut_index = -1
+    for idx, line in enumerate(lines):
+        if any(year in line for year in ["2024", "2025", "2026", "2023"]):
+            cut_index = idx
+            break
+
+    if cut_index != -1:
+        remaining_lines = lines[cut_index + 1:]
+    else:
+        remaining_lines = lines
+
+    # C. Remove "Stayed...", "Liked/Disliked", etc. and keep only meaningful review lines
+    clean_candidates = []
+    for line in remaining_lines:
+        line_clean = line.strip()
+        line_lower = line_clean.lower()
+
+        if line_lower.startswith("stayed"):
+            break
+        if "liked:" in line_lower:
+            continue
+        if "disliked:" in line_lower:
+            continue
+        if "verified review" in line_lower:
+            continue
+        if "translate with google" in line_lower:
+            continue
+
+        if len(line_clean) > 2:
+            clean_candidates.append(line_clean)
+
+    review_body = " ".join(clean_candidates).strip()
+
+    if rating != "N/A" and review_body:
+        return rating, review_body
+    return None
+
+
+def iter_reviews(texts, location, limit):
+    # Yields output rows for the valid reviews among the article texts (at most `limit`).
+    found = 0
+    for full_text in texts:
+        if found >= limit:
+            break
+        try:
+            parsed = parse_review_text(full_text)
+        except Exception:
+            continue
+        if parsed:
+            rating, review_body = parsed
+            found += 1
+            yield {
+                "Location": location,
+                "Rating": rating,
+                "Review": review_body
+            }
+
 
-def init_driver():
-    # --- Configure proxy + disable SSL verification (fix for Chrome red screen) ---
+def collect_reviews(cards, location, limit=TARGET_REVIEWS_PER_HOTEL):
+    return list(iter_reviews((card.text for card in cards), location, limit))
+
+
+def rows_from_snapshots(pages, meta):
+    # Offline version of step 2: pages are parsed snapshots (snapshots.parse_html); the last one has all loaded reviews.
+    return collect_reviews(pages[-1].find_elements(By.TAG_NAME, "article"), meta["location"])
+
+
+def init_driver(proxy=None):
+    # --- Configure proxy (ProxyPool.next_proxy() when given) + disable SSL verification (fix for Chrome red screen) ---
     proxy_options = {
-        'proxy': {
+        'proxy': proxy or {
             'http': f'http://{PROXY_USER}:{PROXY_PASS}@{PROXY_HOST}:{PROXY_PORT}',
             'https': f'https://{PROXY_USER}:{PROXY_PASS}@{PROXY_HOST}:{PROXY_PORT}',
             'no_proxy': 'localhost,127.0.0.1'
@@ -51,14 +170,18 @@ def init_driver():
     return driver
 
 
-def scrape_single_hotel(driver, hotel_data):
+def scrape_single_hotel(driver, hotel_data, pool=None, on_review=None):
+    # Returns (reviews, page state); see blocking.py for the states.
+    # on_review(row) is called for every review as soon as it's parsed (e.g. writer.writerow).
     url = hotel_data["url"]
     location = hotel_data["location"]
     hotel_reviews = []
+    state = LAYOUT_CHANGED
 
     print(f"\n--- Starting Scraping: {location} ---")
 
     try:
+        started = time.time()
         driver.get(url)
         # If the red privacy screen still appears, try clicking: Advanced -> Proceed
         try:
@@ -85,97 +208,94 @@ def scrape_single_hotel(driver, hotel_data):
             wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'section[data-stid="reviews-container"]')))
             time.sleep(3)
         except Exception:
-            print("Could not open reviews modal (button not found or blocked).")
-            # Screenshot on failure helps diagnose what went wrong
-            driver.save_screenshot(f"error_{location[:5]}.png")
-            return []
-
-        # --- Step 2: Click "Load more" until enough reviews are loaded ---
-        print("Loading more reviews...")
-        while len(hotel_reviews) < TARGET_REVIEWS_PER_HOTEL:
+            # Captcha / block page (rotate + retry) or a changed layout (needs a selector fix)?
+            state = check_page(driver, REVIEWS_CONTAINER_SELECTOR, pool, started)
+            print(f"Could not open reviews modal (page state: {state}).")
+            if state == LAYOUT_CHANGED:
+                # Screenshot on failure helps diagnose what went wrong
+                driver.save_screenshot(f"error_{location[:5]}.png")
+            return [], state
+
+        # Modal is open; a captcha can still sit on top of it.
+        state = check_page(driver, REVIEWS_CONTAINER_SELECTOR, pool, started)
+        if state != OK:
+            print(f"Reviews modal is blocked (page state: {state}).")
+            return [], state
+
+        # --- Step 2: Parse reviews as they load, clicking "Load more" only while more are needed ---
+        # Each round parses only the articles appended since the previous one, so the work per hotel
+        # grows linearly with the number of loaded reviews.
+        print("Loading and extracting reviews...")
+        parsed_articles = 0
+        for clicks in range(MAX_LOAD_MORE_CLICKS + 1):
+            new_texts = driver.execute_script(NEW_ARTICLES_JS, parsed_articles) or []
+            parsed_articles += len(new_texts)
+            for row in iter_reviews(new_texts, location, TARGET_REVIEWS_PER_HOTEL - len(hotel_reviews)):
+                hotel_reviews.append(row)
+                if on_review:
+                    on_review(row)
+
+            if len(hotel_reviews) >= TARGET_REVIEWS_PER_HOTEL or clicks == MAX_LOAD_MORE_CLICKS:
+                break
             try:
-                articles = driver.find_elements(By.TAG_NAME, "article")
-                if len(articles) >= TARGET_REVIEWS_PER_HOTEL + 5:
-                    break
                 more_button = driver.find_element(By.ID, "load-more-reviews")
                 driver.execute_script("arguments[0].scrollIntoView(true);", more_button)
                 time.sleep(random.uniform(1.5, 3))
                 driver.execute_script("arguments[0].click();", more_button)
-                time.sleep(random.uniform(2, 4))
+                # Wait for the new batch instead of a fixed sleep.
+                WebDriverWait(driver, LOAD_MORE_TIMEOUT_S).until(
+                    lambda d: d.execute_script(COUNT_ARTICLES_JS) > parsed_articles
+                )
             except Exception:
+                # No button or nothing new loaded: every review is on the page.
                 break
+        print(f"Parsed {len(hotel_reviews)} reviews from {parsed_articles} articles.")
 
-        # --- Step 3: Extract and clean the review text ---
-        print("Extracting data...")
-        review_cards = driver.find_elements(By.TAG_NAME, "article")
+        if STREAM_DIR and hotel_reviews:
+            write_stream_part(hotel_reviews, hotel_data)
 
-        for i, card in enumerate(review_cards):
-            try:
-                full_text = card.text
-                lines = full_text.split('\n')
-                rating = "N/A"
-
-                # A. Rating
-                for line in lines:
-                    if "/10" in line:
-                        rating = line.split("/")[0].strip()
-                        break
-
-                # B. Find the date line and cut everything before it
-                cut_index = -1
-                for idx, line in enumerate(lines):
-                    if any(year in line for year in ["2024", "2025", "2026", "2023"]):
-                        cut_index = idx
-                        break
-
-                if cut_index != -1:
-                    remaining_lines = lines[cut_index + 1:]
-                else:
-                    remaining_lines = lines
-
-                # C. Remove "Stayed...", "Liked/Disliked", etc. and keep only meaningful review lines
-                clean_candidates = []
-                for line in remaining_lines:
-                    line_clean = line.strip()
-                    line_lower = line_clean.lower()
-
-                    if line_lower.startswith("stayed"):
-                        break
-                    if "liked:" in line_lower:
-                        continue
-                    if "disliked:" in line_lower:
-                        continue
-                    if "verified review" in line_lower:
-                        continue
-                    if "translate with google" in line_lower:
-                        continue
-
-                    if len(line_clean) > 2:
-                        clean_candidates.append(line_clean)
-
-                review_body = " ".join(clean_candidates).strip()
-
-                if rating != "N/A" and review_body:
-                    hotel_reviews.append({
-                        "Location": location,
-                        "Rating": rating,
-                        "Review": review_body
-                    })
-
-            except Exception:
-                continue
-
-            if len(hotel_reviews) >= TARGET_REVIEWS_PER_HOTEL:
-                break
+        # Archive the loaded reviews section (when snapshots are on).
+        snapshot_page(open_archive(SNAPSHOT_DIR), driver, REVIEWS_CONTAINER_SELECTOR, "expedia", url,
+                      SnapshotArchive.new_scrape_id(url), 1, {"location": location})
 
     except Exception as e:
         print(f"Error scraping hotel: {e}")
 
-    return hotel_reviews
+    return hotel_reviews, state
+
+
+# =========================
+# STREAMING OUTPUT
+# =========================
+def stream_rows(rows, hotel_data):
+    # Maps the scraper's Location/Rating/Review rows onto the stream's columns.
+    city, _, country = hotel_data["location"].rpartition(",")
+    if not city:
+        city, country = country, ""
+    hotel_name = hotel_data.get("hotel_name", "")
+    return [[hotel_name, city.strip(), country.strip(), row["Rating"], row["Review"]] for row in rows]
+
+
+def write_stream_part(rows, hotel_data):
+    # One CSV per hotel, written under a hidden temp name and renamed when complete,
+    # so the streaming job never reads a half-written file (Spark skips names starting with ".").
+    os.makedirs(STREAM_DIR, exist_ok=True)
+    label = hotel_data.get("hotel_name") or hotel_data["location"]
+    safe_name = "".join(c if c.isalnum() else "_" for c in label)[:50]
+    file_name = f"part-{int(time.time() * 1000)}-{safe_name}.csv"
+    tmp_path = os.path.join(STREAM_DIR, "." + file_name)
+
+    with open(tmp_path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(STREAM_COLUMNS)
+        writer.writerows(stream_rows(rows, hotel_data))
+    os.replace(tmp_path, os.path.join(STREAM_DIR, file_name))
+    print(f"[i] Streaming part written: {file_name}")
 
 
 if __name__ == "__main__":
-    driver = init_driver()
+    pool = ProxyPool(PROXY_ENDPOINTS)
+    driver = init_driver(proxy=pool.next_proxy())
 
     # Quick IP test to confirm proxy is actually used
     try:
@@ -192,18 +312,22 @@ if __name__ == "__main__":
         writer = csv.DictWriter(file, fieldnames=fieldnames)
         writer.writeheader()
 
-        for hotel in HOTELS_LIST:
-            if "PUT_URL" in hotel["url"]:
-                continue
+        def save_review(row):
+            # Rows are written as they're parsed, so a crash mid-hotel keeps what was read.
+            writer.writerow(row)
+            file.flush()
 
-            data = scrape_single_hotel(driver, hotel)
+        def scrape_one(hotel):
+            data, state = scrape_single_hotel(driver, hotel, pool, on_review=save_review)
             if data:
-                writer.writerows(data)
                 print(f"--> Saved {len(data)} rows for {hotel['location']}.")
             else:
                 print(f"--> No data found for {hotel['location']}.")
+            return state
 
-            time.sleep(3)
+        # Blocked hotels rotate the proxy, back off and are retried at the end of the queue.
+        hotels = [hotel for hotel in HOTELS_LIST if "PUT_URL" not in hotel["url"]]
+        run_hotel_queue(hotels, scrape_one, pool, driver, name_of=lambda h: h["location"], pause_s=3)
 
     driver.quit()
     print("Done.")
@@ -5,6 +5,9 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from snapshots import open_archive, snapshot_page, SnapshotArchive
+from blocking import BLOCKED_STATES, ProxyPool, check_page, run_hotel_queue
+
 # =========================
 # CONFIG
 # =========================
@@ -17,8 +20,21 @@ PROXY_HOST = "..."
 PROXY_PORT = "..."
 PROXY_USER = "..."
 PROXY_PASS = "..."
+
+# All proxy endpoints; after a captcha / rate limit the healthiest one gets a fresh session (see blocking.py).
+PROXY_ENDPOINTS = [
+    {"host": PROXY_HOST, "port": PROXY_PORT, "user": PROXY_USER, "password": PROXY_PASS},
+]
 CHROME_VERSION = 142  # Keep this aligned with your installed/target Chrome major version.
 
+# Optional: archive folder for raw review pages (see snapshots.py), e.g. "snapshots".
+# When set, the subscore rows are saved before parsing so extract_category_scores can be
+# re-run offline with reparse_snapshots.py after a parser fix.
+SNAPSHOT_DIR = None
+
+# One row per category subscore (label text + a meter element with aria-valuenow).
+SUBSCORE_SELECTOR = '[data-testid="review-subscore"]'
+
 # List of hotels to scrape.
 # IMPORTANT: Add hotels from Booking here (each item should include city/country/hotel_name/url).
 HOTELS_LIST = [
@@ -39,11 +55,12 @@ HOTELS_LIST = [
 # =========================
 # DRIVER SETUP
 # =========================
-def init_driver(headless=False):
-    # Selenium Wire proxy config (HTTP + HTTPS) so all browser requests go through the proxy.
+def init_driver(headless=False, proxy=None):
+    # Selenium Wire proxy config (HTTP + HTTPS) so all browser requests go through the proxy
+    # (ProxyPool.next_proxy() when given).
     # verify_ssl=False helps when the proxy MITM/cert chain causes SSL validation issues.
     proxy_options = {
-        'proxy': {
+        'proxy': proxy or {
             'http': f'http://{PROXY_USER}:{PROXY_PASS}@{PROXY_HOST}:{PROXY_PORT}',
             'https': f'https://{PROXY_USER}:{PROXY_PASS}@{PROXY_HOST}:{PROXY_PORT}',
             'no_proxy': 'localhost,127.0.0.1'  # Do not proxy local traffic.
@@ -159,7 +176,7 @@ def extract_category_scores(driver):
 
     try:
         # Each row should include label text + a meter element with aria-valuenow.
-        rows = driver.find_elements(By.CSS_SELECTOR, '[data-testid="review-subscore"]')
+        rows = driver.find_elements(By.CSS_SELECTOR, SUBSCORE_SELECTOR)
 
         print(f"[i] Found {len(rows)} category rows. Parsing...")
 
@@ -198,13 +215,34 @@ def extract_category_scores(driver):
     return scores
 
 
-def scrape_booking_hotel(driver, hotel_url, country, city, hotel_name):
+def scores_row(hotel_name, country, city, category_scores):
+    # Output columns must match the header in MAIN.
+    return [
+        hotel_name, country, city,
+        category_scores["Staff"],
+        category_scores["Facilities"],
+        category_scores["Cleanliness"],
+        category_scores["Comfort"],
+        category_scores["Location"],
+        category_scores["Free_Wifi"]
+    ]
+
+
+def rows_from_snapshots(pages, meta):
+    # Offline version of steps 4-5: extract_category_scores works on a parsed snapshot (snapshots.parse_html)
+    # the same way it works on the driver. Scores are read from the last archived page.
+    scores = extract_category_scores(pages[-1])
+    return [scores_row(meta["hotel_name"], meta["country"], meta["city"], scores)]
+
+
+def scrape_booking_hotel(driver, hotel_url, country, city, hotel_name, pool=None):
     # Main per-hotel routine:
     # - open hotel page
     # - accept cookies
     # - navigate to reviews
     # - ensure all reviews/subscores are loaded
-    # - extract subscores and write to CSV
+    # - check for blocks, extract subscores and write to CSV
+    # Returns the page state (blocking.py); nothing is written for a blocked page.
     wait = WebDriverWait(driver, 25)
 
     # Force English content for more stable UI/selectors.
@@ -212,6 +250,7 @@ def scrape_booking_hotel(driver, hotel_url, country, city, hotel_name):
         hotel_url += "&lang=en-us" if "?" in hotel_url else "?lang=en-us"
 
     print(f"[i] Opening hotel page: {hotel_name}")
+    started = time.time()
     driver.get(hotel_url)
     time.sleep(5)  # Initial load buffer (Booking can be heavy / JS-driven).
 
@@ -243,25 +282,27 @@ def scrape_booking_hotel(driver, hotel_url, country, city, hotel_name):
     # 3) Extra wait to reduce race conditions before reading meters.
     time.sleep(2)
 
-    # 4) Extract category subscores from the loaded reviews section.
+    # A captcha / soft block would be saved as all-zero scores; retry it on another proxy instead.
+    # (No subscores on a normal page is fine: new hotels don't have them yet.)
+    state = check_page(driver, SUBSCORE_SELECTOR, pool, started)
+    if state in BLOCKED_STATES:
+        print(f"[!] Page state: {state} – scores not saved")
+        return state
+
+    # 4) Extract category subscores from the loaded reviews section (archived first when snapshots are on).
+    snapshot_page(open_archive(SNAPSHOT_DIR), driver, SUBSCORE_SELECTOR, "real_scores", hotel_url,
+                  SnapshotArchive.new_scrape_id(hotel_url), 1,
+                  {"hotel_name": hotel_name, "country": country, "city": city})
     category_scores = extract_category_scores(driver)
 
     # 5) Append results to CSV.
-    # Note: output columns must match the header in MAIN.
     with open(OUTPUT_FILE, mode="a", newline="", encoding="utf-8-sig") as f:
         writer = csv.writer(f)
-        writer.writerow([
-            hotel_name, country, city,
-            category_scores["Staff"],
-            category_scores["Facilities"],
-            category_scores["Cleanliness"],
-            category_scores["Comfort"],
-            category_scores["Location"],
-            category_scores["Free_Wifi"]
-        ])
+        writer.writerow(scores_row(hotel_name, country, city, category_scores))
         f.flush()  # Ensures data is written even if the script stops later.
 
     print(f"✅ DONE – Saved scores for {hotel_name}\n")
+    return state
 
 
 # =========================
@@ -284,7 +325,8 @@ if __name__ == "__main__":
         print(f"[i] Found existing file: {OUTPUT_FILE} - Appending new data...")
 
     # Start browser (set headless=True for server/CI runs, but may reduce reliability on some sites).
-    driver = init_driver(headless=False)
+    pool = ProxyPool(PROXY_ENDPOINTS)
+    driver = init_driver(headless=False, proxy=pool.next_proxy())
 
     try:
         # Quick sanity check: verify outbound IP (confirms proxy is working).
@@ -297,21 +339,19 @@ if __name__ == "__main__":
             # If this fails, the scrape might still work; continue.
             print("⚠️ Proxy verification timed out/failed (continuing)")
 
-        # Iterate hotels and scrape each one.
-        for i, hotel in enumerate(HOTELS_LIST):
-            print(f"--- Processing hotel {i + 1}/{len(HOTELS_LIST)}: {hotel['hotel_name']} ---")
-
-            scrape_booking_hotel(
+        def scrape_one(hotel):
+            return scrape_booking_hotel(
                 driver,
                 hotel_url=hotel["url"],
                 country=hotel["country"],
                 city=hotel["city"],
-                hotel_name=hotel["hotel_name"]
+                hotel_name=hotel["hotel_name"],
+                pool=pool
             )
 
-            # Cooldown between hotels to reduce bot detection / rate limiting.
-            print("[i] Cooling down for 5 seconds...")
-            time.sleep(5)
+        # Scrape hotels in order; blocked ones rotate the proxy, back off and are retried later.
+        # Cooldown between hotels to reduce bot detection / rate limiting.
+        run_hotel_queue(HOTELS_LIST, scrape_one, pool, driver, name_of=lambda h: h["hotel_name"], pause_s=5)
 
     finally:
         # Always close the browser, even if an exception happens.
@@ -0,0 +1,111 @@
+import csv
+import importlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from snapshots import SnapshotArchive, parse_html
+
+# =========================
+# CONFIG
+# =========================
+
+# Archive written by the scrapers (their SNAPSHOT_DIR) and where the re-parsed CSVs go.
+SNAPSHOT_DIR = "snapshots"
+OUTPUT_DIR = "reparsed"
+
+# Scraper name in the archive index -> (module with rows_from_snapshots, output CSV header).
+# The headers match the files the scrapers write, so re-parsed files can replace them.
+PARSERS = {
+    "booking": ("booking_scraper", ["HotelName", "Country", "City", "Rating", "Review"]),
+    "real_scores": ("real_categories_scores_scraper", [
+        "HotelName", "Country", "City",
+        "Staff", "Facilities", "Cleanliness",
+        "Comfort", "Location", "Free_Wifi"
+    ]),
+    "expedia": ("expedia_scraper", ["Location", "Rating", "Review"]),
+}
+
+# Only the most recent visit of each hotel (per scraper); set to False to re-parse every visit.
+LATEST_ONLY = True
+
+# Only visits scraped at or after this ISO time (e.g. "2025-01-01"), None = all.
+SINCE = None
+
+# Worker processes (None = one per CPU) and hotels handed to a worker at a time.
+MAX_WORKERS = None
+CHUNKSIZE = 4
+
+
+# =========================
+# WORKER
+# =========================
+def reparse_scrape(task):
+    # Runs in a worker process: loads one hotel visit and re-runs its scraper's extraction on it.
+    root, scrape = task
+    try:
+        archive = SnapshotArchive(root)
+        module = importlib.import_module(PARSERS[scrape["scraper"]][0])
+        pages = [parse_html(archive.get(sha)) for sha in scrape["pages"]]
+        return scrape, module.rows_from_snapshots(pages, scrape["meta"]), None
+    except Exception as e:
+        return scrape, [], f"{type(e).__name__}: {e}"
+
+
+# =========================
+# DRIVER
+# =========================
+def reparse_archive(
+        root=SNAPSHOT_DIR,
+        output_dir=OUTPUT_DIR,
+        scrapers=tuple(PARSERS),
+        latest_only=LATEST_ONLY,
+        since=SINCE,
+        max_workers=MAX_WORKERS
+):
+    """
+    Re-runs the scrapers' extraction logic over the archived pages, in parallel across processes,
+    and writes one CSV per scraper to output_dir (<scraper>.csv). Returns {scraper: rows written}.
+    """
+    archive = SnapshotArchive(root)
+    scrapes = [s for s in archive.scrapes(since=since, latest_only=latest_only) if s["scraper"] in scrapers]
+    print(f"[i] Re-parsing {len(scrapes)} hotel visits from {root}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    files, writers, counts = {}, {}, {}
+    for scraper in {s["scraper"] for s in scrapes}:
+        files[scraper] = open(os.path.join(output_dir, f"{scraper}.csv"), "w", newline="", encoding="utf-8-sig")
+        writers[scraper] = csv.writer(files[scraper])
+        writers[scraper].writerow(PARSERS[scraper][1])
+        counts[scraper] = 0
+
+    start = time.time()
+    failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            tasks = [(root, s) for s in scrapes]
+            # map keeps the archive order, so the output is the same on every run.
+            for scrape, rows, error in pool.map(reparse_scrape, tasks, chunksize=CHUNKSIZE):
+                if error:
+                    failed += 1
+                    print(f"⚠️ {scrape['scraper']} {scrape['url']} ({scrape['scrape_id']}): {error}")
+                    continue
+                for row in rows:
+                    writers[scrape["scraper"]].writerow(
+                        [row[c] for c in PARSERS[scrape["scraper"]][1]] if isinstance(row, dict) else row
+                    )
+                counts[scrape["scraper"]] += len(rows)
+    finally:
+        for f in files.values():
+            f.close()
+
+    for scraper, n in sorted(counts.items()):
+        print(f"[i] {scraper}: {n} rows -> {os.path.join(output_dir, scraper + '.csv')}")
+    print(f"✅ DONE in {time.time() - start:.1f}s ({failed} visits failed)")
+    return counts
+
+
+if __name__ == "__main__":
+    # Run from the scraper folder: python reparse_snapshots.py [SNAPSHOT_DIR]
+    reparse_archive(sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_DIR)
@@ -0,0 +1,328 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+
+# =========================
+# CONFIG
+# =========================
+
+# Archive layout (one folder, shared by all scrapers):
+#   <root>/objects/<sha[:2]>/<sha>.html.gz   - gzip'ed page HTML, named by the SHA-256 of its content
+#                                              (an unchanged page scraped twice is stored once)
+#   <root>/index.jsonl                       - one line per saved page: scraper, hotel url, scrape id,
+#                                              page number, scrape time, content hash, hotel fields
+OBJECTS_DIR = "objects"
+INDEX_FILE = "index.jsonl"
+COMPRESSION_LEVEL = 6
+
+# Runs in the browser: outerHTML of every element matching a CSS selector, without the parts that
+# aren't rendered (display:none / visibility:hidden), so the archived text matches what Selenium's .text saw.
+CAPTURE_JS = """
+const selector = arguments[0];
+function visibleClone(el) {
+    const clone = el.cloneNode(false);
+    for (const child of el.childNodes) {
+        if (child.nodeType === Node.ELEMENT_NODE) {
+            const style = window.getComputedStyle(child);
+            if (style.display === 'none' || style.visibility === 'hidden') continue;
+            clone.appendChild(visibleClone(child));
+        } else if (child.nodeType === Node.TEXT_NODE) {
+            clone.appendChild(child.cloneNode(false));
+        }
+    }
+    return clone;
+}
+return Array.from(document.querySelectorAll(selector)).map(e => visibleClone(e).outerHTML).join('\\n');
+"""
+
+
+# =========================
+# ARCHIVE
+# =========================
+class SnapshotArchive:
+    """
+    Compressed, content-addressed archive of scraped review sections, indexed by hotel URL and scrape time.
+    Scrapers save one snapshot per review page; reparse_snapshots.py runs the scrapers' extraction
+    functions over them offline.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.index_path = os.path.join(root, INDEX_FILE)
+        os.makedirs(os.path.join(root, OBJECTS_DIR), exist_ok=True)
+
+    # ---------- objects ----------
+    def _object_path(self, sha):
+        return os.path.join(self.root, OBJECTS_DIR, sha[:2], f"{sha}.html.gz")
+
+    def put(self, html):
+        """
+        Stores html (if not already there) and returns its SHA-256.
+        """
+        data = html.encode("utf-8")
+        sha = hashlib.sha256(data).hexdigest()
+        path = self._object_path(sha)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(gzip.compress(data, COMPRESSION_LEVEL))
+            os.replace(tmp, path)
+        return sha
+
+    def get(self, sha):
+        with open(self._object_path(sha), "rb") as f:
+            return gzip.decompress(f.read()).decode("utf-8")
+
+    # ---------- index ----------
+    @staticmethod
+    def new_scrape_id(url):
+        # Groups the pages of one visit to one hotel.
+        return f"{int(time.time() * 1000)}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}"
+
+    def save(self, html, scraper, url, scrape_id, page, meta=None):
+        sha = self.put(html)
+        entry = {
+            "scraper": scraper,
+            "url": url,
+            "scrape_id": scrape_id,
+            "page": page,
+            "scraped_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "sha256": sha,
+            "chars": len(html),
+            "meta": meta or {},
+        }
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return sha
+
+    def entries(self):
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def scrapes(self, scraper=None, url=None, since=None, latest_only=True):
+        """
+        One dict per hotel visit: scraper, url, scrape_id, scraped_at, meta and the page hashes in order.
+        latest_only keeps the most recent visit per (scraper, url); since is an ISO time string.
+        """
+        grouped = {}
+        for e in self.entries():
+            if (scraper and e["scraper"] != scraper) or (url and e["url"] != url):
+                continue
+            if since and e["scraped_at"] < since:
+                continue
+            s = grouped.setdefault(e["scrape_id"], {
+                "scraper": e["scraper"], "url": e["url"], "scrape_id": e["scrape_id"],
+                "scraped_at": e["scraped_at"], "meta": e["meta"], "pages": {},
+            })
+            s["pages"][e["page"]] = e["sha256"]
+
+        # scrape ids start with the visit time in ms, which orders visits within the same second.
+        scrapes = sorted(grouped.values(), key=lambda s: (s["scraped_at"], s["scrape_id"]))
+        if latest_only:
+            scrapes = list({(s["scraper"], s["url"]): s for s in scrapes}.values())
+        for s in scrapes:
+            s["pages"] = [sha for _, sha in sorted(s["pages"].items())]
+        return scrapes
+
+
+def open_archive(root):
+    # None when snapshots are off (root not set), so scrapers can just check `if archive`.
+    return SnapshotArchive(root) if root else None
+
+
+def snapshot_page(archive, driver, selector, scraper, url, scrape_id, page, meta=None):
+    """
+    Archives the rendered elements matching selector. Never fails the scrape.
+    """
+    if archive is None:
+        return None
+    try:
+        html = driver.execute_script(CAPTURE_JS, selector) or ""
+        return archive.save(f"<div data-snapshot>{html}</div>", scraper, url, scrape_id, page, meta)
+    except Exception as e:
+        print(f"⚠️ Snapshot failed: {e}")
+        return None
+
+
+# =========================
+# OFFLINE DOM (subset of the Selenium WebElement API)
+# =========================
+
+# Enough of WebElement for the scrapers' extraction functions: find_element(s) with
+# By.CSS_SELECTOR (tag, .class, [attr], [attr="v"], [attr*="v"], [attr^="v"], [attr$="v"],
+# descendant combinator, comma lists) or By.TAG_NAME, .text and get_attribute().
+CSS_SELECTOR = "css selector"
+TAG_NAME = "tag name"
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+SKIPPED_TAGS = {"script", "style", "template", "noscript", "svg"}
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "dd", "details", "div", "dl", "dt", "fieldset", "figcaption",
+    "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav",
+    "ol", "p", "pre", "section", "summary", "table", "tr", "ul",
+}
+
+_COMPOUND_RE = re.compile(r"^([a-zA-Z][\w-]*|\*)?((?:\.[\w-]+|\[[^\]]+\])*)$")
+_PART_RE = re.compile(r"\.([\w-]+)|\[\s*([\w-]+)\s*(?:([*^$~]?=)\s*[\"']?([^\"'\]]*)[\"']?\s*)?\]")
+
+
+class NoSuchElement(Exception):
+    pass
+
+
+class Node:
+    def __init__(self, tag, attrs, parent=None):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children = []  # Node or str
+
+    # ---------- WebElement API ----------
+    def get_attribute(self, name):
+        return self.attrs.get(name)
+
+    @property
+    def tag_name(self):
+        return self.tag
+
+    @property
+    def text(self):
+        """
+        Approximation of the rendered text (innerText): block elements and <br> start new lines,
+        whitespace inside a line is collapsed, empty lines are dropped.
+        """
+        parts = []
+        self._collect_text(parts)
+        lines = (" ".join(line.split()) for line in "".join(parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+    def find_elements(self, by, value):
+        if by == TAG_NAME:
+            matchers = [[(value.lower(), [])]]
+        elif by == CSS_SELECTOR:
+            matchers = [_parse_selector(s) for s in value.split(",")]
+        else:
+            raise ValueError(f"Unsupported locator for snapshots: {by}")
+        return [n for n in self._descendants() if any(_matches(n, m) for m in matchers)]
+
+    def find_element(self, by, value):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElement(value)
+        return found[0]
+
+    # ---------- internals ----------
+    def _descendants(self):
+        stack = [c for c in reversed(self.children) if isinstance(c, Node)]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(c for c in reversed(node.children) if isinstance(c, Node))
+
+    def _collect_text(self, parts):
+        for child in self.children:
+            if isinstance(child, str):
+                parts.append(child.replace("\n", " "))
+            elif child.tag == "br":
+                parts.append("\n")
+            elif child.tag not in SKIPPED_TAGS:
+                block = child.tag in BLOCK_TAGS
+                if block:
+                    parts.append("\n")
+                child._collect_text(parts)
+                if block:
+                    parts.append("\n")
+
+
+def _parse_selector(selector):
+    # "section[data-stid=x] article" -> [(tag, [(kind, name, op, value)]), ...] outermost first.
+    compounds = []
+    for token in re.findall(r"(?:[^\s\[]+|\[[^\]]*\])+", selector.strip()):
+        m = _COMPOUND_RE.match(token)
+        if not m:
+            raise ValueError(f"Unsupported CSS selector for snapshots: {selector}")
+        tag = (m.group(1) or "*").lower()
+        conditions = []
+        for cls, attr, op, val in _PART_RE.findall(m.group(2)):
+            conditions.append(("class", cls, "~=", cls) if cls else ("attr", attr.lower(), op, val))
+        compounds.append((tag, conditions))
+    return compounds
+
+
+def _matches_compound(node, compound):
+    tag, conditions = compound
+    if tag != "*" and node.tag != tag:
+        return False
+    for kind, name, op, val in conditions:
+        actual = node.attrs.get("class" if kind == "class" else name)
+        if actual is None:
+            return False
+        if op == "=" and actual != val:
+            return False
+        if op == "~=" and val not in actual.split():
+            return False
+        if op == "*=" and val not in actual:
+            return False
+        if op == "^=" and not actual.startswith(val):
+            return False
+        if op == "$=" and not actual.endswith(val):
+            return False
+    return True
+
+
+def _matches(node, compounds):
+    if not _matches_compound(node, compounds[-1]):
+        return False
+    ancestor = node.parent
+    for compound in reversed(compounds[:-1]):
+        while ancestor is not None and not _matches_compound(ancestor, compound):
+            ancestor = ancestor.parent
+        if ancestor is None:
+            return False
+        ancestor = ancestor.parent
+    return True
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document", {})
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {k: (v if v is not None else "") for k, v in attrs}, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(Node(tag, {k: (v if v is not None else "") for k, v in attrs}, self.current))
+
+    def handle_endtag(self, tag):
+        # Close up to the matching open tag (tolerates unclosed <p>/<li>); ignore stray end tags.
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+
+def parse_html(html):
+    """
+    Document node for archived HTML; scrapers' extraction functions take it in place of the driver.
+    """
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root